@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+# Seeded into a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from database import engine
+from utils import security
+from utils.migrations import run_migrations
+from utils.user_cache import user_cache
+
+# The app's lifespan (which migrates) does not run under this client
+run_migrations(engine)
+
+queries = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global queries
+    queries += 1
+
+
+def run(client, path, token, requests):
+    global queries
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(path, headers=headers)
+    queries = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, queries / requests
+
+
+def main_bench(requests: int):
+    client = TestClient(main.app)
+    client.post("/auth/signup", json={"email": "bench@example.com", "password": "pw", "full_name": "Bench"})
+    token = client.post("/auth/login", data={"username": "bench@example.com", "password": "pw"}).json()["access_token"]
+    # A token minted the old way: email only, so every request needs a users lookup
+    legacy_token = security.create_access_token({"sub": "bench@example.com"}, timedelta(minutes=30))
+
+    print(f"{'scenario':<46} {'req/s':>8} {'queries/req':>12}")
+    maxsize = user_cache.cache.maxsize
+    user_cache.cache.maxsize = 0
+    rate, per_request = run(client, "/user/profile", legacy_token, requests)
+    print(f"{'before: email lookup per request':<46} {rate:>8.0f} {per_request:>12.2f}")
+    user_cache.cache.maxsize = maxsize
+
+    rate, per_request = run(client, "/user/profile", token, requests)
+    print(f"{'after: uid token + user cache (/user/profile)':<46} {rate:>8.0f} {per_request:>12.2f}")
+    rate, per_request = run(client, "/applications/", token, requests)
+    print(f"{'after: principal only (/applications/)':<46} {rate:>8.0f} {per_request:>12.2f}")
+    print(f"user cache: {user_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import database
+from database import Base, create_db_engine
+from models import job, resume, user  # noqa: F401  (register tables)
+
+THREADS = 16
+DURATION = 5.0
+WRITE_EVERY = 5  # one write per N operations, like a mostly-read API
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stitch.db")
+
+
+def prepare_copy(name: str) -> str:
+    # Work on a copy of stitch.db so the benchmark never touches real data
+    path = os.path.join(tempfile.mkdtemp(), name)
+    if os.path.exists(SOURCE):
+        shutil.copy(SOURCE, path)
+    seed_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=seed_engine)
+    with seed_engine.begin() as conn:
+        if not conn.execute(text("SELECT count(*) FROM users")).scalar():
+            conn.execute(text("INSERT INTO users (email, hashed_password, full_name) VALUES ('bench@example.com', 'x', 'Bench')"))
+        count = conn.execute(text("SELECT count(*) FROM resumes")).scalar()
+        conn.execute(
+            text("INSERT INTO resumes (user_id, file_path, candidate_name, score) VALUES (1, 'bench.pdf', 'Bench', :score)"),
+            [{"score": float(i % 100)} for i in range(max(0, 20_000 - count))],
+        )
+    seed_engine.dispose()
+    return path
+
+
+def worker(db_engine, deadline, counts, lock):
+    done = errors = ops = 0
+    while time.perf_counter() < deadline:
+        ops += 1
+        try:
+            with db_engine.begin() as conn:
+                if ops % WRITE_EVERY == 0:
+                    conn.execute(text("INSERT INTO resumes (user_id, file_path, candidate_name, score) VALUES (1, 'bench.pdf', 'Bench', 50)"))
+                else:
+                    conn.execute(text(
+                        "SELECT id, score FROM resumes WHERE user_id = 1 ORDER BY created_at DESC LIMIT 5"
+                    )).all()
+            done += 1
+        except OperationalError:
+            # "database is locked" once a writer holds the file longer than the busy timeout
+            errors += 1
+    with lock:
+        counts["ok"] += done
+        counts["errors"] += errors
+
+
+def run(label: str, db_engine):
+    counts = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + DURATION
+    threads = [threading.Thread(target=worker, args=(db_engine, deadline, counts, lock)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with db_engine.connect() as conn:
+        mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    print(f"{label:<32} journal={mode:<7} {counts['ok'] / DURATION:>9.0f} ops/s  errors={counts['errors']}")
+    db_engine.dispose()
+
+
+async def run_async(path: str):
+    # Same read through AsyncSession.run_sync on aiosqlite, from concurrent coroutines
+    async_engine = database.create_async_db_engine(f"sqlite:///{path}")
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+    deadline = time.perf_counter() + DURATION
+    done = 0
+
+    def read(db):
+        return db.execute(text("SELECT id, score FROM resumes WHERE user_id = 1 ORDER BY created_at DESC LIMIT 5")).all()
+
+    async def loop():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            async with sessions() as db:
+                await db.run_sync(read)
+            done += 1
+
+    await asyncio.gather(*(loop() for _ in range(THREADS)))
+    await async_engine.dispose()
+    print(f"{'tuned, AsyncSession (reads)':<32} {'':<15} {done / DURATION:>9.0f} ops/s")
+
+
+def main():
+    print(f"{THREADS} threads, 1 write per {WRITE_EVERY} ops, {DURATION:.0f}s each, source: {SOURCE}")
+    baseline = prepare_copy("baseline.db")
+    run("defaults (old create_engine)", create_engine(f"sqlite:///{baseline}", connect_args={"check_same_thread": False}))
+    tuned = prepare_copy("tuned.db")
+    run("create_db_engine (WAL, pragmas)", create_db_engine(f"sqlite:///{tuned}"))
+    try:
+        import aiosqlite  # noqa: F401
+    except ImportError:
+        print("aiosqlite not installed, skipping the AsyncSession run")
+        return
+    asyncio.run(run_async(tuned))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        SOURCE = sys.argv[1]
+    main()
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Benchmark against a throwaway SQLite database, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+# Zero-latency offline LLM stub so the benchmark only measures extraction + request overhead
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "0"
+# Every call re-extracts the same PDF, so keep the per-hash page cache out of the measurement
+os.environ["EXTRACTION_CACHE"] = "0"
+
+import fitz  # PyMuPDF
+import httpx
+
+import main
+from utils import extraction
+from utils.migrations import run_migrations
+
+# The app's lifespan (which migrates) does not run under this client
+run_migrations(main.engine)
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "8"))
+PAGES = int(os.getenv("BENCH_PAGES", "40"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "3"))
+
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    line = "Senior Python engineer with FastAPI, PostgreSQL, Docker and Kubernetes experience. "
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {i}\n" + line * 40, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(client, headers, pdf, use_pool: bool):
+    extraction.EXTRACTION_USE_POOL = use_pool
+    latencies = []
+
+    async def one(i):
+        start = time.perf_counter()
+        response = await client.post(
+            "/resume/analyze-match",
+            files={"file": ("bench.pdf", pdf, "application/pdf")},
+            # A unique job description per call keeps the analysis cache out of the picture
+            data={"job_description": f"Python engineer #{use_pool}-{i}-{time.time()}"},
+            headers=headers,
+        )
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(one(i) for i in range(CONCURRENCY)))
+    return latencies
+
+
+async def main_async():
+    pdf = make_pdf(PAGES)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/signup", json={"email": "bench@example.com", "password": "bench", "full_name": "Bench"})
+        token = (await client.post("/auth/login", data={"username": "bench@example.com", "password": "bench"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Warm the pool so worker spawn time is not counted
+        await extraction.extract_text(pdf)
+
+        print(f"{CONCURRENCY} concurrent analyze-match calls x {ROUNDS} rounds, {PAGES}-page PDF ({len(pdf)} bytes)")
+        for use_pool in (False, True):
+            latencies = await run(client, headers, pdf, use_pool)
+            label = "process pool" if use_pool else "inline      "
+            print(
+                f"  {label}  p50={statistics.median(latencies):8.1f}ms"
+                f"  p99={percentile(latencies, 99):8.1f}ms  max={max(latencies):8.1f}ms"
+            )
+    extraction.shutdown()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        CONCURRENCY = int(sys.argv[1])
+    asyncio.run(main_async())
@@ -0,0 +1,56 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_matching import synthetic_text
+from utils.matching import MatchingEngine
+
+
+def rss_mb() -> float:
+    # Current (not peak) resident set size, so memory-mapped pages that were never touched do not count
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def measure_load(path: str):
+    start = time.perf_counter()
+    before = rss_mb()
+    engine = MatchingEngine(path=path)
+    engine.load()
+    load_time = time.perf_counter() - start
+    after_load = rss_mb()
+    engine.rank(synthetic_text(random.Random(1), 400), 10)
+    print(f"load: {load_time * 1000:.0f}ms, rss +{after_load - before:.1f}MB after load, "
+          f"+{rss_mb() - before:.1f}MB after first query")
+
+
+def main(jobs_count: int):
+    rng = random.Random(42)
+    path = os.path.join(tempfile.mkdtemp(), "job_index")
+    engine = MatchingEngine(path=path)
+
+    base = rss_mb()
+    start = time.perf_counter()
+    engine.build((job_id, synthetic_text(rng), 1) for job_id in range(1, jobs_count + 1))
+    print(f"build + write: {jobs_count} jobs in {time.perf_counter() - start:.2f}s, rss +{rss_mb() - base:.1f}MB")
+
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"on disk: {size / 1024 / 1024:.1f}MB")
+
+    start = time.perf_counter()
+    for job_id in range(jobs_count + 1, jobs_count + 501):
+        engine.add(job_id, synthetic_text(rng))
+    print(f"incremental add (journaled): {(time.perf_counter() - start) * 1000 / 500:.3f}ms/job")
+
+    # Load in a fresh interpreter so the RSS numbers are not polluted by the build
+    subprocess.run([sys.executable, __file__, "--load", path], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--load":
+        measure_load(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
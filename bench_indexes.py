@@ -0,0 +1,89 @@
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Seeded into a throwaway SQLite file, never stitch.db
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from database import engine
+from utils.migrations import run_migrations
+
+USERS = 100_000
+JOBS = 10_000
+REPEATS = 200
+BATCH = 100_000
+
+QUERIES = {
+    "latest resumes": "SELECT * FROM resumes WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 5",
+    "user applications": "SELECT * FROM applications WHERE user_id = ?",
+    "application exists": "SELECT id FROM applications WHERE user_id = ? AND job_id = ?",
+}
+INDEXES = {
+    "ix_resumes_user_id_created_at": "CREATE INDEX ix_resumes_user_id_created_at ON resumes (user_id, created_at DESC, id DESC)",
+    "ix_applications_user_id_job_id": "CREATE INDEX ix_applications_user_id_job_id ON applications (user_id, job_id)",
+}
+
+
+def seed(conn, rows: int):
+    rng = random.Random(11)
+    start = datetime(2024, 1, 1)
+    conn.executemany("INSERT INTO users (id, email, hashed_password) VALUES (?, ?, 'x')",
+                     ((i, f"user{i}@example.com") for i in range(1, USERS + 1)))
+    for offset in range(0, rows, BATCH):
+        conn.executemany(
+            "INSERT INTO resumes (user_id, file_path, candidate_name, score, created_at) VALUES (?, 'r.pdf', 'Bench', ?, ?)",
+            [(rng.randint(1, USERS), rng.random() * 100, (start + timedelta(seconds=offset + i)).strftime("%Y-%m-%d %H:%M:%S"))
+             for i in range(min(BATCH, rows - offset))],
+        )
+        conn.executemany(
+            "INSERT INTO applications (user_id, job_id, status) VALUES (?, ?, 'Applied')",
+            [(rng.randint(1, USERS), rng.randint(1, JOBS)) for _ in range(min(BATCH, rows - offset) // 2)],
+        )
+    conn.commit()
+
+
+def timed(conn, sql: str):
+    rng = random.Random(3)
+    samples = []
+    for _ in range(REPEATS):
+        params = (rng.randint(1, USERS), rng.randint(1, JOBS))[:sql.count("?")]
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(rows: int):
+    run_migrations(engine)
+    engine.dispose()
+    conn = sqlite3.connect(DB_PATH)
+    start = time.perf_counter()
+    seed(conn, rows)
+    print(f"seeded {rows} resumes and {rows // 2} applications in {time.perf_counter() - start:.1f}s")
+
+    for name in INDEXES:
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute("ANALYZE")
+    before = {label: timed(conn, sql) for label, sql in QUERIES.items()}
+
+    start = time.perf_counter()
+    for sql in INDEXES.values():
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    print(f"built composite indexes in {time.perf_counter() - start:.1f}s")
+    after = {label: timed(conn, sql) for label, sql in QUERIES.items()}
+
+    print(f"{'query':<20} {'no index ms':>12} {'indexed ms':>11}")
+    for label in QUERIES:
+        print(f"{label:<20} {before[label]:>12.3f} {after[label]:>11.3f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
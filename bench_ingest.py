@@ -0,0 +1,151 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+# Ingests into a throwaway SQLite file, never stitch.db
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_ingest.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["MATCHING_INDEX_DIR"] = os.path.join(os.path.dirname(DB_PATH), "job_index")
+
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+from utils import ingest, matching
+from utils.migrations import run_migrations
+
+# A synthetic feed streamed straight into utils.ingest (the code behind POST /jobs/bulk and
+# ingest_jobs.py) without ever existing as a whole in memory. About 1 in 20 records repeats
+# an earlier one and 1 in 1000 is invalid, so dedupe and validation are on the measured path.
+# Heap RSS is sampled as batches complete: constant memory means it levels off after the
+# first few batches instead of following the row count.
+
+WORDS = (
+    "python java react django kubernetes aws sql spark golang rust devops data backend frontend mobile "
+    "cloud security analytics platform api microservices testing design product manager senior junior "
+    "kafka airflow terraform docker postgres redis graphql typescript node pandas pytorch ml ai etl"
+).split()
+CITIES = ["Remote", "Berlin", "London", "New York", "Karachi", "Lahore", "Toronto", "Austin", None]
+CHUNK_RECORDS = 2000
+
+
+def job_pool(seed: int = 7, size: int = 997):
+    # Word mixes are drawn once up front; generating the feed should cost next to nothing
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(size):
+        words = rng.sample(WORDS, 20)
+        pool.append((f"{words[0].title()} {words[1].title()} Engineer", " ".join(words * 3), rng.choice(CITIES)))
+    return pool
+
+
+def make_job(pool, n: int) -> dict:
+    title, description, location = pool[n % len(pool)]
+    return {"title": title, "company": f"Company {n % 20000}", "description": f"Job {n}: {description}", "location": location}
+
+
+def feed(count: int, fmt: str):
+    pool = job_pool()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, ["title", "company", "description", "location"], lineterminator="\n")
+    if fmt == "csv":
+        writer.writeheader()
+    for n in range(count):
+        if n % 1000 == 999:
+            record = {"title": "Missing company", "description": "x"}
+        elif n % 20 == 19:
+            # A repeat of a record from a few hundred lines back
+            record = make_job(pool, max(0, n - 1 - n % 500))
+        else:
+            record = make_job(pool, n)
+        if fmt == "csv":
+            writer.writerow({"company": "", "location": "", **record})
+        else:
+            buffer.write(json.dumps(record) + "\n")
+        if n % CHUNK_RECORDS == CHUNK_RECORDS - 1:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def rss_mb() -> float:
+    # Anonymous (heap) memory only: SQLite maps the database file (SQLITE_MMAP_SIZE) and
+    # those file-backed pages grow with the database, not with what ingestion holds on to
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(count: int, fmt: str, batch_size: int):
+    samples = []
+    checkpoints = {max(1, count * step // 10) for step in (1, 2, 5, 10)}
+
+    def on_batch(report):
+        if samples and report.received < min(c for c in checkpoints if c > samples[-1][0]):
+            return
+        samples.append((report.received, rss_mb()))
+
+    db = SessionLocal()
+    try:
+        report = ingest.ingest(db, feed(count, fmt), fmt, batch_size, on_batch=on_batch)
+    finally:
+        db.close()
+    return report.summary(), samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and memory of bulk job ingestion.")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=ingest.FORMATS, default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=ingest.INGEST_BATCH_SIZE)
+    parser.add_argument("--matching", action="store_true", help="with the matching index loaded, so every batch is also vectorized into it")
+    args = parser.parse_args()
+
+    run_migrations(engine)
+    if args.matching:
+        db = SessionLocal()
+        matching.ensure_loaded(db)
+        db.close()
+
+    start = time.perf_counter()
+    for _ in feed(min(args.count, 100_000), args.format):
+        pass
+    generate_rate = min(args.count, 100_000) / (time.perf_counter() - start)
+    print(f"feed generation alone: {generate_rate:,.0f} records/s (included in the numbers below)")
+
+    baseline = rss_mb()
+    summary, samples = run(args.count, args.format, args.batch_size)
+    print(
+        f"{args.format}, batch {args.batch_size}{', matching index loaded' if args.matching else ''}: "
+        f"{summary['received']:,} records in {summary['seconds']:.1f}s = {summary['jobs_per_second']:,} records/s"
+    )
+    print(f"  {summary['inserted']:,} inserted, {summary['duplicates']:,} duplicates, {summary['invalid']:,} invalid, {summary['batches']} batches")
+    print(f"  {'records read':>14} {'heap RSS MB':>12}  (before ingesting: {baseline:.0f} MB)")
+    for received, rss in samples:
+        print(f"  {received:>14,} {rss:>12.0f}")
+
+    # Re-sending the first tenth of the feed: every record is answered by the unique index
+    replay = max(1, args.count // 10)
+    summary, _ = run(replay, args.format, args.batch_size)
+    print(f"replay of the first {replay:,} records: {summary['inserted']} inserted, {summary['jobs_per_second']:,} records/s")
+
+    with engine.connect() as conn:
+        jobs = conn.execute(text("SELECT count(*) FROM jobs")).scalar()
+        searchable = conn.execute(text("SELECT count(*) FROM jobs_fts WHERE jobs_fts MATCH 'engineer'")).scalar()
+    print(f"jobs table: {jobs:,} rows, {searchable:,} of them found by full-text search, database {os.path.getsize(DB_PATH) / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
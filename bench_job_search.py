@@ -0,0 +1,94 @@
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Seeded into a throwaway SQLite file, never stitch.db
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from database import Base, SessionLocal, engine
+from models.job import Job
+from utils.pagination import encode_cursor, keyset_page
+from utils.search import ensure_search_index, keyword_filter
+
+LIMIT = 20
+REPEATS = 5
+WORDS = (
+    "python java react django kubernetes aws sql spark golang rust devops data backend frontend mobile "
+    "cloud security analytics platform api microservices testing design product manager senior junior"
+).split()
+CITIES = ["Remote", "Berlin", "London", "New York", "Karachi", "Lahore", "Toronto", "Austin"]
+
+
+def seed(count: int):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    start_time = datetime(2024, 1, 1)
+    conn = sqlite3.connect(DB_PATH)
+    batch = []
+    for i in range(count):
+        words = rng.sample(WORDS, 12)
+        batch.append((
+            f"{words[0].title()} {words[1].title()} Engineer",
+            f"Company {i % 5000}",
+            " ".join(words * 3),
+            rng.choice(CITIES),
+            (start_time + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+        ))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO jobs (title, company, description, location, created_at) VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO jobs (title, company, description, location, created_at) VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    ensure_search_index(engine)
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(count: int):
+    start = time.perf_counter()
+    seed(count)
+    print(f"seeded {count} jobs (+FTS index) in {time.perf_counter() - start:.1f}s")
+
+    db = SessionLocal()
+    depths = [0, 1_000, 10_000, 100_000, count - LIMIT]
+    print(f"{'rows skipped':>14} {'offset ms':>10} {'cursor ms':>10}")
+    for depth in depths:
+        if depth < 0 or depth >= count:
+            continue
+        offset_ms = timed(lambda: db.query(Job).order_by(Job.created_at.desc(), Job.id.desc()).offset(depth).limit(LIMIT).all())
+        cursor = None
+        if depth:
+            # Build the cursor for this depth outside of the timed section
+            row = db.execute(
+                Job.__table__.select().with_only_columns(Job.created_at, Job.id)
+                .order_by(Job.created_at.desc(), Job.id.desc()).offset(depth - 1).limit(1)
+            ).first()
+            cursor = encode_cursor(row.created_at.strftime("%Y-%m-%d %H:%M:%S"), row.id)
+        cursor_ms = timed(lambda: keyset_page(db.query(Job), Job.created_at, Job.id, cursor, LIMIT))
+        print(f"{depth:>14} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+        db.expunge_all()
+
+    search_ms = timed(lambda: keyset_page(
+        db.query(Job).filter(keyword_filter("sqlite", "kubernetes rust")), Job.created_at, Job.id, None, LIMIT
+    ))
+    print(f"keyword search 'kubernetes rust', first page: {search_ms:.2f}ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
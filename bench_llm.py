@@ -0,0 +1,48 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from utils.llm import FakeBackend, LLMClient
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.1"))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def main(requests: int):
+    backend = FakeBackend(latency=LATENCY, jitter=LATENCY / 4, error_rate=ERROR_RATE)
+    client = LLMClient(backend, max_concurrency=MAX_CONCURRENCY, base_delay=0.05, max_delay=1.0, deadline=30)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await client.generate("Say hello")
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    # Fire everything at once: the client's semaphore is what shapes the load
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{requests} calls, max_concurrency={MAX_CONCURRENCY}, latency={LATENCY}s, error_rate={ERROR_RATE}")
+    print(f"  elapsed={elapsed:.2f}s  throughput={requests / elapsed:.1f} req/s")
+    if latencies:
+        print(f"  p50={statistics.median(latencies):.0f}ms  p99={percentile(latencies, 99):.0f}ms")
+    print(f"  backend calls={backend.calls}  {client.stats()}  errors={errors}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS))
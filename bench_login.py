@@ -0,0 +1,102 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Seeded into a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+
+import httpx
+
+import main
+from utils.migrations import run_migrations
+from utils.passwords import password_hasher
+
+# The app's lifespan (which migrates) does not run under this client
+run_migrations(main.engine)
+
+DURATION = 5.0
+BROWSERS = 8
+LOGIN_CLIENTS = 16
+ACCOUNTS = 4
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def browse(client, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/user/profile", headers=headers)
+        assert response.status_code == 200, response.text
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def log_in(client, index, deadline, latencies, statuses):
+    # Each client comes from its own address; accounts are shared so the per-account cap engages
+    headers = {"X-Forwarded-For": f"10.0.0.{index}"}
+    data = {"username": f"user{index % ACCOUNTS}@example.com", "password": "correct horse"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/auth/login", data=data, headers=headers)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            await asyncio.sleep(0.05)
+
+
+async def scenario(client, headers, logins: bool):
+    deadline = time.perf_counter() + DURATION
+    browse_ms, login_ms, statuses = [], [], {}
+    tasks = [browse(client, headers, deadline, browse_ms) for _ in range(BROWSERS)]
+    if logins:
+        tasks += [log_in(client, i, deadline, login_ms, statuses) for i in range(LOGIN_CLIENTS)]
+    await asyncio.gather(*tasks)
+    return browse_ms, login_ms, statuses
+
+
+def report(label, browse_ms, login_ms, statuses):
+    print(
+        f"{label:<34} browse n={len(browse_ms):>5} p50={statistics.median(browse_ms):>7.1f}ms "
+        f"p95={percentile(browse_ms, 95):>7.1f}ms p99={percentile(browse_ms, 99):>7.1f}ms"
+    )
+    if login_ms or statuses:
+        print(
+            f"{'':<34} login  n={len(login_ms):>5} p50={statistics.median(login_ms) if login_ms else 0:>7.1f}ms "
+            f"p95={percentile(login_ms, 95):>7.1f}ms statuses={dict(sorted(statuses.items()))}"
+        )
+
+
+async def run(inline: bool):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(ACCOUNTS):
+            await client.post("/auth/signup", json={
+                "email": f"user{i}@example.com", "password": "correct horse", "full_name": f"User {i}",
+            })
+        token = (await client.post("/auth/login", data={
+            "username": "user0@example.com", "password": "correct horse",
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        if inline:
+            # What the handlers used to do: bcrypt straight on the request path
+            async def submit(fn, *args):
+                return fn(*args)
+            password_hasher._submit = submit
+
+        report("browse only", *await scenario(client, headers, logins=False))
+        mode = "inline bcrypt" if inline else "bcrypt executor"
+        report(f"browse + login burst ({mode})", *await scenario(client, headers, logins=True))
+        print(f"hasher: {password_hasher.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(inline="--inline" in sys.argv))
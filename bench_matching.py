@@ -0,0 +1,63 @@
+import random
+import statistics
+import sys
+import time
+
+from utils.matching import MatchingEngine
+
+QUERIES = 200
+
+SKILLS = (
+    "python java javascript typescript react angular vue node.js django flask fastapi spring kotlin swift go rust "
+    "c++ c# sql postgresql mysql mongodb redis kafka spark hadoop airflow docker kubernetes terraform aws azure gcp "
+    "linux git ci/cd jenkins graphql rest grpc pandas numpy pytorch tensorflow scikit-learn tableau excel figma "
+    "selenium cypress jest pytest agile scrum jira salesforce sap seo marketing accounting recruiting"
+).split()
+FILLER = (
+    "build maintain scalable services collaborate stakeholders deliver features design review mentor engineers "
+    "customers product quality testing deployment monitoring performance security data pipelines analytics"
+).split()
+
+
+def synthetic_text(rng: random.Random, words: int = 180) -> str:
+    chosen = rng.sample(SKILLS, 8)
+    return " ".join(rng.choice(chosen) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(words))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main(jobs_count: int):
+    rng = random.Random(42)
+    jobs = [(job_id, synthetic_text(rng), 1) for job_id in range(1, jobs_count + 1)]
+    engine = MatchingEngine()
+
+    start = time.perf_counter()
+    engine.build(jobs)
+    print(f"build: {jobs_count} jobs in {time.perf_counter() - start:.2f}s, nnz={len(engine.data)}")
+
+    resumes = [synthetic_text(rng, 400) for _ in range(QUERIES)]
+    latencies = []
+    for text in resumes:
+        start = time.perf_counter()
+        engine.rank(text, 10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"rank top-10: p50={statistics.median(latencies):.1f}ms p99={percentile(latencies, 99):.1f}ms")
+
+    start = time.perf_counter()
+    for job_id in range(jobs_count + 1, jobs_count + 1001):
+        engine.add(job_id, synthetic_text(rng))
+    print(f"incremental add: {(time.perf_counter() - start) * 1000 / 1000:.3f}ms/job")
+
+    latencies = []
+    for text in resumes:
+        start = time.perf_counter()
+        engine.rank(text, 10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"rank with {len(engine.delta)} uncompacted jobs: p50={statistics.median(latencies):.1f}ms p99={percentile(latencies, 99):.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
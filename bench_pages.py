@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Inline extraction so time and peak RSS are measured in this process, not a pool worker
+os.environ["EXTRACTION_USE_POOL"] = "0"
+os.environ.setdefault("EXTRACTION_CACHE_DIR", tempfile.mkdtemp())
+
+PAGE_COUNTS = [1, 10, 50, 100, 200]
+MODES = ["full", "lazy", "cached"]
+LINE = "Led a team of five engineers building Python and Kubernetes services for payments. "
+
+
+def make_pdf(pages: int, path: str):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {i + 1}\nExperience\n" + LINE * 40, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def measure(mode: str, path: str):
+    import fitz  # noqa: F401  (keep the import cost out of the timing)
+    from utils import documents, extraction
+
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    if mode == "cached":
+        # Populate the on-disk cache first, then time a cold-process read of it
+        asyncio.run(documents.get_document(path, sha256, max_pages=1000))
+        documents.document_cache.clear()
+
+    start = time.perf_counter()
+    if mode == "full":
+        # The old behaviour: every page, no budget, plain text only
+        pages = extraction.extract_pages(path, max_pages=1000)
+    else:
+        document = asyncio.run(documents.get_document(path, sha256, max_pages=1000))
+        pages = document.pages
+    elapsed = (time.perf_counter() - start) * 1000
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"ms": elapsed, "pages": len(pages), "peak_mb": peak_mb}))
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    print(f"text budget {int(os.getenv('EXTRACTION_TEXT_BUDGET', '60000'))} chars, one fresh process per cell")
+    print(f"{'pdf pages':>9} " + " ".join(f"{mode + ' ms':>10} {'pages':>5} {'peak MB':>8}" for mode in MODES))
+    for count in PAGE_COUNTS:
+        path = os.path.join(workdir, f"{count}.pdf")
+        make_pdf(count, path)
+        cells = []
+        for mode in MODES:
+            cache_dir = tempfile.mkdtemp()
+            output = subprocess.run(
+                [sys.executable, __file__, "--one", mode, path],
+                capture_output=True, text=True, check=True,
+                env={**os.environ, "EXTRACTION_CACHE_DIR": cache_dir},
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            cells.append(f"{result['ms']:>10.1f} {result['pages']:>5} {result['peak_mb']:>8.1f}")
+        print(f"{count:>9} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--one":
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,45 @@
+import random
+import statistics
+import sys
+import time
+
+from utils.skills import ALIASES, score_resume
+
+FILLER = (
+    "designed implemented delivered maintained improved reduced latency customers team project platform "
+    "responsible for building features across the stack and collaborating with product and design partners "
+    "university bachelor degree computer science graduated honors volunteer award certification"
+).split()
+
+
+def synthetic_resume(rng: random.Random, words: int = 700) -> str:
+    aliases = rng.sample(sorted(ALIASES), 25)
+    lines = ["Jane Doe", "Software Engineer"]
+    line = []
+    for _ in range(words):
+        line.append(rng.choice(aliases) if rng.random() < 0.08 else rng.choice(FILLER))
+        if len(line) == 12:
+            lines.append(" ".join(line))
+            line = []
+    return "\n".join(lines)
+
+
+def main(count: int):
+    rng = random.Random(3)
+    resumes = [synthetic_resume(rng) for _ in range(count)]
+    jobs = [synthetic_resume(rng, 250) for _ in range(count)]
+
+    latencies = []
+    for resume_text, job_description in zip(resumes, jobs):
+        start = time.perf_counter()
+        score_resume(resume_text, job_description)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    print(f"{count} synthetic resumes (~700 words) vs job descriptions (~250 words)")
+    print(f"  score_resume p50={statistics.median(latencies):.2f}ms "
+          f"p99={latencies[int(0.99 * (len(latencies) - 1))]:.2f}ms max={latencies[-1]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,101 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Modules that must not be imported just to start serving
+HEAVY_MODULES = ("google.generativeai", "fitz", "pymupdf", "numpy", "grpc")
+
+
+def _env(**overrides):
+    # Every run gets its own throwaway SQLite file, never stitch.db
+    env = {**os.environ, "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")}
+    env.update(overrides)
+    return env
+
+
+def import_profile(module: str = "main", **env):
+    # `python -X importtime -c "import main"` in a fresh interpreter.
+    # Returns (total ms, {module: (self ms, cumulative ms)}, heavy modules that got imported).
+    # A module set up by utils.lazy stays a _LazyModule until first use, so only count real ones
+    code = (
+        f"import sys, types; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if type(sys.modules.get(m)) is types.ModuleType))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=_env(**env), capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not self_us.isdigit():
+            continue
+        modules[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    output = result.stdout.strip().splitlines()
+    loaded = [name for name in output[-1].split(",") if name] if output else []
+    return modules.get(module, (0.0, 0.0))[1], modules, loaded
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(timeout: float = 30.0, **env) -> float:
+    # Wall time from launching uvicorn to the first 200 from GET /, in milliseconds
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(**env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        raise TimeoutError(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-response of the API.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, modules, loaded = import_profile()
+        totals.append(total)
+    print(f"import main: median {statistics.median(totals):.0f}ms over {args.runs} runs (last run below)")
+    print(f"heavy modules imported at startup: {', '.join(loaded) or 'none'}")
+    print(f"{'self ms':>8} {'cum ms':>8}  module (top {args.top} by self time)")
+    for name, (self_ms, cumulative_ms) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_ms:>8.1f} {cumulative_ms:>8.1f}  {name}")
+
+    print()
+    for label, env in (("with migrations", {"RUN_MIGRATIONS": "1"}), ("RUN_MIGRATIONS=0", {"RUN_MIGRATIONS": "0"})):
+        samples = [time_to_first_response(**env) for _ in range(args.runs)]
+        print(f"time to first response ({label}): median {statistics.median(samples):.0f}ms, max {max(samples):.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+import httpx
+
+from bench_startup import ROOT, _free_port
+
+# Requests/second of the gunicorn deployment (gunicorn.conf.py) at 1, 2 and 4 workers,
+# each against its own throwaway database and shared-state file, with the fake LLM backend.
+# Note the load generator runs on the same machine: on a box with few cores it competes
+# with the workers, so compare the scaling between runs rather than the absolute numbers.
+
+RESUME = (
+    "Jane Roe\njane.roe@example.com\nExperience\n"
+    + "Built Python and React services with SQL and Docker for payments teams. " * 6
+    + "\nEducation\nBSc Computer Science\nSkills\nPython, SQL, Docker"
+)
+JOB = "Backend engineer: Python, FastAPI, SQL, Docker, cloud experience."
+
+
+def make_pdf(variant: int) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 540, 770), f"{RESUME}\nReference {variant}", fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def start_server(workers: int, port: int, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "DATABASE_URL": "sqlite:///" + os.path.join(workdir, "bench.db"),
+        "SHARED_STATE_URL": "sqlite:///" + os.path.join(workdir, "shared_state.db") if workers > 1 else "memory://",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "EXTRACTION_CACHE_DIR": os.path.join(workdir, "extracted"),
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": os.getenv("FAKE_LLM_LATENCY", "0.3"),
+        "LLM_PRELOAD": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError("server did not come up")
+
+
+async def load(client: httpx.AsyncClient, request, concurrency: int, duration: float):
+    # Closed loop: `concurrency` clients, each sending its next request as soon as the last returns
+    done = 0
+    errors = 0
+    stop = time.perf_counter() + duration
+
+    async def user(index: int):
+        nonlocal done, errors
+        sent = 0
+        while time.perf_counter() < stop:
+            response = await request(client, index, sent)
+            sent += 1
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    return done / (time.perf_counter() - start), errors
+
+
+async def bench(workers: int, concurrency: int, duration: float, pdfs):
+    port = _free_port()
+    workdir = tempfile.mkdtemp()
+    process = start_server(workers, port, workdir)
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client, process)
+            account = {"email": "bench@example.com", "password": "pw", "full_name": "Bench"}
+            await client.post("/auth/signup", json=account)
+            login = await client.post("/auth/login", data={"username": account["email"], "password": account["password"]})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            async def profile(client, index, sent):
+                return await client.get("/user/profile", headers=headers)
+
+            async def analyze(client, index, sent):
+                # A small pool of resumes: the first request for each pays for the LLM call,
+                # the rest are answered from the analysis cache, whichever worker gets them
+                pdf = pdfs[(index + sent) % len(pdfs)]
+                return await client.post(
+                    "/resume/analyze-match", headers=headers,
+                    files={"file": ("resume.pdf", pdf, "application/pdf")}, data={"job_description": JOB},
+                )
+
+            results = {}
+            for name, request in (("profile", profile), ("analyze", analyze)):
+                # Untimed round first: every worker starts its extraction pool and fills its caches
+                await load(client, request, concurrency, min(3.0, duration))
+                results[name] = await load(client, request, concurrency, duration)
+            return results
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the gunicorn deployment at several worker counts.")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--resumes", type=int, default=8)
+    args = parser.parse_args()
+
+    pdfs = [make_pdf(variant) for variant in range(args.resumes)]
+    print(f"{os.cpu_count()} cores, {args.concurrency} concurrent clients, {args.duration:.0f}s per scenario")
+    print(f"{'workers':>7} {'profile req/s':>14} {'analyze req/s':>14} {'errors':>7}")
+    for workers in [int(value) for value in args.workers.split(",")]:
+        results = asyncio.run(bench(workers, args.concurrency, args.duration, pdfs))
+        errors = sum(error for _, error in results.values())
+        print(f"{workers:>7} {results['profile'][0]:>14.0f} {results['analyze'][0]:>14.0f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
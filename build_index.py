@@ -0,0 +1,32 @@
+import argparse
+import time
+
+from database import SessionLocal
+from utils import matching
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the on-disk job matching index.")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the existing index and rebuild from the jobs table")
+    parser.add_argument("--path", default=matching.INDEX_DIR, help="index directory (default: MATCHING_INDEX_DIR)")
+    args = parser.parse_args()
+
+    engine = matching.MatchingEngine(path=args.path)
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        if args.rebuild or not engine.exists():
+            print(f"Rebuilding matching index at {args.path}...")
+            matching.rebuild(db, engine)
+        else:
+            print(f"Updating matching index at {args.path}...")
+            matching.ensure_loaded(db, engine)
+            # Fold the journal into a fresh compacted segment
+            engine.save()
+    finally:
+        db.close()
+    print(f"Indexed {len(engine)} jobs in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,127 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-import os
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
-
-if SQLALCHEMY_DATABASE_URL:
-    # Heroku and Render sometimes provide 'postgres://' but SQLAlchemy requires 'postgresql://'
-    if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-        SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-else:
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'stitch.db')}"
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base = declarative_base()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.concurrency import run_in_threadpool
+
+import os
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+
+if SQLALCHEMY_DATABASE_URL:
+    # Heroku and Render sometimes provide 'postgres://' but SQLAlchemy requires 'postgresql://'
+    if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+        SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'stitch.db')}"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Render's Postgres drops idle connections; recycle before that and ping on checkout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# "1" routes run_db through AsyncSession (needs aiosqlite or asyncpg installed)
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run while a write is in progress; NORMAL is durable in WAL mode
+    # except for the last transactions on power loss, which is fine for this app
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            # One shared in-memory database; a pool would hand out empty ones
+            return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    return options
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    db_engine = create_engine(url, **_engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def async_database_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {scheme}")
+    return f"{driver}://{rest}"
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = async_database_url(url)
+    options = _engine_options(url)
+    options.pop("connect_args", None)
+    db_engine = create_async_engine(async_url, **options)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine()
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database sessions are disabled, set DB_ASYNC=1")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _run_with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def run_db(fn, *args):
+    # Runs fn(session, *args) without blocking the event loop: through AsyncSession.run_sync
+    # on the async driver when DB_ASYNC is on, otherwise on a threadpool thread
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args)
+    return await run_in_threadpool(_run_with_session, fn, *args)
@@ -0,0 +1,57 @@
+import os
+
+# gunicorn -c gunicorn.conf.py main:app
+# One master, WEB_CONCURRENCY uvicorn workers. Anything a worker would otherwise keep to
+# itself (analysis cache, LLM concurrency slots, sign-in limits, user cache invalidations,
+# async task status) goes through utils.shared_state, which this file points at a SQLite
+# file on the local disk unless SHARED_STATE_URL says otherwise (e.g. redis:// across hosts).
+
+
+def _cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Render and Heroku set WEB_CONCURRENCY; otherwise one worker per core available to us
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cores())))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app once in the master and fork: workers start faster and share its pages
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+# An analysis can legitimately run for LLM_DEADLINE (60s) plus extraction
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers after this many requests (0 = never), jittered so they do not all restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+# TracingMiddleware already logs every request as JSON
+accesslog = None
+
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_URL", "sqlite:///" + os.path.join("data", "shared_state.db"))
+    # Every worker has its own PDF extraction pool; split the cores between them
+    os.environ.setdefault("EXTRACTION_WORKERS", str(max(1, _cores() // workers)))
+
+# Migrate once in the master instead of racing in every worker's lifespan. This file is
+# read before the app is imported, so the workers (and a preloaded app) see RUN_MIGRATIONS=0.
+_migrate = os.getenv("RUN_MIGRATIONS", "1") != "0"
+os.environ["RUN_MIGRATIONS"] = "0"
+
+
+def on_starting(server):
+    if _migrate:
+        from database import engine
+        from utils.migrations import run_migrations
+
+        run_migrations(engine)
+        engine.dispose()
+
+
+def post_fork(server, worker):
+    # Never share pooled connections the master may have opened with a forked child
+    from database import engine
+
+    engine.dispose(close=False)
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+
+from database import SessionLocal, engine
+from utils import ingest, matching
+from utils.migrations import run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load an NDJSON or CSV job feed into the jobs table.")
+    parser.add_argument("feed", help="path to the feed, or - for stdin")
+    parser.add_argument("--format", choices=ingest.FORMATS, help="default: from the file extension (ndjson for stdin)")
+    parser.add_argument("--batch-size", type=int, default=ingest.INGEST_BATCH_SIZE, help="records per INSERT transaction")
+    parser.add_argument(
+        "--update-index", action="store_true",
+        help="fold the new jobs into the on-disk matching index afterwards (otherwise the server does it when it next loads the index)",
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.feed == "-" else ingest.feed_format(filename=args.feed))
+    if fmt is None:
+        parser.error(f"cannot tell the format of {args.feed}, pass --format")
+
+    run_migrations(engine)
+    db = SessionLocal()
+    feed = sys.stdin.buffer if args.feed == "-" else open(args.feed, "rb")
+    start = time.perf_counter()
+
+    def progress(report):
+        rate = report.received / (time.perf_counter() - start)
+        print(f"  {report.received:>10} read, {report.inserted:>10} inserted ({rate:,.0f}/s)", file=sys.stderr)
+
+    try:
+        report = ingest.ingest(db, ingest.read_chunks(feed), fmt, args.batch_size, on_batch=progress)
+        summary = report.summary()
+        print(
+            f"{summary['received']} records in {summary['seconds']:.1f}s: {summary['inserted']} inserted, "
+            f"{summary['duplicates']} duplicates, {summary['invalid']} invalid"
+        )
+        for error in summary["errors"]:
+            print(f"  line {error['line']}: {error['error']}")
+
+        if args.update_index:
+            index = matching.MatchingEngine(path=matching.INDEX_DIR)
+            if index.exists():
+                # Loading catches up with jobs added, edited or deleted since; saving compacts them in
+                matching.ensure_loaded(db, index)
+                index.save()
+                print(f"Matching index now has {len(index)} jobs.")
+            else:
+                print("No matching index on disk yet; build_index.py builds one.")
+    finally:
+        if feed is not sys.stdin.buffer:
+            feed.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,46 @@
+import asyncio
+import os
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import auth, user, resume, jobs, applications, settings
+from starlette.concurrency import run_in_threadpool
+from database import engine
+from routers import auth, user, resume, jobs, applications, settings, admin
+from utils import extraction
+from utils.passwords import password_hasher
+from utils.uploads import UPLOAD_FORM_OVERHEAD, UploadSizeLimit
+from utils.llm import init_llm_client
+from utils.migrations import run_migrations
+from utils.analysis_queue import analysis_queue
+from utils.logs import configure_logging
+from utils.metrics import registry
+from utils.tracing import TracingMiddleware
 
-Base.metadata.create_all(bind=engine)
+# RUN_MIGRATIONS=0 when `python migrate_db.py` runs as a separate deploy step
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") != "0"
+# Import the LLM SDK in the background once the server is up instead of on the first analysis
+LLM_PRELOAD = os.getenv("LLM_PRELOAD", "1") != "0"
 
-app = FastAPI(title="Stitch Job Website API")
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if RUN_MIGRATIONS:
+        await run_in_threadpool(run_migrations, engine)
+    llm = init_llm_client()
+    await analysis_queue.start()
+    warm_up = asyncio.create_task(llm.warm_up()) if LLM_PRELOAD else None
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    await analysis_queue.stop()
+    extraction.shutdown()
+    password_hasher.shutdown()
+
+app = FastAPI(title="Stitch Job Website API", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -18,25 +52,47 @@ origins = [
     "https://resume-scorer-topaz.vercel.app",
 ]
 
+# Single-file upload endpoints; analyze-batch takes many files and gets the batch budget.
+# Added before CORS so they sit inside it and their 413s still carry the CORS headers.
+app.add_middleware(UploadSizeLimit, paths=["/resume/analyze-match", "/resume/analyze-async", "/resume/upload"])
+app.add_middleware(UploadSizeLimit, paths=["/resume/analyze-batch"], max_bytes=resume.BATCH_MAX_BYTES + UPLOAD_FORM_OVERHEAD)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Readable by the dashboard: pagination and conditional-request headers of the list endpoints
+    expose_headers=["ETag", "X-Next-Cursor", "Link"],
 )
 
+# Added last so it is outermost: times the whole request, including the other middleware
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(StaleDataError)
+async def stale_data(request: Request, exc: StaleDataError):
+    # Rows with a version column are updated with "WHERE version = <the version read>", so
+    # a request that lost a race with another write to the same row matches nothing
+    return JSONResponse(status_code=409, content={"detail": "The resource was modified by another request, please retry."})
+
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(resume.router)
 app.include_router(jobs.router)
 app.include_router(applications.router)
 app.include_router(settings.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Stitch API"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus scrape endpoint
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
@@ -1,29 +1,21 @@
-import sqlite3
-import os
+import sys
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-db_path = os.path.join(BASE_DIR, 'stitch.db')
+from database import SQLALCHEMY_DATABASE_URL, engine
+from utils.migrations import MIGRATIONS, applied_versions, run_migrations
 
 def migrate():
-    print(f"Migrating database at {db_path}...")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    columns_to_add = [
-        ("candidate_name", "TEXT"),
-        ("recommended_fields", "JSON")
-    ]
-    
-    for column_name, column_type in columns_to_add:
-        try:
-            cursor.execute(f"ALTER TABLE resumes ADD COLUMN {column_name} {column_type}")
-            print(f"Added column: {column_name}")
-        except sqlite3.OperationalError:
-            print(f"Column {column_name} already exists.")
-            
-    conn.commit()
-    conn.close()
-    print("Migration complete.")
+    print(f"Migrating database at {SQLALCHEMY_DATABASE_URL.split('@')[-1]}...")
+    applied = run_migrations(engine)
+    print(f"Migration complete, {len(applied)} applied.")
+
+def status():
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:>4} {name:<32} {'applied' if version in done else 'pending'}")
 
 if __name__ == "__main__":
-    migrate()
+    if "--status" in sys.argv:
+        status()
+    else:
+        migrate()
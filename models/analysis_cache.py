@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, Float, JSON
+from database import Base
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    key = Column(String(64), primary_key=True)
+    model_name = Column(String, nullable=True)
+    prompt_version = Column(String, nullable=True)
+    result = Column(JSON, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Float, Integer, String, DateTime, ForeignKey, Text, JSON, LargeBinary, func
+from database import Base
+
+class AnalysisTask(Base):
+    __tablename__ = "analysis_tasks"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    status = Column(String, default="queued", index=True)
+    stage = Column(String, nullable=True)
+    progress = Column(Integer, default=0)
+    filename = Column(String, nullable=True)
+    job_description = Column(Text, nullable=False)
+    upload_sha256 = Column(String(64), nullable=True)
+    # Only set on tasks queued before uploads were kept in the upload store
+    payload = Column(LargeBinary, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=True)
+    # The worker running the task and until when (unix time) its claim holds; it renews the
+    # lease while the task runs, so only tasks of a worker that died are ever recovered
+    owner = Column(String(64), nullable=True)
+    lease_until = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        Index("ix_applications_user_id_job_id", "user_id", "job_id"),
+        # Keyset pagination order for GET /applications/
+        Index("ix_applications_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -11,6 +16,10 @@ class Application(Base):
     status = Column(String, default="Applied")
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by the ORM on every UPDATE; list endpoints build their ETags from it
+    version = Column(Integer, nullable=False, server_default="1")
 
     user = relationship("User", backref="applications")
     job = relationship("Job", backref="applications")
+
+    __mapper_args__ = {"version_id_col": version}
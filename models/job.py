@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, func
 from database import Base
 
 class Job(Base):
@@ -10,3 +10,15 @@ class Job(Base):
     description = Column(Text, nullable=False)
     location = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by the ORM on every UPDATE; list endpoints build their ETags from it
+    version = Column(Integer, nullable=False, server_default="1")
+    # sha256 of the normalized title/company/location/description; bulk ingestion skips
+    # records whose hash is already taken (see utils/ingest.py)
+    content_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination order for /jobs/search
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ux_jobs_content_hash", "content_hash", unique=True),
+    )
+    __mapper_args__ = {"version_id_col": version}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Float, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Float, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -13,5 +13,12 @@ class Resume(Base):
     recommended_fields = Column(JSON, nullable=True)
     score = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by the ORM on every UPDATE; list endpoints build their ETags from it
+    version = Column(Integer, nullable=False, server_default="1")
 
     user = relationship("User", backref="resumes")
+
+    __mapper_args__ = {"version_id_col": version}
+
+# Serves "latest resumes for a user" without a sort step
+Index("ix_resumes_user_id_created_at", Resume.user_id, Resume.created_at.desc(), Resume.id.desc())
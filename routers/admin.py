@@ -0,0 +1,43 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from utils.llm import get_llm_client
+from utils.user_cache import Principal
+from .auth import get_current_principal
+
+# Comma-separated emails allowed to use the /admin endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+)
+
+def get_admin(current_user: Principal = Depends(get_current_principal)):
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+def _router():
+    llm_router = get_llm_client().router
+    if llm_router is None:
+        raise HTTPException(status_code=404, detail="Model routing is not enabled")
+    return llm_router
+
+@router.get("/models")
+def get_model_routing(admin: Principal = Depends(get_admin)):
+    return _router().stats()
+
+@router.post("/models/reset")
+def reset_all_models(admin: Principal = Depends(get_admin)):
+    llm_router = _router()
+    llm_router.reset()
+    return llm_router.stats()
+
+@router.post("/models/{model_name}/reset")
+def reset_model(model_name: str, admin: Principal = Depends(get_admin)):
+    llm_router = _router()
+    if not llm_router.reset(model_name):
+        raise HTTPException(status_code=404, detail="Unknown model")
+    return llm_router.stats()
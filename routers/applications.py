@@ -1,21 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional, Union
 from database import get_db
 from models import application as models
 from models import job as job_models
 from schemas import application as schemas
-from .auth import get_current_user
+from .auth import get_current_principal, get_current_user
 from models.user import User
+from utils.listing import list_page, list_response, parse_fields
+from utils.user_cache import Principal
 
 router = APIRouter(
     prefix="/applications",
     tags=["applications"],
 )
 
-@router.get("/", response_model=List[schemas.ApplicationResponse])
-def get_applications(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Application).filter(models.Application.user_id == current_user.id).all()
+def status_counts(db: Session, user_id: int) -> dict:
+    # One GROUP BY instead of counting the pages client-side
+    rows = (
+        db.query(models.Application.status, func.count(models.Application.id))
+        .filter(models.Application.user_id == user_id)
+        .group_by(models.Application.status)
+        .all()
+    )
+    return {status or "Unknown": count for status, count in rows}
+
+@router.get("/", response_model=Union[List[schemas.ApplicationResponse], schemas.ApplicationsDetailed])
+def get_applications(
+    request: Request,
+    view: Literal["list", "detailed"] = Query(
+        "list", description="detailed: each application with its job, plus counts per status"
+    ),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,status"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    # Newest first; the next page is in X-Next-Cursor / Link
+    if view == "list":
+        query = db.query(models.Application.version).filter(models.Application.user_id == current_user.id)
+        return list_response(
+            request, query, models.Application, schemas.ApplicationResponse,
+            cursor=cursor, limit=limit, fields=parse_fields(fields, schemas.ApplicationResponse),
+        )
+
+    # The job's version is part of the ETag too, since its title/company are embedded
+    query = (
+        db.query(models.Application.version, job_models.Job.version)
+        .outerjoin(job_models.Job, models.Application.job_id == job_models.Job.id)
+        .filter(models.Application.user_id == current_user.id)
+    )
+    counts = status_counts(db, current_user.id)
+    items, headers = list_page(
+        request, query, models.Application, schemas.ApplicationWithJob,
+        cursor=cursor, limit=limit, fields=parse_fields(fields, schemas.ApplicationWithJob),
+        related={"job": schemas.ApplicationJob}, etag_extra=sorted(counts.items()),
+    )
+    if items is None:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(
+        {"items": items, "counts": counts, "total": sum(counts.values()), "next_cursor": headers.get("X-Next-Cursor")},
+        headers=headers,
+    )
 
 @router.post("/", response_model=schemas.ApplicationResponse)
 def create_application(
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import timedelta
@@ -7,6 +9,9 @@ from database import get_db
 from models import user as models
 from schemas import user as schemas
 from utils import security
+from utils.passwords import HasherBusy, TooManyAttempts, login_limiter, password_hasher
+from utils.tracing import span
+from utils.user_cache import Principal, user_cache
 
 router = APIRouter(
     prefix="/auth",
@@ -15,13 +20,21 @@ router = APIRouter(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-@router.post("/signup", response_model=schemas.UserResponse)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    hashed_password = security.get_password_hash(user.password)
+# Proxies in front of the app that append the address they saw to X-Forwarded-For (Render's
+# load balancer is one). Entries left of theirs come from the client and can say anything.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+def _client_ip(request: Request) -> str:
+    hops = [hop.strip() for header in request.headers.getlist("x-forwarded-for") for hop in header.split(",")]
+    hops = [hop for hop in hops if hop]
+    if TRUSTED_PROXY_HOPS > 0 and len(hops) >= TRUSTED_PROXY_HOPS:
+        return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+def _find_user(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def _create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -35,10 +48,43 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
+def _update_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+@router.post("/signup", response_model=schemas.UserResponse)
+async def signup(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
+    try:
+        async with login_limiter.limit(ip=_client_ip(request), account=user.email.lower()):
+            if await run_in_threadpool(_find_user, db, user.email):
+                raise HTTPException(status_code=400, detail="Email already registered")
+            hashed_password = await password_hasher.hash(user.password)
+    except TooManyAttempts as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    db_user = await run_in_threadpool(_create_user, db, user, hashed_password)
+    await run_in_threadpool(user_cache.invalidate, db_user.id)
+    return db_user
+
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    try:
+        async with login_limiter.limit(ip=_client_ip(request), account=form_data.username.lower()):
+            user = await run_in_threadpool(_find_user, db, form_data.username)
+            valid = await password_hasher.verify(form_data.password, user.hashed_password if user else None)
+            if valid and security.needs_rehash(user.hashed_password):
+                # The configured cost changed since this hash was made; upgrade it while we have the password
+                new_hash = await password_hasher.hash(form_data.password)
+                await run_in_threadpool(_update_password_hash, db, user, new_hash)
+                password_hasher.rehashes += 1
+    except TooManyAttempts as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -47,28 +93,55 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> dict:
     try:
         payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except security.JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+async def _load_user(token: str, db: Session):
+    payload = _decode_token(token)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = await user_cache.get(db, user_id)
+        if user is not None:
+            return user
+        user = await run_in_threadpool(db.get, models.User, user_id)
+    else:
+        # Tokens issued before "uid" was added only carry the email
+        user = await run_in_threadpool(_find_user, db, payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.put(user)
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    with span("auth"):
+        return await _load_user(token, db)
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # For endpoints that only need the caller's id: no users table lookup at all
+    with span("auth"):
+        payload = _decode_token(token)
+        if payload.get("uid") is None:
+            user = await _load_user(token, db)
+            return Principal(user.id, user.email)
+        return Principal(payload["uid"], payload["sub"])
+
 @router.get("/me", response_model=schemas.UserResponse)
 def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
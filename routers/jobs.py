@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from database import get_db
 from models import job as models
+from models.resume import Resume
 from schemas import job as schemas
+from .admin import get_admin
 from .auth import get_current_user
 from models.user import User
+from utils import documents, extraction, ingest, matching, skills, uploads
+from utils.listing import list_response, parse_fields
+from utils.logs import get_logger
+from utils.pagination import keyset_page
+from utils.search import keyword_filter
+from utils.user_cache import Principal
+
+logger = get_logger(__name__)
 
 router = APIRouter(
     prefix="/jobs",
@@ -13,20 +25,127 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.JobResponse])
-def get_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    jobs = db.query(models.Job).offset(skip).limit(limit).all()
-    return jobs
-
-@router.get("/match")
-def get_matched_jobs(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Mock matching logic
-    jobs = db.query(models.Job).limit(5).all()
+def get_jobs(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,company"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Use the cursor from X-Next-Cursor / Link instead"),
+    db: Session = Depends(get_db),
+):
+    # Newest first with keyset pagination (the next page is in X-Next-Cursor / Link).
+    # skip still pages through the same order for older clients, at OFFSET's cost.
+    if skip and cursor:
+        raise HTTPException(status_code=400, detail="Pass either cursor or skip, not both")
+    response = list_response(
+        request, db.query(models.Job.version), models.Job, schemas.JobResponse,
+        cursor=cursor, limit=limit, fields=parse_fields(fields, schemas.JobResponse), offset=skip,
+    )
+    if skip:
+        response.headers["Deprecation"] = "true"
+    return response
+
+@router.get("/search", response_model=schemas.JobSearchResponse)
+def search_jobs(
+    q: Optional[str] = None,
+    location: Optional[str] = None,
+    company: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    query = db.query(models.Job)
+    if q:
+        keywords = keyword_filter(db.get_bind().dialect.name, q)
+        if keywords is not None:
+            query = query.filter(keywords)
+    if location:
+        query = query.filter(models.Job.location.ilike(f"%{location}%"))
+    if company:
+        query = query.filter(models.Job.company == company)
+
+    items, next_cursor = keyset_page(query, models.Job.created_at, models.Job.id, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.post("/bulk")
+async def bulk_ingest_jobs(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description="Defaults to the Content-Type (application/x-ndjson or text/csv)"),
+    batch_size: int = Query(ingest.INGEST_BATCH_SIZE, ge=1, le=50_000),
+    admin: Principal = Depends(get_admin),
+    db: Session = Depends(get_db),
+):
+    # The raw request body is a job feed: one JSON object per line, or CSV with a
+    # title,company,description,location header. It is parsed and inserted batch by batch
+    # as it arrives, so the feed is never held in memory whatever its size.
+    fmt = format or ingest.feed_format(content_type=request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv, or pass ?format=ndjson|csv")
+
+    body = request.stream()
+
+    async def next_chunk():
+        return await body.__anext__()
+
+    def chunks():
+        # Runs on the worker thread; each chunk is awaited on the event loop
+        while True:
+            try:
+                yield from_thread.run(next_chunk)
+            except StopAsyncIteration:
+                return
+
+    report = await run_in_threadpool(ingest.ingest, db, chunks(), fmt, batch_size)
+    return report.summary()
+
+def _extracted_text(resume: Resume) -> Optional[str]:
+    # The stored upload's pages (cached by hash); None for resumes saved before files were kept
+    stored = uploads.from_url(resume.file_path)
+    if stored is None:
+        return None
+    try:
+        return from_thread.run(documents.get_document, stored.path, stored.sha256).text
+    except extraction.ExtractionError as e:
+        logger.warning("Extraction error for resume %s: %s", resume.id, e)
+        return None
+
+@router.get("/match", response_model=List[schemas.JobMatch])
+def get_matched_jobs(
+    limit: int = Query(5, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    engine = matching.ensure_loaded(db)
+
+    # Match against the text of the latest resume, falling back to its stored analysis (older
+    # resumes kept no file) and then to the profile's target role
+    latest = (
+        db.query(Resume).filter(Resume.user_id == current_user.id)
+        .order_by(Resume.created_at.desc(), Resume.id.desc()).first()
+    )
+    profile_text = matching.resume_text([current_user.career_role, current_user.experience_level])
+    candidate_text = profile_text
+    if latest:
+        extracted = _extracted_text(latest)
+        if extracted is not None:
+            candidate_text = matching.resume_text([extracted, profile_text])
+        else:
+            candidate_text = matching.resume_text([latest.parsed_data, latest.recommended_fields, profile_text])
+
+    ranked = engine.rank(candidate_text, limit)
+    jobs = {job.id: job for job in db.query(models.Job).filter(models.Job.id.in_([job_id for job_id, _ in ranked]))}
     results = []
-    for job in jobs:
+    for job_id, score in ranked:
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        text = matching.job_text(job.title, job.description)
+        # Prefer real skills from the taxonomy, otherwise the job's most distinctive missing terms
+        missing = skills.score_resume(candidate_text, text)["missingSkills"] or engine.missing_terms(text, candidate_text)
         results.append({
             "job": job,
-            "match_percentage": 95,
-            "missing_skills": ["Kubernetes"]
+            "match_percentage": round(score * 100),
+            "missing_skills": missing[:5]
         })
     return results
 
@@ -1,180 +1,599 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 import os
 import re
-import fitz  # PyMuPDF
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-from database import get_db
+import asyncio
+import hashlib
+import time
+import zipfile
+import zlib
+import textwrap
+from functools import partial
+from starlette.concurrency import run_in_threadpool
+from database import get_db, run_db
 from models import resume as models
 from schemas import resume as schemas
-from .auth import get_current_user
+from utils.passwords import login_limiter, password_hasher
+from utils.user_cache import Principal, user_cache
+from .admin import get_admin
+from .auth import get_current_principal, get_current_user
 from models.user import User
+from utils.cache import analysis_cache, analysis_cache_key
+from utils.shared_state import shared_state
+from utils import documents
+from utils import extraction
+from utils import llm_output
+from utils import preflight
+from utils.llm_output import output_stats
+from utils.preflight import preflight_stats
+from utils import uploads
+from utils.uploads import StoredUpload, UploadTooLarge, upload_store
+from utils.llm import get_llm_client
+from utils import skills
+from utils import text_prep
+from utils.analysis_queue import analysis_queue, QueueFull, FINISHED
+from utils.listing import list_response, parse_fields
+from utils.logs import get_logger
+from utils.tracing import span
 
-load_dotenv()
+# Bump whenever the prompt below changes so cached analyses are not reused
+PROMPT_VERSION = "3"
+# ANALYSIS_MODE=local skips the LLM and serves the deterministic skill scorer only
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "llm").lower()
 
-# Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+# Total uncompressed size of all PDFs in one batch, zip members counted by their declared size
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+# Keep this below LLM_MAX_CONCURRENCY so interactive analyze-match calls always get a slot
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+_batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+logger = get_logger(__name__)
 
 router = APIRouter(
     prefix="/resume",
     tags=["resume"],
 )
 
+# Dedented once at import: the old inline f-string sent ~8 spaces of indentation per line
+ANALYSIS_PROMPT = textwrap.dedent("""\
+    You are an expert HR Specialist and ATS Optimizer. Your task is to analyze the provided document.
+
+    1. If the document is a Resume:
+       - Compare it against the provided Job Description.
+       - Extract the Candidate's Full Name.
+       - Calculate a Match Rate (0-100) and an Overall Suitability Score (0-100).
+       - Identify 3 major strengths and 3 gaps.
+       - Suggest 3 career fields or roles that best suit this candidate based on their background.
+       - Provide a detailed breakdown in 3 categories (e.g., Skills, Experience, Formatting).
+       - Provide a helpful overall feedback summary.
+
+    2. If the document is NOT a Resume:
+       - Extract a name if any name-like entity is present.
+       - Return scores of 0.
+       - In the 'feedback', explicitly state that the uploaded document does not appear to be a professional resume.
+       - Still try to suggest what career fields might suit someone based on any text found.
+
+    3. OUTPUT FORMAT:
+       - You MUST return a STRICT JSON object with these EXACT keys:
+         "candidateName" (string), "matchRate" (integer), "score" (integer), "strengths" (list of strings),
+         "gaps" (list of strings), "detailedBreakdown" (list of objects with "category", "score", "comment"),
+         "recommendedFields" (list of strings), "feedback" (string).
+    {facts}
+    Job Description:
+    {job_description}
+
+    Uploaded Document Text:
+    {resume_text}
+    """)
+
+def _format_facts(facts: Optional[dict]) -> str:
+    if not facts:
+        return ""
+    other_skills = sorted(set(facts["resumeSkills"]) - set(facts["matchedSkills"]))
+    return (
+        "\nPre-extracted facts (deterministic keyword scan, verify them against the text):\n"
+        f"- Skills named in the Job Description: {', '.join(facts['jobSkills']) or 'none recognized'}\n"
+        f"- Of those, found in the document: {', '.join(facts['matchedSkills']) or 'none'}\n"
+        f"- Of those, missing from the document: {', '.join(facts['missingSkills']) or 'none'}\n"
+        f"- Other skills in the document: {', '.join(other_skills) or 'none'}\n"
+        f"- Keyword coverage: {facts['matchRate']}%\n"
+    )
+
+def build_analysis_prompt(job_description: str, resume_text: str, facts: Optional[dict] = None) -> str:
+    return ANALYSIS_PROMPT.format(facts=_format_facts(facts), job_description=job_description, resume_text=resume_text)
+
+def _save_analysis_for(db: Session, user_id: int, filename: str, analysis: dict, file_path: Optional[str] = None):
+    db_resume = models.Resume(
+        user_id=user_id,
+        file_path=file_path or f"http://localhost:8000/uploads/{filename}", # Mock path when the file was not stored
+        candidate_name=analysis.get("candidateName", "Applicant"),
+        recommended_fields=analysis.get("recommendedFields", []),
+        score=float(analysis.get("score", 0)),
+        parsed_data={"analysis": analysis}
+    )
+    db.add(db_resume)
+    with span("db.commit"):
+        db.commit()
+    logger.info("Saved resume %s for user %s", db_resume.id, user_id)
+    return db_resume
+
+def _analysis_response(analysis: dict) -> dict:
+    return {
+        "candidateName": analysis.get("candidateName", "Applicant"),
+        "score": analysis.get("score", 0),
+        "matchRate": analysis.get("matchRate", 0),
+        "strengths": analysis.get("strengths", ["No strengths identified"]),
+        "gaps": analysis.get("gaps", ["No specific gaps identified"]),
+        "detailedBreakdown": analysis.get("detailedBreakdown", [
+            {"category": "General", "score": 0, "comment": "Low match detected."}
+        ]),
+        "recommendedFields": analysis.get("recommendedFields", ["General Roles"]),
+        "feedback": analysis.get("feedback", "Analysis complete."),
+        "documentType": analysis.get("documentType"),
+    }
+
+async def _extract_resume_document(source: Union[bytes, StoredUpload], pdf_hash: str, filename: str):
+    # 1. Extract text from PDF (in the extraction process pool, off the event loop); pages are
+    # cached by hash, so later endpoints and re-analysis of the same file skip this step
+    try:
+        return await documents.get_document(source.path if isinstance(source, StoredUpload) else source, pdf_hash)
+    except extraction.ExtractionTooLarge:
+        raise
+    except Exception as e:
+        logger.warning("Extraction error for %s: %s", filename, e)
+        return None
+
+def _validate_output(analysis: dict):
+    try:
+        llm_output.validate(analysis)
+    except ValidationError:
+        output_stats.record("unusable")
+        raise
+
+async def _complete_analysis(llm, text: str, job_description: str, prompt_resume: str, facts: dict, resume_text: str) -> dict:
+    # Validate the model output against AnalysisResponse. Formatting defects are repaired
+    # locally; only keys that are genuinely missing are asked for again, with a short prompt.
+    try:
+        with span("llm.parse"):
+            data, repairs = llm_output.parse_json_object(text)
+            analysis, fixes, missing = llm_output.repair_analysis(data)
+    except llm_output.OutputParseError:
+        output_stats.record("unusable")
+        raise
+    repairs += fixes
+    if "recommendedFields" not in analysis:
+        analysis["recommendedFields"] = skills.recommended_fields(facts["resumeSkills"])
+
+    if not missing:
+        _validate_output(analysis)
+        output_stats.record("repaired" if repairs else "valid", repairs)
+        return analysis
+
+    logger.info("LLM output missing %s, asking for those keys only", missing)
+    excerpt = prompt_resume[:llm_output.FOLLOWUP_RESUME_TOKEN_BUDGET * 4]
+    followup_tokens = 0
+    try:
+        followup = await llm.generate(llm_output.build_followup_prompt(missing, analysis, job_description, excerpt))
+        followup_tokens = followup.output_tokens
+        extra, _ = llm_output.parse_json_object(followup.text)
+        extra, _, _ = llm_output.repair_analysis({key: extra[key] for key in missing if key in extra})
+        analysis.update({key: extra[key] for key in missing if key in extra})
+    except Exception as e:
+        logger.warning("Follow-up for missing keys failed: %s", e)
+
+    still_missing = [key for key in missing if key not in analysis]
+    if still_missing:
+        # Last resort: the deterministic scorer's values for the keys the model never gave
+        local = skills.local_analysis(facts, resume_text)
+        analysis.update({key: local[key] for key in still_missing})
+    _validate_output(analysis)
+    output_stats.record("followup_failed" if still_missing else "followup", repairs, followup_tokens)
+    return analysis
+
+async def _no_progress(stage: str, percent: int):
+    pass
+
+async def run_analysis(source: Union[bytes, StoredUpload], filename: str, job_description: str, progress=_no_progress) -> dict:
+    llm = get_llm_client()
+
+    # 0. Serve repeat uploads of the same PDF against the same job from cache
+    pdf_hash = source.sha256 if isinstance(source, StoredUpload) else hashlib.sha256(source).hexdigest()
+    cache_key = analysis_cache_key(pdf_hash, job_description, llm.default_model, PROMPT_VERSION)
+    analysis = await analysis_cache.get(cache_key)
+    if analysis is not None:
+        return analysis
+
+    document = await _extract_resume_document(source, pdf_hash, filename)
+
+    # Pre-flight: scanned, empty and non-resume uploads get a structured answer without an LLM call
+    started = time.perf_counter()
+    with span("preflight"):
+        verdict = preflight.classify(document) if document is not None else preflight.unreadable()
+    preflight_stats.record(verdict, ANALYSIS_MODE != "local", (time.perf_counter() - started) * 1000)
+    if verdict.kind != "ok":
+        logger.info(
+            "Pre-flight rejected %s: %s (%s text / %s scanned pages)",
+            filename, verdict.kind, verdict.text_pages, verdict.scanned_pages,
+        )
+        analysis = preflight.rejection_analysis(verdict)
+        # Extraction failures can be transient (timeouts), so only cache verdicts about the content
+        if verdict.kind != "unreadable":
+            await analysis_cache.set(cache_key, analysis, model_name="preflight", prompt_version=PROMPT_VERSION)
+        return analysis
+
+    pages = document.pages
+    resume_text = document.text
+
+    # Local skill scan: a few milliseconds, feeds the prompt and backs up the LLM
+    facts = skills.score_resume(resume_text, job_description)
+    if ANALYSIS_MODE == "local":
+        return skills.local_analysis(facts, resume_text)
+
+    # Strip page furniture and boilerplate and fit the resume into the token budget
+    with span("prompt.build"):
+        prompt_resume, prep = text_prep.prepare_resume_text(pages)
+        prompt_job = text_prep.prepare_job_description(job_description)
+        prompt = build_analysis_prompt(prompt_job, prompt_resume, facts)
+
+    # 2. AI Analysis via Gemini
+    await progress("scoring", 40)
+    try:
+        response = await llm.generate(prompt)
+        analysis = await _complete_analysis(llm, response.text, prompt_job, prompt_resume, facts, resume_text)
+    except Exception as e:
+        logger.warning("AI Analysis error: %s", e)
+        return skills.local_analysis(facts, resume_text, reason=str(e))
+
+    logger.info(
+        "Prompt tokens for %s", filename,
+        extra={
+            "resume_tokens_estimated": prep["input_tokens"],
+            "prompt_resume_tokens_estimated": prep["output_tokens"],
+            "llm_prompt_tokens": response.prompt_tokens,
+            "llm_output_tokens": response.output_tokens,
+            "model": response.model,
+        },
+    )
+    await analysis_cache.set(cache_key, analysis, model_name=response.model, prompt_version=PROMPT_VERSION)
+    return analysis
+
+def _fallback_response(error: Exception) -> dict:
+    # Dynamic fallback
+    return {
+        "candidateName": "Applicant",
+        "score": 50,
+        "matchRate": 45,
+        "strengths": ["Document received"],
+        "gaps": ["AI Analysis failed: " + str(error)],
+        "detailedBreakdown": [
+            {"category": "Status", "score": 50, "comment": "Analysis engine error."}
+        ],
+        "recommendedFields": ["Pending Analysis"],
+        "feedback": "We encountered an error connecting to our AI engine. Please ensure your GEMINI_API_KEY is valid."
+    }
+
 @router.post("/analyze-match", response_model=schemas.AnalysisResponse)
 async def analyze_resume_match(
     file: UploadFile = File(...),
     job_description: str = Form(...),
-    db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user)
 ):
-    # 1. Extract text from PDF
-    try:
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported for now.")
-        
-        contents = await file.read()
-        doc = fitz.open(stream=contents, filetype="pdf")
-        resume_text = ""
-        for page in doc:
-            resume_text += page.get_text()
-        doc.close()
-        
-        if not resume_text.strip():
-            resume_text = f"Resume filename: {file.filename} (Empty or scanned PDF)"
-            
-    except Exception as e:
-        print(f"Extraction error: {e}")
-        resume_text = f"Could not extract text. Filename: {file.filename}"
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported for now.")
 
-    # 2. AI Analysis via Gemini
     try:
-        # Reload env in case it changed
-        load_dotenv()
-        key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        
-        if not key or "YOUR_GEMINI" in key:
-            raise ValueError("GEMINI_API_KEY not found or still placeholder in environment.")
-
-        # Re-configure to ensure the latest key is used
-        genai.configure(api_key=key)
-        
-        print(f"DEBUG: Using Gemini API Key starting with: {key[:8]}...")
-
-        # Use gemini-flash-latest as it's the most stable/supported alias with quota
-        model = genai.GenerativeModel('gemini-flash-latest')
-        
-        prompt = f"""
-        You are an expert HR Specialist and ATS Optimizer. Your task is to analyze the provided document.
-        
-        1. If the document is a Resume:
-           - Compare it against the provided Job Description.
-           - Extract the Candidate's Full Name.
-           - Calculate a Match Rate (0-100) and an Overall Suitability Score (0-100).
-           - Identify 3 major strengths and 3 gaps.
-           - Suggest 3 career fields or roles that best suit this candidate based on their background.
-           - Provide a detailed breakdown in 3 categories (e.g., Skills, Experience, Formatting).
-           - Provide a helpful overall feedback summary.
-
-        2. If the document is NOT a Resume:
-           - Extract a name if any name-like entity is present.
-           - Return scores of 0.
-           - In the 'feedback', explicitly state that the uploaded document does not appear to be a professional resume.
-           - Still try to suggest what career fields might suit someone based on any text found.
-        
-        3. OUTPUT FORMAT:
-           - You MUST return a STRICT JSON object with these EXACT keys:
-             "candidateName" (string), "matchRate" (integer), "score" (integer), "strengths" (list of strings), 
-             "gaps" (list of strings), "detailedBreakdown" (list of objects with "category", "score", "comment"), 
-             "recommendedFields" (list of strings), "feedback" (string).
-
-        Job Description:
-        {job_description}
-
-        Uploaded Document Text:
-        {resume_text}
-        """
-
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                response_mime_type="application/json",
-            )
-        )
-        
-        analysis = json.loads(response.text)
-        
+        stored = await upload_store.save(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        analysis = await run_analysis(stored, file.filename, job_description)
         # Save to database if user is logged in
         if current_user:
-            db_resume = models.Resume(
-                user_id=current_user.id,
-                file_path=f"http://localhost:8000/uploads/{file.filename}", # Mock path
-                candidate_name=analysis.get("candidateName", "Applicant"),
-                recommended_fields=analysis.get("recommendedFields", []),
-                score=float(analysis.get("score", 0)),
-                parsed_data={"analysis": analysis}
-            )
-            db.add(db_resume)
-            db.commit()
-            print(f"DEBUG: Saved resume for user {current_user.id}")
-
-        return {
-            "candidateName": analysis.get("candidateName", "Applicant"),
-            "score": analysis.get("score", 0),
-            "matchRate": analysis.get("matchRate", 0),
-            "strengths": analysis.get("strengths", ["No strengths identified"]),
-            "gaps": analysis.get("gaps", ["No specific gaps identified"]),
-            "detailedBreakdown": analysis.get("detailedBreakdown", [
-                {"category": "General", "score": 0, "comment": "Low match detected."}
-            ]),
-            "recommendedFields": analysis.get("recommendedFields", ["General Roles"]),
-            "feedback": analysis.get("feedback", "Analysis complete.")
-        }
+            await run_db(_save_analysis_for, current_user.id, file.filename, analysis, stored.url)
+        return _analysis_response(analysis)
 
+    except extraction.ExtractionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        print(f"AI Analysis error: {e}")
-        # Dynamic fallback
-        return {
-            "candidateName": "Applicant",
-            "score": 50,
-            "matchRate": 45,
-            "strengths": ["Document received"],
-            "gaps": ["AI Analysis failed: " + str(e)],
-            "detailedBreakdown": [
-                {"category": "Status", "score": 50, "comment": "Analysis engine error."}
-            ],
-            "recommendedFields": ["Pending Analysis"],
-            "feedback": "We encountered an error connecting to our AI engine. Please ensure your GEMINI_API_KEY is valid."
-        }
+        logger.exception("AI Analysis error: %s", e)
+        return _fallback_response(e)
+
+async def _process_queued_analysis(task: dict, source: Union[bytes, StoredUpload], job_description: str, progress) -> dict:
+    analysis = await run_analysis(source, task["filename"], job_description, progress)
+    await progress("saving", 90)
+    file_path = source.url if isinstance(source, StoredUpload) else None
+
+    def save(db: Session):
+        return _save_analysis_for(db, task["user_id"], task["filename"], analysis, file_path).id
+
+    resume_id = await run_db(save)
+    return {"result": _analysis_response(analysis), "resume_id": resume_id}
+
+analysis_queue.handler = _process_queued_analysis
+
+@router.post("/analyze-async", status_code=202)
+async def analyze_resume_async(
+    file: UploadFile = File(...),
+    job_description: str = Form(...),
+    current_user: User = Depends(get_current_user)
+):
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported for now.")
+    try:
+        stored = await upload_store.save(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        task = await analysis_queue.submit(current_user.id, stored, job_description)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    task["status_url"] = f"/resume/analysis/{task['id']}"
+    task["events_url"] = f"/resume/analysis/{task['id']}/events"
+    return task
+
+async def _get_task(task_id: str, current_user: Principal) -> dict:
+    task = await analysis_queue.get(task_id)
+    if task is None or task.get("user_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return task
+
+@router.get("/analysis/{task_id}")
+async def get_analysis_status(task_id: str, current_user: Principal = Depends(get_current_principal)):
+    return analysis_queue.public(await _get_task(task_id, current_user))
+
+@router.get("/analysis/{task_id}/events")
+async def stream_analysis_status(task_id: str, current_user: Principal = Depends(get_current_principal)):
+    await _get_task(task_id, current_user)
+
+    async def events():
+        last = None
+        while True:
+            task = analysis_queue.public(await analysis_queue.get(task_id) or {"id": task_id, "status": "failed", "error": "Analysis expired"})
+            if task != last:
+                yield f"event: {task['status']}\ndata: {json.dumps(task)}\n\n"
+                last = task
+            if task["status"] in FINISHED:
+                return
+            # Woken early by local updates; the timeout also covers tasks run by another worker
+            if not await analysis_queue.wait_for_change(task_id, timeout=15):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# A damaged (bad CRC, truncated), encrypted or oddly compressed member fails on its own
+ZIP_MEMBER_ERRORS = (zipfile.BadZipFile, RuntimeError, NotImplementedError, EOFError, OSError, zlib.error)
+
+def _read_upload(upload: UploadFile) -> bytes:
+    upload.file.seek(0)
+    return upload.file.read()
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    # Never inflates more than the declared file_size, which the batch cap already counted
+    with archive.open(info) as member:
+        return member.read()
+
+def _batch_items(upload: UploadFile):
+    # Yields (filename, size, read, error) for a single upload, expanding zip archives from
+    # their central directory only; nothing is read or inflated until read() is called
+    filename = upload.filename or "upload"
+    lower = filename.lower()
+    if lower.endswith(".pdf"):
+        size = upload.size or 0
+        if size > extraction.EXTRACTION_MAX_BYTES:
+            yield filename, 0, None, f"File exceeds {extraction.EXTRACTION_MAX_BYTES} bytes."
+            return
+        yield filename, size, partial(_read_upload, upload), None
+        return
+    if not lower.endswith(".zip"):
+        yield filename, 0, None, "Only PDF files (or a zip of PDFs) are supported."
+        return
+
+    try:
+        archive = zipfile.ZipFile(upload.file)
+    except ZIP_MEMBER_ERRORS:
+        yield filename, 0, None, "Invalid zip archive."
+        return
+    for info in archive.infolist():
+        if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+            continue
+        name = f"{filename}/{info.filename}"
+        if info.file_size > extraction.EXTRACTION_MAX_BYTES:
+            yield name, 0, None, f"File exceeds {extraction.EXTRACTION_MAX_BYTES} bytes."
+            continue
+        yield name, info.file_size, partial(_read_member, archive, info), None
+
+def _list_batch(files: List[UploadFile]) -> list:
+    return [item for upload in files for item in _batch_items(upload)]
+
+def _digest(read) -> str:
+    return hashlib.sha256(read()).hexdigest()
+
+def _batch_event(payload: dict, fmt: str) -> str:
+    data = json.dumps(payload)
+    if fmt == "sse":
+        return f"event: {payload.get('event', 'result')}\ndata: {data}\n\n"
+    return data + "\n"
+
+@router.post("/analyze-batch")
+async def analyze_resume_batch(
+    files: List[UploadFile] = File(...),
+    job_description: str = Form(...),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    current_user: User = Depends(get_current_user)
+):
+    # Counted and sized from the multipart headers and zip directories before anything is
+    # read, so a zip bomb is turned away without being inflated
+    items = await run_in_threadpool(_list_batch, files)
+    if len(items) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_FILES} PDFs.")
+    if sum(size for _, size, _, _ in items) > BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_BYTES} bytes of PDFs.")
+
+    # Dedupe identical PDFs so each distinct file is extracted and scored once. Only the
+    # digests are kept; each PDF is read again when its turn to be scored comes.
+    groups = {}
+    errors = []
+    for index, (filename, size, read, error) in enumerate(items):
+        if error is None:
+            try:
+                digest = await run_in_threadpool(_digest, read)
+            except ZIP_MEMBER_ERRORS as e:
+                error = f"Unreadable zip member: {e}"
+        if error:
+            errors.append({"index": index, "filename": filename, "status": "error", "error": error})
+            continue
+        groups.setdefault(digest, {"read": read, "members": []})["members"].append((index, filename))
+
+    async def score(digest: str, group: dict):
+        first_filename = group["members"][0][1]
+        # Shared across all batches so bulk screening never takes every LLM slot
+        async with _batch_semaphore:
+            try:
+                contents = await run_in_threadpool(group["read"])
+                analysis = await run_analysis(contents, first_filename, job_description)
+                result = schemas.AnalysisResponse(**_analysis_response(analysis)).model_dump()
+                return digest, group, {"status": "ok", "analysis": result}
+            except Exception as e:
+                logger.warning("Batch analysis error for %s: %s", first_filename, e)
+                return digest, group, {"status": "error", "error": str(e)}
+
+    async def stream():
+        yield _batch_event({"event": "start", "total": len(items), "unique": len(groups)}, format)
+        for error in errors:
+            yield _batch_event(error, format)
+
+        tasks = [asyncio.create_task(score(digest, group)) for digest, group in groups.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                digest, group, outcome = await next_done
+                first_index = group["members"][0][0]
+                for index, filename in group["members"]:
+                    payload = {"index": index, "filename": filename, "sha256": digest, **outcome}
+                    if index != first_index:
+                        payload["duplicate_of"] = first_index
+                    yield _batch_event(payload, format)
+        finally:
+            # Client went away: stop scoring the rest of the batch
+            for task in tasks:
+                task.cancel()
+        yield _batch_event({"event": "end"}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+# Both expose storage paths, the worker pid and limiter counters: admins only
+@router.get("/cache/stats")
+def get_analysis_cache_stats(admin: Principal = Depends(get_admin)):
+    return analysis_cache.stats()
+
+@router.get("/stats")
+def get_analysis_stats(admin: Principal = Depends(get_admin)):
+    return {
+        "cache": analysis_cache.stats(),
+        "llm": get_llm_client().stats(),
+        "prompt": text_prep.prompt_stats.stats(),
+        "queue": analysis_queue.stats(),
+        "users": user_cache.stats(),
+        "passwords": password_hasher.stats(),
+        "logins": login_limiter.stats(),
+        "uploads": upload_store.stats(),
+        "documents": documents.document_cache.stats(),
+        "preflight": preflight_stats.stats(),
+        "llm_output": output_stats.stats(),
+        # Everything above except shared_state is per worker
+        "worker": os.getpid(),
+        "shared_state": shared_state.stats(),
+    }
 
 @router.get("/", response_model=List[schemas.ResumeResponse])
-def get_resumes(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Resume).filter(models.Resume.user_id == current_user.id).order_by(models.Resume.created_at.desc()).limit(5).all()
+def get_resumes(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,score,created_at"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    # Next page in X-Next-Cursor / Link; parsed_data is only read when it is asked for
+    query = db.query(models.Resume.version).filter(models.Resume.user_id == current_user.id)
+    return list_response(
+        request, query, models.Resume, schemas.ResumeResponse,
+        cursor=cursor, limit=limit, fields=parse_fields(fields, schemas.ResumeResponse),
+    )
 
-@router.get("/{resume_id}", response_model=schemas.ResumeResponse)
-def get_resume(resume_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    resume = db.query(models.Resume).filter(models.Resume.id == resume_id, models.Resume.user_id == current_user.id).first()
+def _latest_resume(db: Session, user_id: int):
+    # Uploads in the same second share created_at; the id breaks the tie toward the newer row
+    return (
+        db.query(models.Resume)
+        .filter(models.Resume.user_id == user_id)
+        .order_by(models.Resume.created_at.desc(), models.Resume.id.desc())
+        .first()
+    )
+
+def _owned_resume(db: Session, resume_id: int, user_id: int):
+    return db.query(models.Resume).filter(models.Resume.id == resume_id, models.Resume.user_id == user_id).first()
+
+async def _resume_document(resume) -> Optional[documents.ExtractedDocument]:
+    # Cached pages for a stored resume; None for resumes saved before files were kept
+    stored = uploads.from_url(resume.file_path) if resume else None
+    if stored is None:
+        return None
+    try:
+        return await documents.get_document(stored.path, stored.sha256)
+    except extraction.ExtractionError as e:
+        logger.warning("Extraction error for resume %s: %s", resume.id, e)
+        return None
+
+@router.get("/score")
+async def get_resume_score(current_user: Principal = Depends(get_current_principal)):
+    latest = await run_db(_latest_resume, current_user.id)
+    if latest is None:
+        return {"score": 0, "feedback": "Upload a resume for a detailed score"}
+
+    analysis = (latest.parsed_data or {}).get("analysis") or {}
+    response = {
+        "resume_id": latest.id,
+        "score": latest.score or 0,
+        "feedback": analysis.get("feedback", "Upload a resume for a detailed score"),
+    }
+    document = await _resume_document(latest)
+    if document is not None:
+        response["page_count"] = document.page_count
+        response["skills"] = sorted(skills.extract_skills(document.text))
+    return response
+
+@router.get("/{resume_id}", response_model=schemas.ResumeDetailResponse)
+async def get_resume(
+    resume_id: int,
+    pages: bool = Query(False, description="Include the extracted text and layout blocks per page"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    resume = await run_db(_owned_resume, resume_id, current_user.id)
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
-    return resume
+    response = schemas.ResumeDetailResponse.model_validate(resume)
+    if pages:
+        document = await _resume_document(resume)
+        if document is not None:
+            response.page_count = document.page_count
+            response.pages = [
+                schemas.ResumePage(number=i + 1, text=text, blocks=blocks)
+                for i, (text, blocks) in enumerate(zip(document.pages, document.blocks))
+            ]
+    return response
 
-@router.post("/upload", response_model=schemas.ResumeResponse)
-async def upload_resume(
-    file: UploadFile = File(...), 
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    fake_path = f"/uploads/{file.filename}"
-    parsed_data = {"skills": ["Pending Analysis"], "education": "Pending Analysis"}
-    
+def _create_uploaded_resume(db: Session, user_id: int, file_path: str):
     db_resume = models.Resume(
-        user_id=current_user.id,
-        file_path=fake_path,
-        parsed_data=parsed_data,
+        user_id=user_id,
+        file_path=file_path,
+        parsed_data={"skills": ["Pending Analysis"], "education": "Pending Analysis"},
+        recommended_fields=[],
         score=0.0
     )
     db.add(db_resume)
@@ -182,6 +601,19 @@ async def upload_resume(
     db.refresh(db_resume)
     return db_resume
 
+@router.post("/upload", response_model=schemas.ResumeResponse)
+async def upload_resume(
+    file: UploadFile = File(...), 
+    current_user: User = Depends(get_current_user)
+):
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported for now.")
+    try:
+        stored = await upload_store.save(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return await run_db(_create_uploaded_resume, current_user.id, stored.url)
+
 @router.put("/update", response_model=schemas.ResumeResponse)
 def update_resume(
     resume_id: int,
@@ -197,12 +629,31 @@ def update_resume(
     db.refresh(resume)
     return resume
 
+IMPROVE_PROMPT = textwrap.dedent("""
+    Rewrite the experience section of the resume below as concise, action-led bullet points.
+    Quantify impact where the text supports it and do not invent facts. Return plain text only.
+
+    Resume:
+    {resume_text}
+""")
+
 @router.post("/improve-ai")
-def improve_resume_ai(
-    current_user: User = Depends(get_current_user)
+async def improve_resume_ai(
+    resume_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_principal)
 ):
-    return {"message": "Resume improved by AI", "improved_text": "Enhanced bullet points..."}
+    if resume_id is None:
+        resume = await run_db(_latest_resume, current_user.id)
+    else:
+        resume = await run_db(_owned_resume, resume_id, current_user.id)
+    document = await _resume_document(resume)
+    if document is None:
+        return {"message": "Resume improved by AI", "improved_text": "Enhanced bullet points..."}
 
-@router.get("/score")
-def get_resume_score(current_user: User = Depends(get_current_user)):
-    return {"score": 0, "feedback": "Upload a resume for a detailed score"}
+    resume_text, _ = text_prep.prepare_resume_text(document.pages)
+    try:
+        response = await get_llm_client().generate(IMPROVE_PROMPT.format(resume_text=resume_text), json_output=False)
+    except Exception as e:
+        logger.warning("Improve AI error: %s", e)
+        return {"message": "AI is unavailable, please try again later", "improved_text": resume_text}
+    return {"message": "Resume improved by AI", "improved_text": response.text, "resume_id": resume.id}
@@ -26,6 +26,7 @@ def update_user_profile(
     current_user.experience_level = profile_data.experience_level
     current_user.location_preference = profile_data.location_preference
     
+    # The commit invalidates the cached copy (see utils.user_cache)
     db.commit()
     db.refresh(current_user)
     return current_user
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class ApplicationBase(BaseModel):
@@ -21,3 +21,22 @@ class ApplicationResponse(ApplicationBase):
     
     class Config:
         from_attributes = True
+
+class ApplicationJob(BaseModel):
+    id: int
+    title: str
+    company: str
+    location: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class ApplicationWithJob(ApplicationResponse):
+    job: Optional[ApplicationJob] = None
+
+class ApplicationsDetailed(BaseModel):
+    items: List[ApplicationWithJob]
+    # Over all of the user's applications, not just this page
+    counts: Dict[str, int]
+    total: int
+    next_cursor: Optional[str] = None
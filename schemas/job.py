@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class JobBase(BaseModel):
@@ -17,3 +17,12 @@ class JobResponse(JobBase):
 
     class Config:
         from_attributes = True
+
+class JobMatch(BaseModel):
+    job: JobResponse
+    match_percentage: int
+    missing_skills: List[str]
+
+class JobSearchResponse(BaseModel):
+    items: List[JobResponse]
+    next_cursor: Optional[str] = None
@@ -21,6 +21,16 @@ class ResumeResponse(ResumeBase):
     class Config:
         from_attributes = True
 
+class ResumePage(BaseModel):
+    number: int
+    text: str
+    # Text blocks as [x0, y0, x1, y1, text]
+    blocks: List[List[Any]] = []
+
+class ResumeDetailResponse(ResumeResponse):
+    page_count: Optional[int] = None
+    pages: Optional[List[ResumePage]] = None
+
 class ResumeAnalysisRequest(BaseModel):
     text: str
 
@@ -38,3 +48,5 @@ class AnalysisResponse(BaseModel):
     detailedBreakdown: List[DetailedBreakdownItem]
     recommendedFields: List[str] = []
     feedback: str
+    # Set when the pre-flight check rejected the upload (scanned, empty, not_resume, ...)
+    documentType: Optional[str] = None
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_analysis_queue.db")
+
+from database import SessionLocal, engine
+from models.analysis_task import AnalysisTask
+from utils.analysis_queue import AnalysisQueue
+from utils.migrations import run_migrations
+
+run_migrations(engine)
+
+
+def add_tasks(count: int, **fields) -> list:
+    db = SessionLocal()
+    try:
+        ids = []
+        for index in range(count):
+            task = AnalysisTask(
+                id=f"{time.time_ns()}{index}"[-32:], user_id=1, status="queued", stage="queued", progress=0,
+                filename="cv.pdf", job_description="Python", payload=b"%PDF", **fields,
+            )
+            db.add(task)
+            ids.append(task.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def statuses(ids: list) -> dict:
+    db = SessionLocal()
+    try:
+        return {task.id: task.status for task in db.query(AnalysisTask).filter(AnalysisTask.id.in_(ids))}
+    finally:
+        db.close()
+
+
+def test_two_workers_never_run_the_same_task():
+    ids = add_tasks(8)
+    runs = Counter()
+
+    async def handler(state, source, job_description, progress):
+        runs[state["id"]] += 1
+        await asyncio.sleep(0.02)
+        return {"result": {"score": 1}}
+
+    async def main():
+        # Both workers recover all eight queued rows at start; the claim decides who runs each
+        first, second = AnalysisQueue(workers=2, durable=True), AnalysisQueue(workers=2, durable=True)
+        first.handler = second.handler = handler
+        await first.start()
+        await second.start()
+        for _ in range(200):
+            if set(statuses(ids).values()) == {"done"}:
+                break
+            await asyncio.sleep(0.05)
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(main())
+    assert set(statuses(ids).values()) == {"done"}
+    assert all(runs[task_id] == 1 for task_id in ids), runs
+
+
+def test_only_expired_leases_are_recovered():
+    live = add_tasks(1, owner="alive", lease_until=time.time() + 60)[0]
+    dead = add_tasks(1, owner="dead", lease_until=time.time() - 1)[0]
+    db = SessionLocal()
+    try:
+        db.query(AnalysisTask).filter(AnalysisTask.id.in_([live, dead])).update({"status": "running"}, synchronize_session=False)
+        db.commit()
+        recovered = AnalysisQueue(durable=True)._recover(db)
+    finally:
+        db.close()
+    assert dead in recovered and live not in recovered
+    assert statuses([live, dead]) == {live: "running", dead: "queued"}
+
+
+def test_status_of_a_task_held_by_another_worker_comes_from_the_table():
+    task_id = add_tasks(1)[0]
+    state = asyncio.run(AnalysisQueue(durable=True).get(task_id))
+    assert state["id"] == task_id and state["status"] == "queued" and state["user_id"] == 1
+    assert asyncio.run(AnalysisQueue(durable=True).get("missing")) is None
+
+
+def test_a_failure_that_cannot_be_recorded_does_not_stop_the_worker():
+    ids = add_tasks(2)
+
+    async def handler(state, source, job_description, progress):
+        if state["id"] == ids[0]:
+            raise ValueError("unreadable")
+        return {"result": {"score": 1}}
+
+    async def main():
+        queue = AnalysisQueue(workers=1, durable=True)
+        queue.handler = handler
+        update = queue.update
+
+        async def flaky_update(task_id, **fields):
+            if fields.get("status") == "failed":
+                raise RuntimeError("database is locked")
+            await update(task_id, **fields)
+
+        queue.update = flaky_update
+        await queue.start()
+        for _ in range(200):
+            if statuses([ids[1]])[ids[1]] == "done":
+                break
+            await asyncio.sleep(0.02)
+        workers = list(queue._workers)
+        await queue.stop()
+        return workers
+
+    workers = asyncio.run(main())
+    assert statuses([ids[1]])[ids[1]] == "done"
+    assert len(workers) == 1
+
+
+def test_a_worker_that_exits_is_replaced():
+    async def main():
+        queue = AnalysisQueue(workers=1)
+        await queue.start()
+        first = queue._workers[0]
+        # Stands in for any bug that escapes _work's own error handling
+        queue._queue.put_nowait(None)
+        queue._queue.task_done = None
+        for _ in range(100):
+            if first.done() and queue._workers[0] is not first:
+                break
+            await asyncio.sleep(0.01)
+        replaced = first.done() and queue._workers[0] is not first and not queue._workers[0].done()
+        await queue.stop()
+        return replaced, queue.restarts
+
+    replaced, restarts = asyncio.run(main())
+    assert replaced and restarts >= 1
+
+
+if __name__ == "__main__":
+    test_two_workers_never_run_the_same_task()
+    test_only_expired_leases_are_recovered()
+    test_status_of_a_task_held_by_another_worker_comes_from_the_table()
+    test_a_failure_that_cannot_be_recorded_does_not_stop_the_worker()
+    test_a_worker_that_exits_is_replaced()
+    print("ok")
@@ -0,0 +1,143 @@
+import os
+import tempfile
+from datetime import timedelta
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_applications.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+import main
+from database import SessionLocal, engine
+from models.application import Application
+from models.job import Job
+from models.user import User
+from utils import security
+from utils.migrations import run_migrations
+
+# The app's lifespan (which migrates) does not run under this client
+run_migrations(engine)
+client = TestClient(main.app)
+
+STATUSES = ["Applied", "Interview", "Rejected"]
+statements = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _record(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def make_user(email: str, applications: int) -> dict:
+    db = SessionLocal()
+    try:
+        user = User(email=email, hashed_password="x", full_name="Test")
+        db.add(user)
+        db.flush()
+        for index in range(applications):
+            job = Job(title=f"Engineer {index}", company=f"Company {index}", description="Python", location="Remote")
+            db.add(job)
+            db.flush()
+            db.add(Application(user_id=user.id, job_id=job.id, status=STATUSES[index % len(STATUSES)]))
+        db.commit()
+        token = security.create_access_token({"sub": email, "uid": user.id}, timedelta(minutes=5))
+        return {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def get(path: str, headers: dict):
+    statements.clear()
+    response = client.get(path, headers=headers)
+    return response, len(statements)
+
+
+def test_detailed_view_query_count_does_not_grow_with_rows():
+    few = make_user("few@example.com", 3)
+    many = make_user("many@example.com", 30)
+    response, few_queries = get("/applications/?view=detailed", few)
+    assert response.status_code == 200
+    response, many_queries = get("/applications/?view=detailed", many)
+    assert response.status_code == 200
+    # Counts, the (id, version) page and the rows joined with their jobs: no query per application
+    assert few_queries == many_queries == 3, statements
+    assert len(response.json()["items"]) == 30
+
+
+def test_detailed_view_embeds_jobs_and_counts():
+    headers = make_user("detail@example.com", 7)
+    body = client.get("/applications/?view=detailed&limit=5", headers=headers).json()
+    assert len(body["items"]) == 5
+    assert body["next_cursor"] is not None
+    for item in body["items"]:
+        assert item["job"]["id"] == item["job_id"]
+        assert item["job"]["title"].startswith("Engineer")
+        assert item["job"]["company"].startswith("Company")
+    assert body["counts"] == {"Applied": 3, "Interview": 2, "Rejected": 2}
+    assert body["total"] == 7
+
+    rest = client.get(f"/applications/?view=detailed&limit=5&cursor={body['next_cursor']}", headers=headers).json()
+    assert len(rest["items"]) == 2
+    assert rest["next_cursor"] is None
+
+
+def test_detailed_view_etag_follows_jobs_and_statuses():
+    headers = make_user("etag@example.com", 2)
+    response = client.get("/applications/?view=detailed", headers=headers)
+    etag = response.headers["etag"]
+    cached, queries = get("/applications/?view=detailed", {**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert queries == 2
+
+    # A renamed job changes the embedded title, so the ETag must change with it
+    db = SessionLocal()
+    try:
+        job = db.get(Job, response.json()["items"][0]["job_id"])
+        job.title = "Staff Engineer"
+        db.commit()
+    finally:
+        db.close()
+    renamed = client.get("/applications/?view=detailed", headers={**headers, "If-None-Match": etag})
+    assert renamed.status_code == 200
+    assert renamed.json()["items"][0]["job"]["title"] == "Staff Engineer"
+
+    application_id = renamed.json()["items"][0]["id"]
+    client.put(f"/applications/{application_id}", headers=headers, json={"status": "Offer"})
+    moved = client.get("/applications/?view=detailed", headers={**headers, "If-None-Match": renamed.headers["etag"]})
+    assert moved.status_code == 200
+    assert moved.json()["counts"]["Offer"] == 1
+
+
+def test_list_view_is_unchanged():
+    headers = make_user("list@example.com", 2)
+    response = client.get("/applications/", headers=headers)
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+    assert "job" not in response.json()[0]
+
+
+def test_update_that_loses_a_race_is_a_conflict():
+    headers = make_user("race@example.com", 1)
+    application_id = client.get("/applications/", headers=headers).json()[0]["id"]
+
+    # Another request commits a write to the same row between this one's read and its flush
+    def concurrent_write(session, flush_context, instances):
+        with engine.begin() as conn:
+            conn.execute(update(Application).where(Application.id == application_id).values(version=Application.version + 1, notes="other"))
+
+    event.listen(Session, "before_flush", concurrent_write, once=True)
+    response = client.put(f"/applications/{application_id}", headers=headers, json={"status": "Interview"})
+    assert response.status_code == 409
+    retried = client.put(f"/applications/{application_id}", headers=headers, json={"status": "Interview"})
+    assert retried.status_code == 200 and retried.json()["status"] == "Interview"
+
+
+if __name__ == "__main__":
+    test_detailed_view_query_count_does_not_grow_with_rows()
+    test_detailed_view_embeds_jobs_and_counts()
+    test_detailed_view_etag_follows_jobs_and_statuses()
+    test_list_view_is_unchanged()
+    test_update_that_loses_a_race_is_a_conflict()
+    print("ok")
@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_batch.db")
+
+from fastapi.testclient import TestClient
+
+import main
+from routers import resume
+from routers.auth import get_current_user
+from utils.uploads import UPLOAD_FORM_OVERHEAD, UPLOAD_MAX_BYTES
+
+scored = []
+
+
+async def fake_analysis(contents, filename, job_description):
+    scored.append(filename)
+    return {"candidateName": filename, "score": 70}
+
+
+client = TestClient(main.app)
+
+PDF = b"%PDF-1.4\n" + b"resume text " * 200
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def post_batch(*files):
+    # No LLM and no users row: the batch endpoint is exercised on its own. The app is shared
+    # with the other test modules, so the fake and the override only last for this request.
+    run_analysis = resume.run_analysis
+    resume.run_analysis = fake_analysis
+    main.app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        return client.post(
+            "/resume/analyze-batch",
+            files=[("files", (name, data, "application/octet-stream")) for name, data in files],
+            data={"job_description": "Python developer"},
+        )
+    finally:
+        main.app.dependency_overrides.pop(get_current_user, None)
+        resume.run_analysis = run_analysis
+
+
+def events(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_zip_bomb_is_rejected_from_its_directory():
+    # A few hundred KB on the wire that would inflate past the batch budget
+    member = b"\0" * (resume.extraction.EXTRACTION_MAX_BYTES // 2)
+    count = resume.BATCH_MAX_BYTES // len(member) + 1
+    bomb = make_zip([(f"cv{n}.pdf", member) for n in range(count)])
+    assert len(bomb) < resume.BATCH_MAX_BYTES // 50
+    scored.clear()
+    response = post_batch(("bomb.zip", bomb))
+    assert response.status_code == 413
+    assert scored == []
+
+
+def test_unreadable_member_is_reported_on_its_own():
+    # Stored, so the member's bytes sit in the archive as-is; flipping one breaks its CRC
+    archive = bytearray(make_zip([("bad.pdf", PDF), ("good.pdf", PDF + b"other")], zipfile.ZIP_STORED))
+    offset = bytes(archive).index(PDF)
+    archive[offset + 20] ^= 0xFF
+    scored.clear()
+    response = post_batch(("cvs.zip", bytes(archive)), ("single.pdf", PDF), ("notes.txt", b"hi"))
+    assert response.status_code == 200
+    results = {event["filename"]: event for event in events(response) if "filename" in event}
+    assert results["cvs.zip/bad.pdf"]["status"] == "error"
+    assert results["notes.txt"]["status"] == "error"
+    assert results["cvs.zip/good.pdf"]["status"] == "ok"
+    assert results["single.pdf"]["status"] == "ok"
+    assert sorted(scored) == ["cvs.zip/good.pdf", "single.pdf"]
+
+
+def test_oversized_upload_is_rejected_with_cors_headers():
+    # Refused from Content-Length alone; the browser still needs CORS headers to read the 413
+    body = b"x" * (UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD + 1)
+    response = client.post("/resume/upload", content=body, headers={
+        "Origin": "https://resume-scorer-topaz.vercel.app", "Content-Type": "multipart/form-data; boundary=x",
+    })
+    assert response.status_code == 413
+    assert "access-control-allow-origin" in response.headers
+
+
+if __name__ == "__main__":
+    test_zip_bomb_is_rejected_from_its_directory()
+    test_unreadable_member_is_reported_on_its_own()
+    test_oversized_upload_is_rejected_with_cors_headers()
+    print("ok")
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+
+from utils import disk
+from utils.disk import DiskBudget
+
+
+def _write(directory, name, size, age):
+    path = os.path.join(directory, name[:2], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    used_at = time.time() - age
+    os.utime(path, (used_at, used_at))
+    return path
+
+
+def test_the_least_recently_used_files_are_swept_past_the_budget():
+    with tempfile.TemporaryDirectory() as directory:
+        budget = DiskBudget(directory, max_bytes=3000, suffix=".pdf")
+        oldest = _write(directory, "aa1.pdf", 1000, age=4000)
+        older = _write(directory, "bb1.pdf", 1000, age=3000)
+        read_lately = _write(directory, "cc1.pdf", 1000, age=5000)
+        budget.touch(read_lately)
+        budget.added(0)
+        assert budget.swept_files == 0
+
+        newest = _write(directory, "dd1.pdf", 1000, age=1000)
+        budget.added(1000)
+        # Over 3000 bytes: the oldest go until it is back under 80% of the budget
+        assert not os.path.exists(oldest) and not os.path.exists(older)
+        assert os.path.exists(read_lately) and os.path.exists(newest)
+        assert budget.stats()["used_bytes"] == 2000 and budget.swept_bytes == 2000
+
+
+def test_recently_used_files_are_never_swept():
+    with tempfile.TemporaryDirectory() as directory:
+        budget = DiskBudget(directory, max_bytes=1000, suffix=".pdf")
+        paths = [_write(directory, f"{i:02d}.pdf", 1000, age=disk.DISK_SWEEP_MIN_AGE / 2) for i in range(3)]
+        # Files still being written are not counted
+        _write(directory, "ee.pdf.part", 5000, age=10000)
+        budget.added(1000)
+        assert all(os.path.exists(path) for path in paths)
+        assert budget.stats()["used_bytes"] == 3000
+
+
+if __name__ == "__main__":
+    test_the_least_recently_used_files_are_swept_past_the_budget()
+    test_recently_used_files_are_never_swept()
+    print("ok")
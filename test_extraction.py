@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from utils import extraction
+
+# Stand-ins for PDF jobs: time.sleep pickles to any worker process without importing this file
+extraction.EXTRACTION_WORKERS = 3
+
+
+def test_a_timed_out_job_does_not_fail_its_siblings():
+    async def run():
+        # Another test module may have started a pool of a different size
+        extraction.shutdown()
+        # Start the pool first so the timeout measures the jobs, not process spawn
+        await extraction.run_in_pool(time.sleep, 0)
+        extraction.EXTRACTION_TIMEOUT = 1.0
+        try:
+            stuck = asyncio.create_task(extraction.run_in_pool(time.sleep, 10))
+            await asyncio.sleep(0.5)
+            # Still running in the same pool when the stuck job's timeout kills it
+            siblings = [asyncio.create_task(extraction.run_in_pool(time.sleep, 0.7)) for _ in range(2)]
+            results = await asyncio.gather(stuck, *siblings, return_exceptions=True)
+        finally:
+            extraction.EXTRACTION_TIMEOUT = 15.0
+            extraction.shutdown()
+        return results
+
+    stuck, *siblings = asyncio.run(run())
+    assert isinstance(stuck, extraction.ExtractionError) and "timed out" in str(stuck)
+    assert siblings == [None, None], siblings
+
+
+def test_waiting_for_a_worker_does_not_count_toward_the_timeout():
+    async def run():
+        extraction.shutdown()
+        extraction.EXTRACTION_WORKERS = 2
+        await extraction.run_in_pool(time.sleep, 0)
+        extraction.EXTRACTION_TIMEOUT = 1.5
+        try:
+            # Three rounds of 0.6s on two workers: the last jobs wait longer than the timeout
+            return await asyncio.gather(
+                *(extraction.run_in_pool(time.sleep, 0.6) for _ in range(6)), return_exceptions=True
+            )
+        finally:
+            extraction.EXTRACTION_TIMEOUT = 15.0
+            extraction.EXTRACTION_WORKERS = 3
+            extraction.shutdown()
+
+    assert asyncio.run(run()) == [None] * 6
+
+
+if __name__ == "__main__":
+    test_a_timed_out_job_does_not_fail_its_siblings()
+    test_waiting_for_a_worker_does_not_count_toward_the_timeout()
+    print("ok")
@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_indexes.db")
+
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+from models.application import Application
+from models.resume import Resume
+from utils.migrations import MIGRATIONS, applied_versions, run_migrations
+
+run_migrations(engine)
+
+
+def query_plan(query) -> str:
+    compiled = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_migrations_are_recorded_and_idempotent():
+    with engine.connect() as conn:
+        assert applied_versions(conn) == {version for version, _, _ in MIGRATIONS}
+    assert run_migrations(engine) == []
+
+
+def test_latest_resumes_use_user_created_index():
+    db = SessionLocal()
+    try:
+        plan = query_plan(
+            db.query(Resume).filter(Resume.user_id == 1)
+            .order_by(Resume.created_at.desc(), Resume.id.desc()).limit(5)
+        )
+    finally:
+        db.close()
+    print(plan)
+    assert "ix_resumes_user_id_created_at" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_latest_resume_breaks_created_at_ties_by_id():
+    from datetime import datetime
+
+    from routers.resume import _latest_resume
+
+    db = SessionLocal()
+    try:
+        same_second = datetime(2026, 1, 1, 12, 0, 0)
+        older, newer = Resume(user_id=42, created_at=same_second), Resume(user_id=42, created_at=same_second)
+        db.add(older)
+        db.flush()
+        db.add(newer)
+        db.commit()
+        assert _latest_resume(db, 42).id == newer.id
+    finally:
+        db.close()
+
+
+def test_user_applications_use_user_indexes():
+    db = SessionLocal()
+    try:
+        # get_applications pages newest first
+        listing = query_plan(
+            db.query(Application.version).filter(Application.user_id == 1)
+            .order_by(Application.created_at.desc(), Application.id.desc()).limit(50)
+        )
+        by_user_and_job = query_plan(db.query(Application).filter(Application.user_id == 1, Application.job_id == 7))
+    finally:
+        db.close()
+    assert "ix_applications_user_id_created_at" in listing
+    assert "TEMP B-TREE" not in listing
+    assert "ix_applications_user_id_job_id" in by_user_and_job
+
+
+if __name__ == "__main__":
+    test_migrations_are_recorded_and_idempotent()
+    test_latest_resumes_use_user_created_index()
+    test_latest_resume_breaks_created_at_ties_by_id()
+    test_user_applications_use_user_indexes()
+    print("ok")
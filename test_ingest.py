@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_ingest.db")
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, engine
+from models.job import Job
+from routers import admin
+from utils import ingest, matching, security
+from utils.migrations import run_migrations
+
+# Set on the modules rather than through the environment: another test may have imported them first
+admin.ADMIN_EMAILS.add("admin@example.com")
+matching.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "job_index")
+
+# The app's lifespan (which migrates) does not run under this client
+run_migrations(engine)
+client = TestClient(main.app)
+
+
+def headers_for(email: str) -> dict:
+    # A uid claim is all get_admin needs; no users row required
+    token = security.create_access_token({"sub": email, "uid": 1}, timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+ADMIN = headers_for("admin@example.com")
+
+
+def ndjson(*jobs) -> bytes:
+    return "".join(json.dumps(job) + "\n" for job in jobs).encode("utf-8")
+
+
+def job(n: int, **overrides) -> dict:
+    return {"title": f"Ingest Engineer {n}", "company": "Feedco", "description": f"Python and Kafka pipelines {n}", "location": "Remote", **overrides}
+
+
+def post_feed(body: bytes, content_type: str = "application/x-ndjson", **params):
+    return client.post("/jobs/bulk", params=params, content=body, headers={**ADMIN, "Content-Type": content_type})
+
+
+def test_ndjson_feed_is_validated_and_deduplicated():
+    feed = ndjson(job(1), job(2), {"title": "No company"}, job(1)) + b"{not json\n" + ndjson(
+        # Same job, different case and spacing
+        job(2, title="ingest  ENGINEER 2", description="Python and Kafka pipelines   2"),
+    )
+    report = post_feed(feed).json()
+    assert report["received"] == 6
+    assert report["inserted"] == 2
+    assert report["duplicates"] == 2
+    assert report["invalid"] == 2
+    assert [error["line"] for error in report["errors"]] == [3, 5]
+
+    # Sending the same feed again inserts nothing
+    again = post_feed(feed).json()
+    assert again["inserted"] == 0 and again["duplicates"] == 4
+
+    # The FTS triggers indexed the new rows
+    found = client.get("/jobs/search", params={"q": "kafka pipelines", "company": "Feedco"}).json()["items"]
+    assert {item["title"] for item in found} >= {"Ingest Engineer 1", "Ingest Engineer 2"}
+
+
+def test_csv_feed_with_quoted_newlines():
+    feed = (
+        "\ufefftitle,company,description,location\n"
+        'CSV Engineer,Sheetco,"Line one\nline two, with a comma",\n'
+        "CSV Analyst,Sheetco,Spreadsheets,Berlin\n"
+        ",Sheetco,Missing title,Berlin\n"
+    ).encode("utf-8")
+    report = post_feed(feed, "text/csv").json()
+    assert (report["inserted"], report["invalid"]) == (2, 1)
+    assert report["errors"][0]["line"] == 5
+
+    db = SessionLocal()
+    try:
+        row = db.query(Job).filter(Job.title == "CSV Engineer").one()
+        assert row.description == "Line one\nline two, with a comma"
+        assert row.location is None
+        assert row.content_hash == ingest.content_hash(row.title, row.company, row.location, row.description)
+    finally:
+        db.close()
+
+
+def test_batches_update_a_loaded_matching_index():
+    db = SessionLocal()
+    try:
+        index = matching.ensure_loaded(db)
+        before = len(index)
+        feed = ndjson(*(job(n, company="Matchco", description=f"Rust embedded firmware {n}") for n in range(100, 105)), job(100, company="Matchco", description="Rust embedded firmware 100"))
+        report = post_feed(feed, batch_size=2).json()
+        assert report["batches"] == 3
+        assert (report["inserted"], report["duplicates"]) == (5, 1)
+        assert len(index) == before + 5
+        ids = {job_id for job_id, _ in index.rank("rust embedded firmware", 5)}
+        assert ids == {row.id for row in db.query(Job.id).filter(Job.company == "Matchco")}
+    finally:
+        db.close()
+
+
+def test_bulk_needs_an_admin_and_a_known_format():
+    response = client.post("/jobs/bulk", content=ndjson(job(9)), headers={**headers_for("someone@example.com"), "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 403
+    assert post_feed(ndjson(job(9)), "text/plain").status_code == 415
+    assert post_feed(ndjson(job(9)), "text/plain", format="ndjson").json()["inserted"] == 1
+
+
+def test_deprecated_skip_still_pages_jobs():
+    post_feed(ndjson(*(job(n, company="Skipco") for n in range(100, 105))))
+    everything = [item["id"] for item in client.get("/jobs/", params={"limit": 200}).json()]
+    response = client.get("/jobs/", params={"skip": 2, "limit": 2})
+    assert response.status_code == 200
+    assert response.headers["Deprecation"] == "true"
+    assert [item["id"] for item in response.json()] == everything[2:4]
+    # The next link carries on from the same place with a cursor
+    following = client.get(response.links["next"]["url"])
+    assert "skip" not in response.links["next"]["url"]
+    assert [item["id"] for item in following.json()] == everything[4:6]
+    assert client.get("/jobs/", params={"skip": 2, "cursor": response.headers["X-Next-Cursor"]}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_ndjson_feed_is_validated_and_deduplicated()
+    test_csv_feed_with_quoted_newlines()
+    test_batches_update_a_loaded_matching_index()
+    test_bulk_needs_an_admin_and_a_known_format()
+    test_deprecated_skip_still_pages_jobs()
+    print("ok")
@@ -0,0 +1,101 @@
+import os
+import tempfile
+
+# Runs against a throwaway SQLite file, never stitch.db
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_matching.db")
+
+from database import SessionLocal, engine
+from models.job import Job
+from utils import matching
+from utils.migrations import run_migrations
+
+run_migrations(engine)
+
+
+def ranked_ids(index, text: str) -> set:
+    return {job_id for job_id, score in index.rank(text, 10) if score > 0}
+
+
+def test_workers_sharing_an_index_never_lose_each_others_writes():
+    path = os.path.join(tempfile.mkdtemp(), "job_index")
+    first = matching.MatchingEngine(path=path)
+    first.build([(1, "python django backend", 1)])
+    # Two engines on one directory stand in for two gunicorn workers
+    second = matching.MatchingEngine(path=path)
+    second.load()
+
+    first.add(2, "rust embedded firmware")
+    second.add(3, "golang kubernetes operator")
+    # Compacting folds in what the other worker journaled, not just its own rows
+    first.save()
+    # The other worker's next write lands in the new segment's journal, not the deleted one
+    second.add(4, "swift ios mobile")
+    second.remove(1)
+
+    fresh = matching.MatchingEngine(path=path)
+    fresh.load()
+    assert sorted(fresh.job_ids[fresh.alive].tolist()) == [2, 3, 4]
+    assert ranked_ids(fresh, "golang kubernetes") == {3}
+    first.refresh()
+    assert ranked_ids(first, "swift ios") == {4} and ranked_ids(first, "python django") == set()
+
+
+def test_loading_catches_up_with_edits_and_deletes_made_elsewhere():
+    db = SessionLocal()
+    try:
+        jobs = [
+            Job(title="Catchup Engineer", company="Catchupco", description=f"elixir phoenix {n}")
+            for n in range(3)
+        ]
+        db.add_all(jobs)
+        db.commit()
+        edited, deleted = jobs[0].id, jobs[1].id
+
+        path = os.path.join(tempfile.mkdtemp(), "job_index")
+        matching.rebuild(db, matching.MatchingEngine(path=path))
+
+        # Bulk statements skip the ORM events, like a process without the index loaded
+        db.query(Job).filter(Job.id == edited).update(
+            {"description": "haskell compilers", "version": Job.version + 1}, synchronize_session=False,
+        )
+        db.query(Job).filter(Job.id == deleted).delete(synchronize_session=False)
+        db.commit()
+
+        index = matching.ensure_loaded(db, matching.MatchingEngine(path=path))
+        assert ranked_ids(index, "haskell compilers") == {edited}
+        assert deleted not in index.job_ids[index.alive].tolist()
+        assert ranked_ids(index, "elixir phoenix") == {jobs[2].id}
+    finally:
+        db.close()
+
+
+def test_orm_writes_reach_the_loaded_index_only_when_committed():
+    previous = matching._matching_engine
+    index = matching.MatchingEngine(path=os.path.join(tempfile.mkdtemp(), "job_index"))
+    index.build([])
+    matching._matching_engine = index
+    db = SessionLocal()
+    try:
+        db.add(Job(title="Phantom Engineer", company="Rollbackco", description="cobol mainframe"))
+        db.flush()
+        assert len(index) == 0
+        db.rollback()
+        assert ranked_ids(index, "cobol mainframe") == set()
+
+        kept = Job(title="Kept Engineer", company="Commitco", description="fortran numerics")
+        db.add(kept)
+        db.commit()
+        assert ranked_ids(index, "fortran numerics") == {kept.id}
+        db.delete(kept)
+        db.commit()
+        assert ranked_ids(index, "fortran numerics") == set()
+    finally:
+        db.close()
+        matching._matching_engine = previous
+
+
+if __name__ == "__main__":
+    test_workers_sharing_an_index_never_lose_each_others_writes()
+    test_loading_catches_up_with_edits_and_deletes_made_elsewhere()
+    test_orm_writes_reach_the_loaded_index_only_when_committed()
+    print("ok")
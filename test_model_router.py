@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import tempfile
+
+# Runs against a throwaway SQLite file and a local stub backend, never stitch.db or Gemini
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_model_router.db")
+os.environ["ADMIN_EMAILS"] = "admin@example.com"
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["GEMINI_MODELS"] = "model-a,model-b"
+
+from utils.llm import LLMClient, LLMHTTPError, LLMResponse
+from utils.model_router import ModelRouter
+
+
+class StubBackend:
+    # Per-model latency and scripted failures (a list of status codes, consumed in order)
+    def __init__(self, latency, failures=None):
+        self.latency = latency
+        self.failures = failures or {}
+        self.calls = []
+
+    async def generate(self, model_name, prompt, json_output=True):
+        self.calls.append(model_name)
+        await asyncio.sleep(self.latency[model_name])
+        pending = self.failures.get(model_name)
+        if pending:
+            raise LLMHTTPError(pending.pop(0))
+        return LLMResponse(text=json.dumps({"model": model_name}), model=model_name)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(backend, clock, **router_kwargs):
+    router = ModelRouter(["slow", "fast", "spare"], cooldown=60, clock=clock, **router_kwargs)
+    return LLMClient(backend, router=router, base_delay=0.001, max_delay=0.002, deadline=5)
+
+
+def run(client, count=1):
+    async def go():
+        return [await client.generate("prompt") for _ in range(count)]
+    return asyncio.run(go())
+
+
+def test_routes_to_fastest_healthy_model():
+    backend = StubBackend({"slow": 0.06, "fast": 0.001, "spare": 0.02})
+    client = make_client(backend, Clock())
+    # Every model is probed once, after that the fastest one takes the traffic
+    run(client, 3)
+    assert sorted(backend.calls) == ["fast", "slow", "spare"]
+    responses = run(client, 5)
+    assert {response.model for response in responses} == {"fast"}
+    assert client.router.candidates() == ["fast", "spare", "slow"]
+
+
+def test_quota_error_falls_back_and_cools_down():
+    clock = Clock()
+    backend = StubBackend({"slow": 0.06, "fast": 0.001, "spare": 0.02})
+    client = make_client(backend, clock)
+    run(client, 3)
+    backend.calls.clear()
+    backend.failures["fast"] = [429]
+
+    response = run(client)[0]
+    # The 429 moved the request to the next model straight away, without a backoff retry
+    assert backend.calls == ["fast", "spare"]
+    assert response.model == "spare"
+    assert client.retries == 0
+    assert client.router.fallbacks == 1
+    assert "fast" not in client.router.candidates()
+
+    clock.now += 61
+    assert client.router.candidates()[0] == "fast"
+    assert run(client)[0].model == "fast"
+
+
+def test_repeated_quota_errors_extend_cooldown():
+    clock = Clock()
+    router = ModelRouter(["a", "b"], cooldown=60, max_cooldown=200, clock=clock)
+    for expected in (60, 120, 200):
+        router.record_failure("a", 429, "quota")
+        assert router.stats()["models"][0]["cooldown_remaining"] == expected
+        clock.now += expected
+    router.record_success("a", 0.1)
+    router.record_failure("a", 429, "quota")
+    assert router.stats()["models"][0]["cooldown_remaining"] == 60
+
+
+def test_high_error_rate_trips_cooldown():
+    router = ModelRouter(["a", "b"], error_threshold=0.5, min_samples=4, clock=Clock())
+    router.record_success("a", 0.1)
+    router.record_failure("a", 503)
+    router.record_success("a", 0.1)
+    assert "a" in router.candidates()
+    router.record_failure("a", 503)
+    assert router.candidates() == ["b"]
+
+
+def test_all_models_exhausted_raises():
+    backend = StubBackend(
+        {"slow": 0.001, "fast": 0.001, "spare": 0.001},
+        failures={name: [429] * 10 for name in ("slow", "fast", "spare")},
+    )
+    client = make_client(backend, Clock())
+    try:
+        run(client)
+    except LLMHTTPError as e:
+        assert e.code == 429
+    else:
+        raise AssertionError("expected the last 429 to be raised")
+    assert client.failures == 1
+    assert not any(model["healthy"] for model in client.router.stats()["models"])
+
+
+def test_explicit_model_is_not_rerouted():
+    backend = StubBackend({"slow": 0.001, "fast": 0.001, "spare": 0.001}, failures={"slow": [400]})
+    client = make_client(backend, Clock())
+    try:
+        asyncio.run(client.generate("prompt", model_name="slow"))
+    except LLMHTTPError:
+        pass
+    assert backend.calls == ["slow"]
+    assert client.router.stats()["models"][0]["errors"] == 1
+
+
+def test_admin_endpoint():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as http:
+        tokens = {}
+        for email in ("admin@example.com", "user@example.com"):
+            http.post("/auth/signup", json={"email": email, "password": "pw", "full_name": "T"})
+            login = http.post("/auth/login", data={"username": email, "password": "pw"})
+            tokens[email] = {"Authorization": "Bearer " + login.json()["access_token"]}
+
+        assert http.get("/admin/models", headers=tokens["user@example.com"]).status_code == 403
+        state = http.get("/admin/models", headers=tokens["admin@example.com"]).json()
+        assert [model["model"] for model in state["models"]] == ["model-a", "model-b"]
+
+        main.resume.get_llm_client().router.record_failure("model-a", 429, "quota")
+        state = http.get("/admin/models", headers=tokens["admin@example.com"]).json()
+        assert state["order"] == ["model-b"]
+        state = http.post("/admin/models/model-a/reset", headers=tokens["admin@example.com"]).json()
+        assert state["models"][0]["healthy"]
+        assert http.post("/admin/models/nope/reset", headers=tokens["admin@example.com"]).status_code == 404
+
+        assert http.get("/resume/stats").status_code == 401
+        assert http.get("/resume/cache/stats", headers=tokens["user@example.com"]).status_code == 403
+        assert http.get("/resume/stats", headers=tokens["admin@example.com"]).status_code == 200
+
+
+if __name__ == "__main__":
+    test_routes_to_fastest_healthy_model()
+    test_quota_error_falls_back_and_cools_down()
+    test_repeated_quota_errors_extend_cooldown()
+    test_high_error_rate_trips_cooldown()
+    test_all_models_exhausted_raises()
+    test_explicit_model_is_not_rerouted()
+    test_admin_endpoint()
+    print("ok")
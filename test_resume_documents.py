@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+# Runs against a throwaway SQLite file and upload directory, never stitch.db or data/
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_resume_documents.db")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+os.environ.setdefault("EXTRACTION_CACHE_DIR", tempfile.mkdtemp())
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, engine
+from models.job import Job
+from models.resume import Resume
+from models.user import User
+from utils import matching, security, uploads
+from utils.migrations import run_migrations
+
+# Set on the module: another test may have imported it first
+matching.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "job_index")
+run_migrations(engine)
+client = TestClient(main.app)
+
+
+def pdf(text: str) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def store_resume(email: str, contents: bytes, analysis: dict):
+    sha256 = hashlib.sha256(contents).hexdigest()
+    path = uploads.path_for(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(contents)
+    db = SessionLocal()
+    try:
+        user = User(email=email, hashed_password="x", full_name="Test")
+        db.add(user)
+        db.flush()
+        resume = Resume(user_id=user.id, file_path=f"{uploads.URL_PREFIX}{sha256}.pdf", score=40, recommended_fields=[],
+                        parsed_data={"analysis": analysis})
+        db.add(resume)
+        db.commit()
+        token = security.create_access_token({"sub": email, "uid": user.id}, timedelta(minutes=5))
+        return path, resume.id, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def test_a_corrupt_stored_upload_does_not_break_resume_endpoints():
+    # Not a PDF at all, saved under a .pdf name the way an upload would be
+    path, resume_id, headers = store_resume("corrupt@example.com", b"this is not a pdf " * 50, {"feedback": "unreadable"})
+    try:
+        score = client.get("/resume/score", headers=headers)
+        assert score.status_code == 200, score.text
+        assert score.json()["score"] == 40 and "page_count" not in score.json()
+        detail = client.get(f"/resume/{resume_id}?pages=true", headers=headers)
+        assert detail.status_code == 200, detail.text
+    finally:
+        os.remove(path)
+
+
+def test_jobs_are_matched_on_the_resume_text():
+    db = SessionLocal()
+    try:
+        job = Job(title="Backend Engineer", company="Matchco", description="Python, Django and AWS services", location="Remote")
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+    # The stored analysis says nothing about skills; only the resume itself does
+    path, _, headers = store_resume(
+        "matcher@example.com", pdf("Backend developer: Python, Django, AWS, PostgreSQL"), {"feedback": "Solid backend profile"},
+    )
+    try:
+        response = client.get("/jobs/match", params={"limit": 50}, headers=headers)
+        assert response.status_code == 200, response.text
+        match = next(item for item in response.json() if item["job"]["id"] == job_id)
+        assert match["match_percentage"] > 0
+        assert not {"python", "django", "aws"} & {skill.lower() for skill in match["missing_skills"]}
+        assert set(match["job"]) == {"id", "title", "company", "description", "location", "created_at"}
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    test_a_corrupt_stored_upload_does_not_break_resume_endpoints()
+    test_jobs_are_matched_on_the_resume_text()
+    print("ok")
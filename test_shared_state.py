@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base
+from models.user import User
+from utils.cache import AnalysisCache
+from utils.model_router import ModelRouter
+from utils.shared_state import MemoryStore, open_store
+from utils.user_cache import UserCache
+
+# Two store handles on one SQLite file stand in for two gunicorn workers
+
+
+def sqlite_url() -> str:
+    return "sqlite:///" + os.path.join(tempfile.mkdtemp(), "shared_state.db")
+
+
+def _hold_slots(url: str, limit: int, rounds: int) -> int:
+    store = open_store(url)
+    semaphore = store.semaphore("llm", limit, lease_ttl=30)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with semaphore.hold():
+            peak = max(peak, store.holders("llm"))
+            await asyncio.sleep(0.01)
+
+    async def run():
+        for _ in range(rounds):
+            await asyncio.gather(*(call() for _ in range(limit)))
+
+    asyncio.run(run())
+    return peak
+
+
+def test_semaphore_limit_holds_across_processes():
+    url = sqlite_url()
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        peaks = pool.starmap(_hold_slots, [(url, 2, 10)] * 4)
+    assert max(peaks) <= 2, peaks
+    assert open_store(url).holders("llm") == 0
+
+
+def test_expired_leases_are_reclaimed():
+    store = open_store(sqlite_url())
+    assert store.try_acquire("login:ip:1.2.3.4", 1, "first", ttl=0.05)
+    assert not store.try_acquire("login:ip:1.2.3.4", 1, "second", ttl=0.05)
+    time.sleep(0.1)
+    # "first" died without releasing; its slot comes back once the lease runs out
+    assert store.try_acquire("login:ip:1.2.3.4", 1, "second", ttl=0.05)
+
+
+def test_analysis_cache_is_shared_between_workers():
+    url = sqlite_url()
+    first, second = AnalysisCache(shared=open_store(url)), AnalysisCache(shared=open_store(url))
+    asyncio.run(first.set("key", {"score": 80}))
+    assert asyncio.run(second.get("key")) == {"score": 80}
+    assert second.stats()["shared"]["hits"] == 1
+
+    # memory:// is per process, so nothing crosses over
+    alone, other = AnalysisCache(shared=MemoryStore()), AnalysisCache(shared=MemoryStore())
+    asyncio.run(alone.set("key", {"score": 80}))
+    assert asyncio.run(other.get("key")) is None
+
+
+def test_user_invalidation_reaches_other_workers():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    url = sqlite_url()
+    store = open_store(url)
+    reads = []
+    aget = store.aget
+
+    async def counted_aget(key):
+        reads.append(key)
+        return await aget(key)
+
+    store.aget = counted_aget
+    first, second = UserCache(shared=open_store(url)), UserCache(shared=store, check_interval=0.3)
+    with Session(engine) as db:
+        user = User(email="a@example.com", hashed_password="x", full_name="A")
+        db.add(user)
+        db.commit()
+        second.put(user)
+        first.invalidate(user.id)
+        # A hit inside the check interval is a dict lookup, not a store read
+        for _ in range(20):
+            assert asyncio.run(second.get(db, user.id)) is not None
+        assert reads == []
+        time.sleep(0.3)
+        assert asyncio.run(second.get(db, user.id)) is None
+        assert len(reads) == 1
+        assert second.stats()["shared"]["remote_invalidations"] == 1
+
+
+def test_user_changes_invalidate_the_cache_once_committed():
+    from utils.user_cache import user_cache
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    with Session(engine) as db:
+        user = User(email="b@example.com", hashed_password="x", full_name="B")
+        db.add(user)
+        db.commit()
+        user_cache.put(user)
+
+        user.full_name = "Rolled back"
+        db.flush()
+        assert user_cache.cache.get(user.id) is not None
+        db.rollback()
+        assert user_cache.cache.get(user.id) is not None
+
+        user.full_name = "Committed"
+        db.flush()
+        assert user_cache.cache.get(user.id) is not None
+        db.commit()
+        assert user_cache.cache.get(user.id) is None
+
+
+def test_quota_cooldown_is_shared_between_routers():
+    url = sqlite_url()
+    first = ModelRouter(["primary", "backup"], shared=open_store(url))
+    second = ModelRouter(["primary", "backup"], shared=open_store(url))
+    first.record_failure("primary", 429, "quota exhausted")
+    # Published by the next sync, not by record_failure itself
+    asyncio.run(first.sync())
+    asyncio.run(second.sync())
+    assert second.candidates() == ["backup"]
+    first.reset("primary")
+    second.reset("primary")
+    assert "primary" in second.candidates()
+
+
+def test_waiting_on_the_store_does_not_block_the_event_loop():
+    url = sqlite_url()
+    store = open_store(url)
+    store.get("warm-up")
+    # Another worker holds the write lock for a while
+    blocker = sqlite3.connect(url.split("://", 1)[1][1:], isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        asyncio.get_running_loop().call_later(0.3, blocker.execute, "COMMIT")
+        acquired = await store.atry_acquire("llm", 1, "holder", 30)
+        ticker.cancel()
+        return acquired, ticks
+
+    acquired, ticks = asyncio.run(run())
+    assert acquired
+    # The loop kept running while the lease waited on the lock
+    assert ticks >= 10, ticks
+
+
+if __name__ == "__main__":
+    test_semaphore_limit_holds_across_processes()
+    test_expired_leases_are_reclaimed()
+    test_analysis_cache_is_shared_between_workers()
+    test_user_invalidation_reaches_other_workers()
+    test_user_changes_invalidate_the_cache_once_committed()
+    test_quota_cooldown_is_shared_between_routers()
+    test_waiting_on_the_store_does_not_block_the_event_loop()
+    print("ok")
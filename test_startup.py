@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_startup import ROOT, import_profile, time_to_first_response
+
+# Generous ceilings for a cold interpreter on a small instance; tighten with the env vars
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "4000"))
+FIRST_RESPONSE_BUDGET_MS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET_MS", "8000"))
+
+
+def run_python(code: str, **env) -> str:
+    database = os.path.join(tempfile.mkdtemp(), "test_startup.db")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": "sqlite:///" + database, "LLM_BACKEND": "fake", **env},
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_import_skips_heavy_dependencies():
+    # GEMINI_API_KEY set so the Gemini backend is the one configured, as in production
+    total_ms, _, loaded = import_profile(GEMINI_API_KEY="test-key")
+    print(f"import main: {total_ms:.0f}ms")
+    assert loaded == [], f"imported at startup: {loaded}"
+    assert total_ms < IMPORT_BUDGET_MS
+
+
+def test_import_does_not_touch_the_database():
+    code = "import os, main; print(os.path.exists(main.engine.url.database))"
+    assert run_python(code) == "False"
+
+
+def test_lifespan_runs_migrations_unless_disabled():
+    code = (
+        "from fastapi.testclient import TestClient; from sqlalchemy import inspect; import main\n"
+        "with TestClient(main.app) as client:\n"
+        "    client.get('/')\n"
+        "print(sorted(inspect(main.engine).get_table_names()))"
+    )
+    assert "'resumes'" in run_python(code, RUN_MIGRATIONS="1")
+    assert "'resumes'" not in run_python(code, RUN_MIGRATIONS="0")
+
+
+def test_llm_sdk_is_loaded_after_startup():
+    # Startup does not wait for the Gemini SDK, but it is imported in the background so the
+    # first analysis does not pay for it either
+    code = (
+        "import sys, time; from fastapi.testclient import TestClient; import main\n"
+        "with TestClient(main.app) as client:\n"
+        "    deadline = time.time() + 30\n"
+        "    while 'google.generativeai' not in sys.modules and time.time() < deadline:\n"
+        "        time.sleep(0.05)\n"
+        "print('google.generativeai' in sys.modules)"
+    )
+    assert run_python(code, LLM_BACKEND="gemini", GEMINI_API_KEY="test-key") == "True"
+
+
+def test_time_to_first_response():
+    elapsed_ms = time_to_first_response(GEMINI_API_KEY="test-key")
+    print(f"time to first response: {elapsed_ms:.0f}ms")
+    assert elapsed_ms < FIRST_RESPONSE_BUDGET_MS
+
+
+if __name__ == "__main__":
+    test_import_skips_heavy_dependencies()
+    test_import_does_not_touch_the_database()
+    test_lifespan_runs_migrations_unless_disabled()
+    test_llm_sdk_is_loaded_after_startup()
+    test_time_to_first_response()
+    print("ok")
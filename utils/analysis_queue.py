@@ -0,0 +1,327 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from database import run_db
+from models.analysis_task import AnalysisTask
+from utils import uploads
+from utils.cache import TTLCache
+from utils.logs import get_logger
+from utils.shared_state import shared_state
+from utils.uploads import StoredUpload
+
+logger = get_logger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_QUEUE_MAX = int(os.getenv("ANALYSIS_QUEUE_MAX", "1000"))
+# "db" persists tasks (the PDF itself stays in the upload store) so queued work survives a restart
+ANALYSIS_QUEUE_BACKEND = os.getenv("ANALYSIS_QUEUE_BACKEND", "memory").lower()
+
+FINISHED = ("done", "failed")
+PUBLIC_FIELDS = ("id", "status", "stage", "progress", "filename", "result", "error", "resume_id")
+# How often a worker checks the shared store for a task another worker is running
+SHARED_POLL_INTERVAL = 0.5
+# Seconds a durable task stays claimed by its worker; renewed every third of that while it runs
+ANALYSIS_LEASE_TTL = float(os.getenv("ANALYSIS_LEASE_TTL", "90"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class AnalysisQueue:
+    def __init__(self, workers: int = 2, maxsize: int = 1000, durable: bool = False, shared=None):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.durable = durable
+        # Each worker runs the tasks submitted to it; with several workers their state is
+        # also published to the shared store so a status poll can land on any of them
+        self.shared = shared if shared is not None and shared.shared else None
+        self.handler: Optional[Callable[..., Awaitable[dict]]] = None
+        # Task state lives here for polling; finished tasks age out after an hour
+        self.states = TTLCache(maxsize=max(10 * maxsize, 1000), ttl=3600)
+        self._queue: Optional[asyncio.Queue] = None
+        self._events = {}
+        self._workers = []
+        self.owner = None
+        self.processed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        # Picked here rather than at import so every forked gunicorn worker gets its own
+        self.owner = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        if self.durable:
+            for task_id in await run_db(self._recover):
+                self._queue.put_nowait(task_id)
+        self._workers = [self._start_worker() for _ in range(self.workers)]
+
+    def _start_worker(self) -> asyncio.Task:
+        worker = asyncio.create_task(self._work())
+        worker.add_done_callback(self._worker_done)
+        return worker
+
+    def _worker_done(self, worker: asyncio.Task):
+        # Only stop() cancels workers; one that ends any other way is replaced so the pool
+        # does not shrink for the rest of the process
+        if worker.cancelled() or worker not in self._workers:
+            return
+        logger.error("Analysis worker exited unexpectedly: %r", worker.exception())
+        self.restarts += 1
+        self._workers[self._workers.index(worker)] = self._start_worker()
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if self.durable and self.owner is not None:
+            try:
+                await run_db(self._release)
+            except Exception as e:
+                logger.warning("Could not release analysis tasks: %s", e)
+
+    def _recover(self, db: Session):
+        # A running task whose lease ran out belongs to a worker that died; live workers keep
+        # renewing theirs, so their tasks are left alone
+        expired = db.query(AnalysisTask).filter(
+            AnalysisTask.status == "running",
+            or_(AnalysisTask.lease_until.is_(None), AnalysisTask.lease_until < time.time()),
+        ).update({"status": "queued", "owner": None, "lease_until": None}, synchronize_session=False)
+        db.commit()
+        # Every queued task is offered to this worker too; _claim lets exactly one worker run it
+        recovered = [
+            task_id for (task_id,) in
+            db.query(AnalysisTask.id).filter(AnalysisTask.status == "queued").order_by(AnalysisTask.created_at).limit(self.maxsize)
+        ]
+        if recovered:
+            logger.info("Recovered %s queued analysis tasks (%s from expired leases)", len(recovered), expired)
+        return recovered
+
+    def _claim(self, db: Session, task_id: str) -> Optional[dict]:
+        # One conditional UPDATE: whichever worker flips the row from queued owns the task
+        claimed = db.query(AnalysisTask).filter(AnalysisTask.id == task_id, AnalysisTask.status == "queued").update(
+            {
+                "status": "running", "stage": "extracting", "progress": 10,
+                "owner": self.owner, "lease_until": time.time() + ANALYSIS_LEASE_TTL,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        if not claimed:
+            return None
+        return self._state_from_row(db.get(AnalysisTask, task_id))
+
+    def _renew(self, db: Session, task_id: str) -> bool:
+        renewed = db.query(AnalysisTask).filter(AnalysisTask.id == task_id, AnalysisTask.owner == self.owner).update(
+            {"lease_until": time.time() + ANALYSIS_LEASE_TTL}, synchronize_session=False,
+        )
+        db.commit()
+        return bool(renewed)
+
+    def _release(self, db: Session):
+        # Tasks cut off by a graceful shutdown go back to the queue without waiting out their lease
+        db.query(AnalysisTask).filter(AnalysisTask.owner == self.owner, AnalysisTask.status == "running").update(
+            {"status": "queued", "owner": None, "lease_until": None}, synchronize_session=False,
+        )
+        db.commit()
+
+    async def _keep_lease(self, task_id: str):
+        while True:
+            await asyncio.sleep(ANALYSIS_LEASE_TTL / 3)
+            try:
+                if not await run_db(self._renew, task_id):
+                    logger.warning("Lost the lease on analysis task %s", task_id)
+            except Exception as e:
+                logger.warning("Could not renew the lease on analysis task %s: %s", task_id, e)
+
+    @staticmethod
+    def _state_from_row(task: AnalysisTask) -> dict:
+        state = {field: getattr(task, field) for field in PUBLIC_FIELDS}
+        state["user_id"] = task.user_id
+        return state
+
+    async def submit(self, user_id: int, upload: StoredUpload, job_description: str) -> dict:
+        if self._queue is None:
+            raise RuntimeError("Analysis queue is not running")
+        if self._queue.full():
+            raise QueueFull("Analysis queue is full, please retry shortly")
+
+        task_id = uuid.uuid4().hex
+        state = {
+            "id": task_id, "user_id": user_id, "status": "queued", "stage": "queued", "progress": 0,
+            "filename": upload.filename, "result": None, "error": None, "resume_id": None,
+        }
+        if self.durable:
+            await run_db(self._insert, state, upload, job_description)
+            self.states.set(task_id, state)
+            self._queue.put_nowait(task_id)
+        else:
+            self.states.set(task_id, dict(state, _upload=upload, _job_description=job_description))
+            self._queue.put_nowait(task_id)
+        await self._publish(state)
+        return self.public(state)
+
+    async def _publish(self, state: dict):
+        if self.shared is None:
+            return
+        try:
+            await self.shared.aset(f"analysis-task:{state['id']}", dict(self.public(state), user_id=state["user_id"]), ttl=self.states.ttl)
+        except Exception as e:
+            logger.warning("Could not publish analysis task %s: %s", state["id"], e)
+
+    async def _shared_state(self, task_id: str) -> Optional[dict]:
+        try:
+            return await self.shared.aget(f"analysis-task:{task_id}")
+        except Exception as e:
+            logger.warning("Could not read analysis task %s: %s", task_id, e)
+            return None
+
+    def _insert(self, db: Session, state: dict, upload: StoredUpload, job_description: str):
+        db.add(AnalysisTask(
+            id=state["id"], user_id=state["user_id"], status="queued", stage="queued", progress=0,
+            filename=state["filename"], job_description=job_description, upload_sha256=upload.sha256,
+        ))
+        db.commit()
+
+    async def get(self, task_id: str) -> Optional[dict]:
+        state = self.states.get(task_id)
+        if state is None and self.shared is not None:
+            state = await self._shared_state(task_id)
+        if state is None and self.durable:
+            state = await run_db(self._load_state, task_id)
+        return state
+
+    def _load_state(self, db: Session, task_id: str) -> Optional[dict]:
+        task = db.get(AnalysisTask, task_id)
+        return self._state_from_row(task) if task is not None else None
+
+    @staticmethod
+    def public(state: dict) -> dict:
+        return {field: state.get(field) for field in PUBLIC_FIELDS}
+
+    async def wait_for_change(self, task_id: str, timeout: float) -> bool:
+        if self.states.get(task_id) is None and (self.shared is not None or self.durable):
+            return await self._poll_shared(task_id, timeout)
+        event = self._events.setdefault(task_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _poll_shared(self, task_id: str, timeout: float) -> bool:
+        # Running on another worker, so there is no local event to wait on
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        before = await self.get(task_id)
+        while loop.time() < deadline:
+            await asyncio.sleep(min(SHARED_POLL_INTERVAL, max(0.0, deadline - loop.time())))
+            if await self.get(task_id) != before:
+                return True
+        return False
+
+    async def update(self, task_id: str, **fields):
+        state = self.states.get(task_id) or {}
+        state.update(fields)
+        self.states.set(task_id, state)
+        if "id" in state:
+            await self._publish(state)
+        if self.durable:
+            await run_db(self._persist, task_id, fields)
+        # Wake every SSE listener, then arm a fresh event for the next change
+        event = self._events.pop(task_id, None)
+        if event is not None:
+            event.set()
+
+    def _persist(self, db: Session, task_id: str, fields: dict):
+        values = {key: value for key, value in fields.items() if not key.startswith("_")}
+        if values.get("status") in FINISHED:
+            values["payload"] = None
+        db.query(AnalysisTask).filter(AnalysisTask.id == task_id).update(values)
+        db.commit()
+
+    def _load_payload(self, db: Session, task_id: str):
+        task = db.get(AnalysisTask, task_id)
+        if task is None:
+            return None, None
+        if task.upload_sha256:
+            return uploads.get(task.upload_sha256, task.filename), task.job_description
+        # Tasks queued before uploads were stored on disk carry the PDF inline
+        return task.payload, task.job_description
+
+    async def _work(self):
+        while True:
+            task_id = await self._queue.get()
+            try:
+                await self._run(task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Analysis task %s failed: %s", task_id, e)
+                self.failed += 1
+                try:
+                    await self.update(task_id, status="failed", stage="failed", error=str(e))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as update_error:
+                    # The row keeps its last status; once its lease lapses the next worker to start recovers it
+                    logger.warning("Could not record failure of analysis task %s: %s", task_id, update_error)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, task_id: str):
+        state = self.states.get(task_id) or {}
+        if self.durable:
+            claimed = await run_db(self._claim, task_id)
+            if claimed is None:
+                # Another worker got to it first (or already finished it); status comes from there
+                self.states.delete(task_id)
+                return
+            state = claimed
+            self.states.set(task_id, state)
+            source, job_description = await run_db(self._load_payload, task_id)
+        else:
+            source, job_description = state.pop("_upload", None), state.pop("_job_description", None)
+        if source is None:
+            raise ValueError("Uploaded file is no longer available")
+
+        await self.update(task_id, status="running", stage="extracting", progress=10)
+
+        async def progress(stage: str, percent: int):
+            await self.update(task_id, stage=stage, progress=percent)
+
+        lease = asyncio.create_task(self._keep_lease(task_id)) if self.durable else None
+        try:
+            result = await self.handler(state, source, job_description, progress)
+        finally:
+            if lease is not None:
+                lease.cancel()
+        self.processed += 1
+        await self.update(task_id, status="done", stage="done", progress=100, **result)
+
+    def stats(self):
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "maxsize": self.maxsize,
+            "durable": self.durable,
+            "processed": self.processed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+        }
+
+
+analysis_queue = AnalysisQueue(
+    workers=ANALYSIS_WORKERS,
+    maxsize=ANALYSIS_QUEUE_MAX,
+    durable=ANALYSIS_QUEUE_BACKEND == "db",
+    shared=shared_state,
+)
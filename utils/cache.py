@@ -0,0 +1,195 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from database import run_db
+from models.analysis_cache import AnalysisCacheEntry
+from utils.logs import get_logger
+from utils.shared_state import shared_state
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    # Bounded LRU with a per-entry time-to-live. Thread-safe so it can be shared
+    # between the event loop and threadpool-run sync endpoints.
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _normalize_job_description(job_description: str) -> str:
+    return re.sub(r"\s+", " ", job_description or "").strip()
+
+
+def analysis_cache_key(pdf_hash: str, job_description: str, model_name: str, prompt_version: str) -> str:
+    jd_hash = hashlib.sha256(_normalize_job_description(job_description).encode("utf-8")).hexdigest()
+    raw = "\x1f".join([pdf_hash, jd_hash, model_name, prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    # Up to three tiers: an in-process TTLCache, the shared-state store when several
+    # workers run (so one worker's LLM call serves them all), and an optional
+    # table-backed store (SQLite locally, Postgres on Render) that survives restarts.
+    def __init__(self, maxsize: int = 512, ttl: float = 86400, persistent: bool = False, shared=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.persistent = persistent
+        self.shared = shared if shared is not None and shared.shared else None
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_errors = 0
+
+    async def _shared_get(self, key: str):
+        try:
+            value = await self.shared.aget("analysis:" + key)
+        except Exception as e:
+            logger.warning("Shared analysis cache read error: %s", e)
+            self.shared_errors += 1
+            return None
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    async def _shared_set(self, key: str, value: dict, ttl: float):
+        try:
+            await self.shared.aset("analysis:" + key, value, ttl=ttl)
+        except Exception as e:
+            logger.warning("Shared analysis cache write error: %s", e)
+            self.shared_errors += 1
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is None and self.shared is not None:
+            value = await self._shared_get(key)
+        if value is not None or not self.persistent:
+            return value
+
+        try:
+            found = await run_db(self._db_get, key)
+        except Exception as e:
+            logger.warning("Analysis cache read error: %s", e)
+            self.db_errors += 1
+            return None
+        if found is None:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        value, expires_at = found
+        remaining = expires_at - time.time()
+        self.memory.set(key, value, ttl=remaining)
+        if self.shared is not None:
+            await self._shared_set(key, value, remaining)
+        return value
+
+    async def set(self, key: str, value: dict, model_name: str = None, prompt_version: str = None):
+        self.memory.set(key, value)
+        if self.shared is not None:
+            await self._shared_set(key, value, self.memory.ttl)
+        if not self.persistent:
+            return
+
+        try:
+            await run_db(self._db_set, key, value, model_name, prompt_version, time.time() + self.memory.ttl)
+        except Exception as e:
+            logger.warning("Analysis cache write error: %s", e)
+            self.db_errors += 1
+
+    @staticmethod
+    def _db_get(db: Session, key: str):
+        entry = db.get(AnalysisCacheEntry, key)
+        if entry is None or entry.expires_at < time.time():
+            return None
+        return entry.result, entry.expires_at
+
+    @staticmethod
+    def _db_set(db: Session, key: str, value: dict, model_name: str, prompt_version: str, expires_at: float):
+        db.merge(AnalysisCacheEntry(
+            key=key, model_name=model_name, prompt_version=prompt_version, result=value, expires_at=expires_at,
+        ))
+        db.commit()
+
+    def stats(self):
+        stats = {"memory": self.memory.stats(), "persistent": self.persistent}
+        if self.shared is not None:
+            stats["shared"] = {"hits": self.shared_hits, "misses": self.shared_misses, "errors": self.shared_errors}
+        if self.persistent:
+            stats["db"] = {"hits": self.db_hits, "misses": self.db_misses, "errors": self.db_errors}
+        return stats
+
+
+analysis_cache = AnalysisCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "86400")),
+    persistent=os.getenv("ANALYSIS_CACHE_BACKEND", "memory").lower() == "db",
+    shared=shared_state,
+)
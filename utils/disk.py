@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from utils.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Files used more recently than this are never swept, so an upload still waiting in the
+# analysis queue (or being read right now) is not deleted from under it
+DISK_SWEEP_MIN_AGE = float(os.getenv("DISK_SWEEP_MIN_AGE", "900"))
+# Other workers write to the same directories, so the real size is rescanned this often
+DISK_RESCAN_INTERVAL = 300
+
+
+class DiskBudget:
+    # Caps the bytes kept under a directory of files that can always be recreated (stored
+    # uploads, extracted pages). Writers report what they add; once the total passes
+    # max_bytes the least recently used files are deleted until it is back under low_water.
+    # Last use is the file's mtime, which readers bump with touch().
+    def __init__(self, directory: str, max_bytes: int, suffix: str, low_water: float = 0.8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._used: Optional[int] = None
+        self._scanned_at = 0.0
+        self.swept_files = 0
+        self.swept_bytes = 0
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def added(self, size: int):
+        # Called after each write, off the event loop; only scans the directory on the first
+        # write, every DISK_RESCAN_INTERVAL, and when the budget looks exceeded
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            now = time.time()
+            if self._used is None or now - self._scanned_at >= DISK_RESCAN_INTERVAL:
+                self._used = sum(size for _, size, _ in self._scan())
+                self._scanned_at = now
+            else:
+                self._used += size
+            if self._used > self.max_bytes:
+                self._sweep(now)
+
+    def _sweep(self, now: float):
+        files = sorted(self._scan())
+        used = sum(size for _, size, _ in files)
+        target = self.max_bytes * self.low_water
+        for mtime, size, path in files:
+            if used <= target or now - mtime < DISK_SWEEP_MIN_AGE:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another worker swept it first
+                pass
+            except OSError as e:
+                logger.warning("Could not sweep %s: %s", path, e)
+                continue
+            used -= size
+            self.swept_files += 1
+            self.swept_bytes += size
+        self._used = used
+        self._scanned_at = now
+        if used > self.max_bytes:
+            logger.warning("%s holds %s bytes, over its %s byte budget, all recently used", self.directory, used, self.max_bytes)
+
+    @staticmethod
+    def touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {
+            "max_bytes": self.max_bytes,
+            "used_bytes": self._used,
+            "swept_files": self.swept_files,
+            "swept_bytes": self.swept_bytes,
+        }
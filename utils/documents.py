@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from typing import List, Optional, Union
+
+from starlette.concurrency import run_in_threadpool
+
+from utils import extraction
+from utils.cache import TTLCache
+from utils.disk import DiskBudget
+from utils.logs import get_logger
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
+# Extracted pages are kept per PDF hash, in memory and as JSON next to the upload store.
+# Kept apart from utils.extraction so the extraction worker processes stay import-light.
+EXTRACTION_CACHE = os.getenv("EXTRACTION_CACHE", "1") != "0"
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "256"))
+EXTRACTION_CACHE_DIR = os.getenv(
+    "EXTRACTION_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "extracted")
+)
+# Bytes of extracted pages kept on disk (0 = unlimited); least recently used files go first
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+class ExtractedDocument:
+    def __init__(self, sha256: str, page_count: int, pages: List[str], blocks: List[list], stats: List[dict] = None):
+        self.sha256 = sha256
+        self.page_count = page_count
+        self.pages = pages
+        self.blocks = blocks
+        self.stats = stats or []
+        self.chars = sum(len(page) for page in pages)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pages)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.pages) >= self.page_count
+
+    def covers(self, max_pages: int, text_budget: int) -> bool:
+        return self.complete or len(self.pages) >= max_pages or self.chars >= text_budget
+
+    def extend(self, result: dict):
+        self.page_count = result["page_count"]
+        self.pages = self.pages + result["pages"]
+        self.blocks = self.blocks + result["blocks"]
+        self.stats = self.stats + result["stats"]
+        self.chars += sum(len(page) for page in result["pages"])
+
+    def to_dict(self) -> dict:
+        return {
+            "sha256": self.sha256, "page_count": self.page_count,
+            "pages": self.pages, "blocks": self.blocks, "stats": self.stats,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ExtractedDocument":
+        return cls(data["sha256"], data["page_count"], data["pages"], data["blocks"], data.get("stats"))
+
+
+class DocumentCache:
+    def __init__(self, maxsize: int = 256, directory: Optional[str] = None, max_bytes: int = 0):
+        self.memory = TTLCache(maxsize=maxsize, ttl=86400)
+        self.directory = directory
+        self.budget = DiskBudget(directory, max_bytes, ".json") if directory else None
+        self.disk_hits = 0
+        self.extractions = 0
+        self.pages_extracted = 0
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}.json")
+
+    def get(self, sha256: str) -> Optional[ExtractedDocument]:
+        document = self.memory.get(sha256)
+        if document is not None or not self.directory:
+            return document
+        path = self._path(sha256)
+        try:
+            with open(path, encoding="utf-8") as f:
+                document = ExtractedDocument.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        self.budget.touch(path)
+        self.disk_hits += 1
+        self.memory.set(sha256, document)
+        return document
+
+    def put(self, document: ExtractedDocument):
+        self.memory.set(document.sha256, document)
+        if not self.directory:
+            return
+        path = self._path(document.sha256)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                json.dump(document.to_dict(), f)
+            os.replace(tmp_path, path)
+            self.budget.added(os.path.getsize(path))
+        except OSError as e:
+            logger.warning("Extraction cache write error: %s", e)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "extractions": self.extractions,
+            "pages_extracted": self.pages_extracted,
+            "disk": self.budget.stats() if self.budget else None,
+        }
+
+
+document_cache = DocumentCache(maxsize=EXTRACTION_CACHE_SIZE, directory=EXTRACTION_CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_BYTES)
+
+
+async def get_document(source: Union[bytes, str], sha256: str, max_pages: int = None,
+                       text_budget: int = None) -> ExtractedDocument:
+    # Returns cached pages when they already cover the request; otherwise extracts only the
+    # pages after the cached ones and appends them
+    max_pages = extraction.EXTRACTION_MAX_PAGES if max_pages is None else max_pages
+    text_budget = extraction.EXTRACTION_TEXT_BUDGET if text_budget is None else text_budget
+    document = await run_in_threadpool(document_cache.get, sha256) if EXTRACTION_CACHE else None
+    if document is not None and document.covers(max_pages, text_budget):
+        return document
+
+    extraction.check_size(source)
+    start = len(document.pages) if document else 0
+    remaining = text_budget - (document.chars if document else 0)
+    with span("extraction"):
+        result = await extraction.run_in_pool(extraction.extract_range, source, start, max_pages, remaining)
+    document_cache.extractions += 1
+    document_cache.pages_extracted += len(result["pages"])
+    if document is None:
+        document = ExtractedDocument(sha256, result["page_count"], result["pages"], result["blocks"], result["stats"])
+    else:
+        document = ExtractedDocument(sha256, document.page_count, document.pages, document.blocks, document.stats)
+        document.extend(result)
+    if EXTRACTION_CACHE:
+        await run_in_threadpool(document_cache.put, document)
+    return document
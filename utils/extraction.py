@@ -0,0 +1,207 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Union
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "15"))
+# Time allowed for a new pool's workers to spawn and import, outside any job's timeout
+EXTRACTION_START_TIMEOUT = float(os.getenv("EXTRACTION_START_TIMEOUT", "60"))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "30"))
+EXTRACTION_MAX_BYTES = int(os.getenv("EXTRACTION_MAX_BYTES", str(10 * 1024 * 1024)))
+# Set to 0 to extract inline on the event loop (only useful for benchmarking)
+EXTRACTION_USE_POOL = os.getenv("EXTRACTION_USE_POOL", "1") != "0"
+# Characters after which page extraction stops; the prompt only ever uses a fraction of it
+EXTRACTION_TEXT_BUDGET = int(os.getenv("EXTRACTION_TEXT_BUDGET", "60000"))
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionTooLarge(ExtractionError):
+    pass
+
+
+def _open(source: Union[bytes, str]):
+    import fitz  # PyMuPDF
+
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _clipped_area(bbox, clip) -> float:
+    x0, y0 = max(bbox[0], clip.x0), max(bbox[1], clip.y0)
+    x1, y1 = min(bbox[2], clip.x1), min(bbox[3], clip.y1)
+    return max(0.0, x1 - x0) * max(0.0, y1 - y0)
+
+
+def extract_pages(source: Union[bytes, str], max_pages: int = EXTRACTION_MAX_PAGES) -> List[str]:
+    # Runs inside a worker process, so PyMuPDF is imported there and not in the API process.
+    # A path is opened straight from disk, so the PDF bytes never cross the process boundary.
+    doc = _open(source)
+    try:
+        return [doc[i].get_text() for i in range(min(doc.page_count, max_pages))]
+    finally:
+        doc.close()
+
+
+def extract_range(source: Union[bytes, str], start: int = 0, max_pages: int = EXTRACTION_MAX_PAGES,
+                  text_budget: Optional[int] = None) -> dict:
+    # Pages are only loaded as needed: extraction stops at max_pages or once text_budget
+    # characters have been collected. Text blocks keep their bounding boxes for layout use.
+    doc = _open(source)
+    try:
+        pages, blocks, stats = [], [], []
+        chars = 0
+        for index in range(start, min(doc.page_count, max_pages)):
+            page = doc[index]
+            page_blocks = [
+                [round(b[0], 1), round(b[1], 1), round(b[2], 1), round(b[3], 1), b[4]]
+                for b in page.get_text("blocks") if b[6] == 0
+            ]
+            text = "".join(block[4] for block in page_blocks)
+            # Image placements only (bounding boxes, no pixel decoding)
+            image_area = sum(_clipped_area(info["bbox"], page.rect) for info in page.get_image_info())
+            area = page.rect.width * page.rect.height or 1.0
+            pages.append(text)
+            blocks.append(page_blocks)
+            # Per-page signals for the scanned/empty pre-flight check
+            stats.append({"chars": len(text.strip()), "image_ratio": round(min(1.0, image_area / area), 3)})
+            chars += len(text)
+            if text_budget is not None and chars >= text_budget:
+                break
+        return {"page_count": doc.page_count, "pages": pages, "blocks": blocks, "stats": stats}
+    finally:
+        doc.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs wait for a free worker here rather than in the pool's own queue, so the timeout only
+# measures the time a job spends running. One semaphore per event loop.
+_slots = None
+_slots_loop = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn instead of fork: the API process runs threads (threadpool, DB pool)
+            context = multiprocessing.get_context("spawn")
+            booted = context.Semaphore(0)
+            _executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=context,
+                initializer=_worker_booted,
+                initargs=(booted,),
+            )
+            _executor._booted = booted
+            _executor._start_lock = threading.Lock()
+            _executor._started = False
+        return _executor
+
+
+def _worker_booted(booted):
+    booted.release()
+
+
+def _start_workers(executor: ProcessPoolExecutor):
+    # Spawning a worker and its imports can take longer than a job is allowed, so all workers
+    # of a new pool are started before any job's time limit begins. Each submit spawns one
+    # worker while none is idle; each worker signals once it has booted.
+    with executor._start_lock:
+        if executor._started:
+            return
+        for _ in range(executor._max_workers):
+            executor.submit(os.getpid)
+        for _ in range(executor._max_workers):
+            if not executor._booted.acquire(timeout=EXTRACTION_START_TIMEOUT):
+                raise BrokenProcessPool("Extraction workers did not start")
+        executor._started = True
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots_loop is not loop:
+        _slots, _slots_loop = asyncio.Semaphore(EXTRACTION_WORKERS), loop
+    return _slots
+
+
+def _recycle_executor(old: ProcessPoolExecutor):
+    # A timed-out job keeps its worker busy, so kill the pool and start a fresh one. Jobs
+    # still in that pool fail with BrokenProcessPool; run_in_pool sees the mark and retries them.
+    global _executor
+    with _executor_lock:
+        if getattr(old, "_recycled", False):
+            return
+        old._recycled = True
+        if _executor is old:
+            _executor = None
+    for process in list(getattr(old, "_processes", {}).values()):
+        process.terminate()
+    old.shutdown(wait=False)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=True, cancel_futures=True)
+
+
+def check_size(source: Union[bytes, str]):
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+    if size > EXTRACTION_MAX_BYTES:
+        raise ExtractionTooLarge(
+            f"PDF is {size} bytes, the limit is {EXTRACTION_MAX_BYTES} bytes."
+        )
+
+
+def _call(fn, *args):
+    # Runs in the worker: PyMuPDF errors (unreadable or corrupt files) come back as
+    # ExtractionError, which the API process can unpickle without importing PyMuPDF
+    try:
+        return fn(*args)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Could not read PDF: {type(e).__name__}: {e}") from None
+
+
+async def run_in_pool(fn, *args):
+    if not EXTRACTION_USE_POOL:
+        return _call(fn, *args)
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        async with _get_slots():
+            # Holding a slot means a worker is free, so the job starts as soon as it is sent
+            executor = get_executor()
+            try:
+                if not executor._started:
+                    await loop.run_in_executor(None, _start_workers, executor)
+                future = loop.run_in_executor(executor, _call, fn, *args)
+                return await asyncio.wait_for(future, timeout=EXTRACTION_TIMEOUT)
+            except asyncio.TimeoutError:
+                _recycle_executor(executor)
+                raise ExtractionError(f"Extraction timed out after {EXTRACTION_TIMEOUT}s")
+            except BrokenProcessPool:
+                # The pool was torn down under this job because of another one: run it again once
+                if getattr(executor, "_recycled", False) and attempt == 0:
+                    continue
+                _recycle_executor(executor)
+                raise ExtractionError("Extraction worker crashed")
+
+
+async def extract_text(source: Union[bytes, str]) -> List[str]:
+    # source is the PDF itself or the path of a stored upload
+    check_size(source)
+    return await run_in_pool(extract_pages, source, EXTRACTION_MAX_PAGES)
@@ -0,0 +1,218 @@
+import codecs
+import csv
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.job import Job
+from schemas.job import JobCreate
+from utils import matching
+from utils.logs import get_logger
+from utils.metrics import jobs_ingested
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
+# Records per INSERT transaction; memory use is bounded by one batch whatever the feed size
+INGEST_BATCH_SIZE = int(os.getenv("JOB_INGEST_BATCH_SIZE", "5000"))
+# Only the first few bad records are reported back line by line; the rest are just counted
+INGEST_MAX_ERRORS = int(os.getenv("JOB_INGEST_MAX_ERRORS", "20"))
+READ_CHUNK_SIZE = 1024 * 1024
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "ndjson",
+    "text/csv": "csv",
+}
+EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "ndjson", ".csv": "csv"}
+INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def content_hash(title: str, company: str, location: Optional[str], description: str) -> str:
+    # Case and whitespace differences do not make a different job
+    parts = (" ".join((value or "").split()).casefold() for value in (title, company, location, description))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def feed_format(content_type: Optional[str] = None, filename: Optional[str] = None) -> Optional[str]:
+    if filename:
+        return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(";", 1)[0].strip().lower())
+    return None
+
+
+def read_chunks(stream, size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    return iter(lambda: stream.read(size), b"")
+
+
+def lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    # Splits on \n only (not str.splitlines) so CSV fields keep any other line breaks;
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        parts = (pending + decoder.decode(chunk)).split("\n")
+        pending = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def records(text_lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    # (line number, record, parse error)
+    if fmt == "csv":
+        reader = csv.DictReader(text_lines)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.line_num, None, f"CSV: {e}"
+                continue
+            # An empty cell means "no value", not an empty string
+            yield reader.line_num, {key: value or None for key, value in row.items() if key}, None
+    else:
+        for number, line in enumerate(text_lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as e:
+                yield number, None, f"JSON: {e}"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc']) or 'record'}: {item['msg']}" for item in error.errors())
+
+
+class IngestReport:
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self.received = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.batches = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < INGEST_MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def summary(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "format": self.format,
+            "received": self.received,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": list(self.errors),
+            "batches": self.batches,
+            "seconds": round(seconds, 3),
+            "jobs_per_second": round(self.received / seconds) if seconds else 0,
+        }
+
+
+def _insert_batch(db: Session, rows: list, report: IngestReport):
+    insert = INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        raise RuntimeError(f"Bulk job ingestion needs SQLite or PostgreSQL, not {db.get_bind().dialect.name}")
+    # Sent as multi-row INSERTs (SQLAlchemy's insertmanyvalues); a hash that is already
+    # taken, by an earlier batch, a concurrent feed or a repeat inside this batch, is
+    # skipped, and RETURNING reports exactly which rows made it in
+    statement = (
+        insert(Job.__table__)
+        .on_conflict_do_nothing(index_elements=["content_hash"])
+        .returning(Job.id, Job.title, Job.description, Job.version)
+    )
+    with span("ingest.batch"):
+        try:
+            inserted = db.execute(statement, rows).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    report.batches += 1
+    report.inserted += len(inserted)
+    report.duplicates += len(rows) - len(inserted)
+    jobs_ingested.inc("inserted", amount=len(inserted))
+    jobs_ingested.inc("duplicate", amount=len(rows) - len(inserted))
+
+    # FTS5 / the Postgres GIN index follow the rows through their trigger / expression
+    # index; the matching index, when this process has one loaded, is appended to here
+    # and compacted once at the end of the feed
+    engine = matching.loaded_engine()
+    if engine is not None and inserted:
+        engine.add_many(((job_id, matching.job_text(title, description), version) for job_id, title, description, version in inserted), compact=False)
+
+
+def ingest(
+    db: Session,
+    chunks: Iterable[bytes],
+    fmt: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_batch: Optional[Callable[[IngestReport], None]] = None,
+) -> IngestReport:
+    report = IngestReport(fmt)
+    batch = []
+
+    def flush():
+        _insert_batch(db, batch, report)
+        batch.clear()
+        if on_batch is not None:
+            on_batch(report)
+
+    try:
+        for line, record, error in records(lines(chunks), fmt):
+            report.received += 1
+            if error is None:
+                try:
+                    job = JobCreate.model_validate(record)
+                except ValidationError as e:
+                    error = _validation_message(e)
+            if error is not None:
+                report.reject(line, error)
+                jobs_ingested.inc("invalid")
+                continue
+            batch.append({
+                "title": job.title,
+                "company": job.company,
+                "description": job.description,
+                "location": job.location,
+                "content_hash": content_hash(job.title, job.company, job.location, job.description),
+            })
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        # Batches already committed stay in; the feed can simply be sent again
+        logger.exception("Job ingestion failed after %s batches (%s inserted)", report.batches, report.inserted)
+        raise
+    finally:
+        engine = matching.loaded_engine()
+        if engine is not None:
+            engine.maybe_compact()
+
+    logger.info(
+        "Ingested %s feed: %s received, %s inserted, %s duplicates, %s invalid",
+        fmt, report.received, report.inserted, report.duplicates, report.invalid,
+    )
+    return report
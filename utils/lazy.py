@@ -0,0 +1,19 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    # Module object whose real import runs on first attribute access (stdlib LazyLoader),
+    # so heavy libraries only cost startup time in processes that actually use them
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
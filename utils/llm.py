@@ -0,0 +1,288 @@
+import asyncio
+import json
+import os
+import random
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from utils.logs import get_logger
+from utils.model_router import ModelRouter
+from utils.shared_state import MemoryStore, shared_state
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
+# HTTP-ish status codes worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    pass
+
+
+class LLMHTTPError(LLMError):
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(message or f"LLM request failed with status {code}")
+        self.code = code
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+
+def status_code(exc: Exception) -> Optional[int]:
+    # google.api_core exceptions expose the HTTP status as `.code`
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+    if isinstance(exc, asyncio.TimeoutError):
+        return 504
+    return None
+
+
+class GeminiBackend:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._genai = None
+        # GenerativeModel objects hold the underlying gRPC/REST client, so keep one per model
+        self._models = {}
+
+    @property
+    def genai(self):
+        # The SDK (grpc, protobuf, google.api_core) takes a second or more to import, so it
+        # is loaded by the first analysis rather than at startup
+        if self._genai is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+        return self._genai
+
+    def _model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = self.genai.GenerativeModel(model_name)
+        return model
+
+    def warm_up(self):
+        self.genai
+
+    async def generate(self, model_name: str, prompt: str, json_output: bool = True) -> LLMResponse:
+        config = self.genai.types.GenerationConfig(
+            response_mime_type="application/json" if json_output else "text/plain",
+        )
+        response = await self._model(model_name).generate_content_async(prompt, generation_config=config)
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text,
+            model=model_name,
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+
+class FakeBackend:
+    # Offline stand-in for Gemini used for load tests and local development
+    # (LLM_BACKEND=fake). Latency and failure rate are configurable.
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, error_rate: float = 0.0, response: dict = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.response = response or {
+            "candidateName": "Test Candidate",
+            "matchRate": 72,
+            "score": 68,
+            "strengths": ["Relevant technical skills", "Clear formatting", "Project experience"],
+            "gaps": ["Limited leadership experience", "No cloud certifications", "Few quantified results"],
+            "detailedBreakdown": [
+                {"category": "Skills", "score": 75, "comment": "Most required skills are present."},
+                {"category": "Experience", "score": 65, "comment": "Experience is relevant but short."},
+                {"category": "Formatting", "score": 70, "comment": "Readable and ATS friendly."},
+            ],
+            "recommendedFields": ["Software Engineering", "Data Engineering", "DevOps"],
+            "feedback": "Fake analysis generated by the offline LLM stub.",
+        }
+        self.calls = 0
+
+    async def generate(self, model_name: str, prompt: str, json_output: bool = True) -> LLMResponse:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if self.error_rate and random.random() < self.error_rate:
+            raise LLMHTTPError(random.choice([429, 503]))
+        text = json.dumps(self.response)
+        return LLMResponse(text=text, model=model_name, prompt_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+
+class LLMClient:
+    def __init__(
+        self,
+        backend,
+        default_model: str = "gemini-flash-latest",
+        router: Optional[ModelRouter] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: float = 60.0,
+        store: Optional[MemoryStore] = None,
+    ):
+        self.backend = backend
+        # Calls without an explicit model_name are routed across the router's models
+        self.router = router
+        self.default_model = router.primary if router else default_model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        # max_concurrency is for the whole deployment when the store is shared between workers;
+        # a lease outlives the longest call so a crashed worker's slots come back on their own
+        self.store = store if store is not None else MemoryStore()
+        self._semaphore = self.store.semaphore("llm", max_concurrency, lease_ttl=deadline + 30)
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries out so a burst of 429s does not retry in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def generate(self, prompt: str, model_name: str = None, json_output: bool = True) -> LLMResponse:
+        if self.backend is None:
+            raise LLMUnavailable("GEMINI_API_KEY not found or still placeholder in environment.")
+
+        routed = model_name is None and self.router is not None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.calls += 1
+        attempt = 0
+        tried = set()
+        while True:
+            if routed:
+                await self.router.sync()
+            model = self.router.pick(exclude=tried) if routed else (model_name or self.default_model)
+            remaining = deadline - loop.time()
+            started = loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # Only hold a slot while a request is actually on the wire, not while backing off
+                async with self._semaphore.hold():
+                    self.in_flight += 1
+                    try:
+                        with span("llm.call"):
+                            response = await asyncio.wait_for(
+                                self.backend.generate(model, prompt, json_output), timeout=remaining
+                            )
+                    finally:
+                        self.in_flight -= 1
+            except Exception as e:
+                code = status_code(e)
+                if self.router:
+                    self.router.record_failure(model, code, str(e))
+                    # Tell the other workers about a cooldown this failure started
+                    await self.router.sync()
+                tried.add(model)
+                if routed and code in RETRYABLE_STATUS and loop.time() < deadline:
+                    # Another model that has not failed this request yet: switch without waiting
+                    if self.router.pick(exclude=tried) not in tried:
+                        self.router.record_fallback()
+                        logger.warning("LLM call to %s failed with status %s, falling back", model, code)
+                        continue
+                    tried.clear()
+                delay = self._backoff(attempt)
+                if code not in RETRYABLE_STATUS or attempt >= self.max_retries or loop.time() + delay >= deadline:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning("LLM call failed with status %s, retry %s in %.2fs", code, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            if self.router:
+                self.router.record_success(model, loop.time() - started)
+            return response
+
+    async def warm_up(self):
+        # Import the backend SDK off the event loop, after the server has started answering
+        warm_up = getattr(self.backend, "warm_up", None)
+        if warm_up is None:
+            return
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            logger.warning("LLM backend warm-up failed: %s", e)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "shared": self.store.shared,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "models": self.router.stats() if self.router else None,
+        }
+
+
+_client: Optional[LLMClient] = None
+
+
+def _build_backend():
+    backend = os.getenv("LLM_BACKEND", "gemini").lower()
+    if backend == "fake":
+        return FakeBackend(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.5")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        )
+
+    key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not key or "YOUR_GEMINI" in key:
+        logger.warning("GEMINI_API_KEY not found or still placeholder, AI analysis is disabled.")
+        return None
+    return GeminiBackend(key)
+
+
+def _build_router() -> ModelRouter:
+    # GEMINI_MODELS: comma-separated, best first; GEMINI_MODEL alone keeps the old single-model setup
+    primary = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+    models = [name.strip() for name in os.getenv("GEMINI_MODELS", primary).split(",") if name.strip()]
+    return ModelRouter(
+        models or [primary],
+        window=int(os.getenv("ROUTER_WINDOW", "50")),
+        cooldown=float(os.getenv("ROUTER_COOLDOWN", "60")),
+        max_cooldown=float(os.getenv("ROUTER_MAX_COOLDOWN", "900")),
+        error_threshold=float(os.getenv("ROUTER_ERROR_THRESHOLD", "0.5")),
+        shared=shared_state,
+    )
+
+
+def init_llm_client() -> LLMClient:
+    global _client
+    load_dotenv()
+    _client = LLMClient(
+        _build_backend(),
+        router=_build_router(),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+        deadline=float(os.getenv("LLM_DEADLINE", "60")),
+        store=shared_state,
+    )
+    return _client
+
+
+def get_llm_client() -> LLMClient:
+    if _client is None:
+        return init_llm_client()
+    return _client
@@ -0,0 +1,275 @@
+import json
+import os
+import re
+import threading
+import textwrap
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from schemas.resume import AnalysisResponse
+
+# Resume excerpt sent with a follow-up prompt; the answer only covers a few fields
+FOLLOWUP_RESUME_TOKEN_BUDGET = int(os.getenv("FOLLOWUP_RESUME_TOKEN_BUDGET", "800"))
+
+FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# Keys the model must supply; candidateName and recommendedFields have usable defaults
+REQUIRED_FIELDS = {
+    "matchRate": "integer 0-100, how well the document matches the Job Description",
+    "score": "integer 0-100, overall suitability",
+    "strengths": "list of 3 strings",
+    "gaps": "list of 3 strings",
+    "detailedBreakdown": 'list of 3 objects with "category" (string), "score" (integer 0-100), "comment" (string)',
+    "feedback": "string, a helpful overall feedback summary",
+}
+
+FOLLOWUP_PROMPT = textwrap.dedent("""\
+    You are an expert HR Specialist and ATS Optimizer. An earlier analysis of the document below
+    was missing some keys. Return a STRICT JSON object with ONLY these keys:
+    {fields}
+    Earlier partial analysis (keep consistent with it):
+    {partial}
+
+    Job Description:
+    {job_description}
+
+    Uploaded Document Text:
+    {resume_text}
+    """)
+
+
+class OutputParseError(ValueError):
+    pass
+
+
+def _scan(text: str):
+    # Closers for the brackets still open at the end of text, and the offset just after
+    # the last complete value
+    stack = []
+    in_string = escaped = False
+    last_safe = 0
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            last_safe = index + 1
+        elif char == ",":
+            last_safe = index
+    return stack, last_safe
+
+
+def _close_truncated(text: str) -> str:
+    # Output cut off by the token limit: drop the unfinished trailing value and close
+    # whatever lists and objects are still open
+    stack, last_safe = _scan(text)
+    if not stack:
+        return text
+    prefix = text[:last_safe].rstrip().rstrip(",")
+    stack, _ = _scan(prefix)
+    return prefix + "".join(reversed(stack))
+
+
+def parse_json_object(text: str) -> Tuple[dict, List[str]]:
+    repairs = []
+    if text is None:
+        raise OutputParseError("Empty response")
+    stripped = text.strip()
+    try:
+        data = json.loads(stripped)
+        if isinstance(data, dict):
+            return data, repairs
+    except ValueError:
+        pass
+
+    unfenced = FENCE_RE.sub("", stripped)
+    if unfenced != stripped:
+        repairs.append("code_fence")
+    start = unfenced.find("{")
+    if start < 0:
+        raise OutputParseError("No JSON object in response")
+    if start > 0:
+        repairs.append("leading_text")
+    try:
+        data, end = json.JSONDecoder().raw_decode(unfenced, start)
+        if unfenced[end:].strip():
+            repairs.append("trailing_text")
+    except ValueError:
+        try:
+            data = json.loads(_close_truncated(unfenced[start:]))
+        except ValueError as e:
+            raise OutputParseError(f"Unparseable JSON: {e}")
+        repairs.append("truncated")
+    if not isinstance(data, dict):
+        raise OutputParseError("Response is not a JSON object")
+    return data, repairs
+
+
+def _as_percent(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = NUMBER_RE.search(value)
+        if not match:
+            return None
+        value = float(match.group())
+    if not isinstance(value, (int, float)):
+        return None
+    # Some replies use fractions (0.85) instead of percentages
+    if isinstance(value, float) and 0 < value < 1:
+        value *= 100
+    return int(round(min(100, max(0, value))))
+
+
+def _as_string_list(value) -> Optional[List[str]]:
+    if isinstance(value, str):
+        items = [part.strip(" -•*") for part in re.split(r"\n|;", value)]
+        return [item for item in items if item] or None
+    if isinstance(value, list):
+        items = [str(item).strip() for item in value if item is not None and str(item).strip()]
+        return items or None
+    return None
+
+
+def repair_analysis(data: dict) -> Tuple[dict, List[str], List[str]]:
+    # Returns the cleaned analysis, the repairs applied and the required keys still missing
+    repairs = []
+    analysis = dict(data)
+
+    for key in ("score", "matchRate"):
+        if key not in analysis:
+            continue
+        value = _as_percent(analysis[key])
+        if value is None:
+            del analysis[key]
+        elif value != analysis[key]:
+            repairs.append("score_range" if isinstance(analysis[key], (int, float)) else "score_type")
+            analysis[key] = value
+
+    for key in ("strengths", "gaps", "recommendedFields"):
+        if key not in analysis:
+            continue
+        value = _as_string_list(analysis[key])
+        if value is None:
+            del analysis[key]
+        elif value != analysis[key]:
+            repairs.append("list_type")
+            analysis[key] = value
+
+    if "detailedBreakdown" in analysis:
+        items = analysis["detailedBreakdown"]
+        if isinstance(items, dict):
+            # {"Skills": {"score": .., "comment": ..}} or {"Skills": 80}
+            items = [
+                {"category": name, **(item if isinstance(item, dict) else {"score": item})}
+                for name, item in items.items()
+            ]
+            repairs.append("breakdown_shape")
+        cleaned = []
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            score = _as_percent(item.get("score"))
+            fixed = {
+                "category": str(item.get("category") or "General"),
+                "score": score if score is not None else 0,
+                "comment": str(item.get("comment") or ""),
+            }
+            if fixed != item:
+                repairs.append("breakdown_item")
+            cleaned.append(fixed)
+        if cleaned:
+            analysis["detailedBreakdown"] = cleaned
+        else:
+            del analysis["detailedBreakdown"]
+
+    if "feedback" in analysis and not isinstance(analysis["feedback"], str):
+        if analysis["feedback"] is None:
+            del analysis["feedback"]
+        else:
+            analysis["feedback"] = str(analysis["feedback"])
+            repairs.append("feedback_type")
+
+    if not isinstance(analysis.get("candidateName"), str) or not analysis["candidateName"].strip():
+        if "candidateName" in analysis:
+            repairs.append("candidate_name")
+        analysis["candidateName"] = "Applicant"
+
+    missing = [key for key in REQUIRED_FIELDS if key not in analysis]
+    return analysis, sorted(set(repairs)), missing
+
+
+def build_followup_prompt(missing: List[str], partial: dict, job_description: str, resume_text: str) -> str:
+    fields = "".join(f'- "{key}" ({REQUIRED_FIELDS[key]})\n' for key in missing)
+    return FOLLOWUP_PROMPT.format(
+        fields=fields,
+        partial=json.dumps({key: value for key, value in partial.items() if key in REQUIRED_FIELDS}),
+        job_description=job_description,
+        resume_text=resume_text,
+    )
+
+
+def validate(analysis: dict) -> dict:
+    # Checked against the response model; extra keys (engine, documentType, ...) are kept
+    AnalysisResponse.model_validate(analysis)
+    return analysis
+
+
+class OutputStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.valid = 0
+        self.repaired = 0
+        self.followups = 0
+        self.followups_failed = 0
+        self.followup_output_tokens = 0
+        self.unusable = 0
+        self.repairs = Counter()
+
+    def record(self, outcome: str, repairs: List[str] = (), followup_tokens: int = 0):
+        # outcome: valid | repaired | followup | followup_failed | unusable
+        with self._lock:
+            self.responses += 1
+            self.repairs.update(repairs)
+            if outcome == "valid":
+                self.valid += 1
+            elif outcome == "repaired":
+                self.repaired += 1
+            elif outcome in ("followup", "followup_failed"):
+                self.followups += 1
+                self.followups_failed += 1 if outcome == "followup_failed" else 0
+                self.followup_output_tokens += followup_tokens
+            else:
+                self.unusable += 1
+
+    def stats(self):
+        total = self.responses or 1
+        return {
+            "responses": self.responses,
+            "valid": self.valid,
+            "repaired_locally": self.repaired,
+            "followups": self.followups,
+            "followups_failed": self.followups_failed,
+            "unusable": self.unusable,
+            "repair_rate": round(self.repaired / total, 4),
+            "retry_rate": round(self.followups / total, 4),
+            # Responses that a strict json.loads + schema check would have thrown away
+            "responses_salvaged": self.repaired + self.followups - self.followups_failed,
+            "followup_output_tokens": self.followup_output_tokens,
+            "repairs": dict(self.repairs),
+        }
+
+
+output_stats = OutputStats()
+
@@ -0,0 +1,60 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+# LOG_FORMAT=text gives plain lines for local development
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Set by the tracing middleware so every line logged during a request carries its id
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_configured = False
+
+
+def configure_logging():
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger("stitch")
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    # All application loggers hang off "stitch" so one handler formats them all
+    configure_logging()
+    return logging.getLogger("stitch." + name.rsplit(".", 1)[-1])
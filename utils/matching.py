@@ -0,0 +1,656 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.job import Job
+from utils.lazy import lazy_import
+from utils.logs import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, nothing to coordinate with
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# Only the job-matching endpoints need numpy; the real import happens on their first call
+np = lazy_import("numpy")
+
+N_FEATURES = 2 ** 18
+# Long descriptions are truncated to their most frequent terms to bound the matrix size
+MAX_TERMS_PER_DOC = 128
+# Rows appended since the last compaction are scored separately; past this many they are merged
+COMPACT_THRESHOLD = 2000
+INDEX_FORMAT = 2
+INDEX_DIR = os.getenv(
+    "MATCHING_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "job_index"),
+)
+# Arrays written to disk; the two largest are memory-mapped read-only when loaded
+INDEX_ARRAYS = ("col_ptr", "row_ind", "data", "job_ids", "versions", "norms", "df")
+MMAP_ARRAYS = ("row_ind", "data")
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOP_WORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+doing during each etc for from further had has have having he her here hers him his how i if in into
+is it its itself just may me might more most must my no nor not now of off on once only or other our
+ours out over own per same she should so some such than that the their theirs them then there these
+they this those through to too under until up very via was we well were what when where which while
+who whom why will with within without would you your yours
+ability able across work working team teams strong excellent good great experience experienced
+years year role responsibilities responsible requirements required preferred plus including new
+join looking seeking candidate ideal opportunity company position job skills skill knowledge using
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in TOKEN_RE.findall((text or "").lower())
+        if token not in STOP_WORDS and not token.isdigit() and len(token) > 1
+    ]
+
+
+@lru_cache(maxsize=1 << 17)
+def feature_index(token: str) -> int:
+    # crc32 rather than hash() so feature ids are stable across processes and restarts
+    return zlib.crc32(token.encode("utf-8")) & (N_FEATURES - 1)
+
+
+def vectorize(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    counts = Counter(feature_index(token) for token in tokenize(text))
+    if not counts:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    terms = counts.most_common(MAX_TERMS_PER_DOC)
+    cols = np.fromiter((col for col, _ in terms), dtype=np.int32, count=len(terms))
+    # Sublinear term frequency so a word repeated ten times does not dominate the job
+    tf = np.fromiter((1.0 + math.log(count) for _, count in terms), dtype=np.float32, count=len(terms))
+    order = np.argsort(cols)
+    return cols[order], tf[order]
+
+
+class MatchingEngine:
+    # Jobs are rows of a hashed term-frequency matrix stored column-major (CSC), so a
+    # resume only touches the posting lists of its own terms. The score for a job is the
+    # share of the job's idf-weighted term mass that also appears in the resume.
+    #
+    # With a path the compacted segment lives on disk as .npy files (memory-mapped on load)
+    # and every insert/removal since the last compaction is appended to a journal. All
+    # worker processes share both: each write first catches up with what the others wrote,
+    # under a lock file, and a worker that finds a new segment swapped in reloads it.
+    def __init__(self, n_features: int = N_FEATURES, path: str = None):
+        self.n_features = n_features
+        self.path = path
+        self._lock = threading.RLock()
+        self._journal = None
+        # Which segment on disk this engine has loaded, and how far into its journal
+        self.generation = None
+        self._journal_offset = 0
+        self._disk_lock_depth = 0
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        self.job_ids = np.empty(0, dtype=np.int64)
+        # Job.version of each row when it was vectorized, to spot jobs edited elsewhere
+        self.versions = np.empty(0, dtype=np.int64)
+        self.alive = np.empty(0, dtype=bool)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.rows: Dict[int, int] = {}
+        self.df = np.zeros(self.n_features, dtype=np.int32)
+        self.n_alive = 0
+        # Compacted CSC segment covering rows [0, self.base_rows)
+        self.base_rows = 0
+        self.col_ptr = np.zeros(self.n_features + 1, dtype=np.int64)
+        self.row_ind = np.empty(0, dtype=np.int32)
+        self.data = np.empty(0, dtype=np.float32)
+        # Rows appended since the last compaction, one (cols, tf) pair per row
+        self.delta: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._delta_coo = None
+
+    def __len__(self):
+        return self.n_alive
+
+    @property
+    def max_job_id(self) -> int:
+        return int(self.job_ids.max()) if len(self.job_ids) else 0
+
+    def idf(self) -> np.ndarray:
+        return (np.log((1.0 + self.n_alive) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    @contextmanager
+    def _disk_lock(self):
+        # Serializes journal appends and segment swaps across worker processes. Always taken
+        # inside self._lock, which also guards the depth count that makes it reentrant.
+        self._disk_lock_depth += 1
+        handle = None
+        try:
+            if self._disk_lock_depth == 1 and self.path and fcntl is not None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                handle = open(self.path + ".lock", "a")
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+        finally:
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+            self._disk_lock_depth -= 1
+
+    def build(self, jobs: Iterable[Tuple[int, str, int]]):
+        with self._lock:
+            # Whatever other workers journal while the jobs are read is replayed on top
+            with self._disk_lock():
+                generation, offset = self._disk_generation(), self._journal_size()
+            self._reset()
+            self._add_vectors([(job_id, *vectorize(text), version) for job_id, text, version in jobs], compact=False)
+            with self._disk_lock():
+                if self.path and generation is not None and self._disk_generation() == generation:
+                    self._journal_offset = offset
+                    self._replay_journal()
+                self._compact()
+                if self.path:
+                    self._write()
+            self.loaded = True
+
+    def add(self, job_id: int, text: str, version: int = 1):
+        self.add_many([(job_id, text, version)])
+
+    def add_many(self, jobs: Iterable[Tuple[int, str, int]], compact: bool = True):
+        vectors = [(job_id, *vectorize(text), version) for job_id, text, version in jobs]
+        with self._lock, self._disk_lock():
+            self._sync()
+            self._log([
+                {"op": "add", "id": int(job_id), "version": int(version), "cols": cols.tolist(), "tf": tf.tolist()}
+                for job_id, cols, tf, version in vectors
+            ])
+            self._add_vectors(vectors, compact=compact)
+
+    def _add_vectors(self, vectors, compact: bool = True):
+        if not vectors:
+            return
+        with self._lock:
+            for job_id, _, _, _ in vectors:
+                self._remove(job_id)
+            first_row = len(self.job_ids)
+            new_ids = np.fromiter((job_id for job_id, _, _, _ in vectors), dtype=np.int64, count=len(vectors))
+            self.job_ids = np.concatenate([self.job_ids, new_ids])
+            self.versions = np.concatenate([
+                self.versions, np.fromiter((version for _, _, _, version in vectors), dtype=np.int64, count=len(vectors)),
+            ])
+            self.alive = np.concatenate([self.alive, np.ones(len(vectors), dtype=bool)])
+            for offset, (job_id, cols, tf, _) in enumerate(vectors):
+                self.rows[job_id] = first_row + offset
+                self.delta.append((cols, tf))
+                self.df[cols] += 1
+            self.n_alive += len(vectors)
+            self._delta_coo = None
+
+            idf = self.idf()
+            new_norms = np.fromiter(
+                (float(tf @ idf[cols]) if len(cols) else 0.0 for _, cols, tf, _ in vectors),
+                dtype=np.float32, count=len(vectors),
+            )
+            self.norms = np.concatenate([self.norms, new_norms])
+            if compact:
+                self.maybe_compact()
+
+    def maybe_compact(self):
+        # Bulk writers add with compact=False batch after batch and call this once at the end
+        with self._lock, self._disk_lock():
+            self._sync()
+            if len(self.delta) >= COMPACT_THRESHOLD:
+                self._compact()
+                if self.path:
+                    self._write()
+
+    def remove(self, job_id: int):
+        with self._lock, self._disk_lock():
+            self._sync()
+            self._log([{"op": "remove", "id": int(job_id)}])
+            self._remove(job_id)
+
+    def remove_many(self, job_ids: Iterable[int]):
+        with self._lock, self._disk_lock():
+            self._sync()
+            job_ids = [int(job_id) for job_id in job_ids]
+            self._log([{"op": "remove", "id": job_id} for job_id in job_ids])
+            for job_id in job_ids:
+                self._remove(job_id)
+
+    def _remove(self, job_id: int):
+        with self._lock:
+            row = self.rows.pop(job_id, None)
+            if row is not None and self.alive[row]:
+                # df is corrected at the next compaction
+                self.alive[row] = False
+                self.n_alive -= 1
+
+    def _delta_arrays(self):
+        if self._delta_coo is None:
+            if self.delta:
+                rows = np.repeat(
+                    np.arange(self.base_rows, self.base_rows + len(self.delta), dtype=np.int32),
+                    [len(cols) for cols, _ in self.delta],
+                )
+                cols = np.concatenate([cols for cols, _ in self.delta])
+                tf = np.concatenate([tf for _, tf in self.delta])
+            else:
+                rows = np.empty(0, dtype=np.int32)
+                cols = np.empty(0, dtype=np.int32)
+                tf = np.empty(0, dtype=np.float32)
+            self._delta_coo = (rows, cols, tf)
+        return self._delta_coo
+
+    def _coo(self):
+        base_cols = np.repeat(np.arange(self.n_features, dtype=np.int32), np.diff(self.col_ptr))
+        delta_rows, delta_cols, delta_tf = self._delta_arrays()
+        return (
+            np.concatenate([self.row_ind, delta_rows]),
+            np.concatenate([base_cols, delta_cols]),
+            np.concatenate([self.data, delta_tf]),
+        )
+
+    def _compact(self):
+        rows, cols, data = self._coo()
+
+        # Drop removed jobs and renumber the surviving rows densely
+        keep_rows = np.flatnonzero(self.alive)
+        remap = np.full(len(self.alive), -1, dtype=np.int64)
+        remap[keep_rows] = np.arange(len(keep_rows))
+        live = remap[rows] >= 0
+        rows, cols, data = remap[rows][live].astype(np.int32), cols[live], data[live]
+
+        self.job_ids = self.job_ids[keep_rows]
+        self.versions = self.versions[keep_rows]
+        self.alive = np.ones(len(keep_rows), dtype=bool)
+        self.rows = {int(job_id): row for row, job_id in enumerate(self.job_ids)}
+        self.n_alive = len(keep_rows)
+        self.df = np.bincount(cols, minlength=self.n_features).astype(np.int32)
+
+        order = np.argsort(cols, kind="stable")
+        self.row_ind = rows[order]
+        self.data = data[order]
+        self.col_ptr = np.zeros(self.n_features + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=self.n_features), out=self.col_ptr[1:])
+        self.base_rows = len(keep_rows)
+        self.delta = []
+        self._delta_coo = None
+
+        self.norms = np.bincount(rows, weights=data * self.idf()[cols], minlength=self.base_rows).astype(np.float32)
+
+    def _journal_path(self) -> str:
+        return os.path.join(self.path, "journal.jsonl")
+
+    def _log(self, entries: List[dict]):
+        if not self.path or not self.loaded or not entries:
+            return
+        if self._journal is None:
+            self._journal = open(self._journal_path(), "ab")
+        self._journal.write(b"".join(json.dumps(entry).encode("utf-8") + b"\n" for entry in entries))
+        self._journal.flush()
+        self._journal_offset = self._journal.tell()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self._journal_path()) if self.path else 0
+        except OSError:
+            return 0
+
+    def _disk_generation(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f).get("generation")
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _sync(self):
+        # Catch up with other workers (called with the disk lock held): a new segment means
+        # one of them compacted, folding in everything journaled so far, so it is reloaded;
+        # otherwise only the journal entries they appended since are applied
+        if not self.path or not self.loaded:
+            return
+        if self._disk_generation() != self.generation:
+            self._load_disk()
+        else:
+            self._replay_journal()
+
+    def _replay_journal(self):
+        journal_path = self._journal_path()
+        try:
+            f = open(journal_path, "rb")
+        except FileNotFoundError:
+            return
+        offset = self._journal_offset
+        vectors = []
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn final line from a worker that died mid-append; cut it off so the
+                    # next append starts on a fresh line
+                    os.truncate(journal_path, offset)
+                    break
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry["op"] == "add":
+                    vectors.append((
+                        entry["id"],
+                        np.asarray(entry["cols"], dtype=np.int32),
+                        np.asarray(entry["tf"], dtype=np.float32),
+                        entry.get("version", 0),
+                    ))
+                else:
+                    self._add_vectors(vectors, compact=False)
+                    vectors = []
+                    self._remove(entry["id"])
+        self._add_vectors(vectors, compact=False)
+        self._journal_offset = offset
+
+    def save(self):
+        with self._lock, self._disk_lock():
+            self._sync()
+            self._compact()
+            self._write()
+
+    def _write(self):
+        # Write the compacted segment to a sibling directory and swap it in, so a crash
+        # mid-write never leaves a half-written index behind. Callers hold the disk lock,
+        # so no two workers ever share the .tmp/.old directories.
+        tmp_path = self.path + ".tmp"
+        old_path = self.path + ".old"
+        generation = uuid.uuid4().hex
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": INDEX_FORMAT,
+                "n_features": self.n_features,
+                "generation": generation,
+                "jobs": self.n_alive,
+                "max_job_id": self.max_job_id,
+            }, f)
+
+        self._close_journal()
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        self._load_arrays()
+        self.generation = generation
+        self._journal_offset = 0
+
+    def _load_arrays(self):
+        for name in INDEX_ARRAYS:
+            mmap_mode = "r" if name in MMAP_ARRAYS else None
+            setattr(self, name, np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=mmap_mode))
+        self.base_rows = len(self.job_ids)
+        self.alive = np.ones(self.base_rows, dtype=bool)
+        self.rows = {int(job_id): row for row, job_id in enumerate(self.job_ids)}
+        self.n_alive = self.base_rows
+        self.delta = []
+        self._delta_coo = None
+
+    def _load_disk(self):
+        with open(os.path.join(self.path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != INDEX_FORMAT or manifest.get("n_features") != self.n_features:
+            raise ValueError(f"Incompatible matching index at {self.path}")
+        self._close_journal()
+        self._load_arrays()
+        self.generation = manifest.get("generation")
+        self._journal_offset = 0
+        self._replay_journal()
+
+    def exists(self) -> bool:
+        return bool(self.path) and os.path.exists(os.path.join(self.path, "manifest.json"))
+
+    def load(self):
+        with self._lock, self._disk_lock():
+            self._load_disk()
+            self.loaded = True
+
+    def refresh(self):
+        # Picks up what other workers wrote since this one last wrote or loaded
+        with self._lock, self._disk_lock():
+            self._sync()
+
+    def stale(self, db_ids: np.ndarray, db_versions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Given every (id, version) in the jobs table sorted by id: the ids that are missing
+        # from the index or indexed at another version, and the indexed ids no longer there
+        with self._lock:
+            live = self.alive.copy()
+            indexed_ids, indexed_versions = self.job_ids[live], self.versions[live]
+        if not len(indexed_ids) or not len(db_ids):
+            return db_ids, indexed_ids
+        order = np.argsort(indexed_ids)
+        indexed_ids, indexed_versions = indexed_ids[order], indexed_versions[order]
+
+        pos = np.minimum(np.searchsorted(indexed_ids, db_ids), len(indexed_ids) - 1)
+        changed = db_ids[(indexed_ids[pos] != db_ids) | (indexed_versions[pos] != db_versions)]
+        pos = np.minimum(np.searchsorted(db_ids, indexed_ids), len(db_ids) - 1)
+        return changed, indexed_ids[db_ids[pos] != indexed_ids]
+
+    def scores(self, text: str) -> np.ndarray:
+        query_cols = np.unique(np.fromiter((feature_index(t) for t in tokenize(text)), dtype=np.int32))
+        with self._lock:
+            n_rows = len(self.job_ids)
+            if not n_rows or not len(query_cols):
+                return np.zeros(n_rows, dtype=np.float32)
+            idf = self.idf()
+
+            # Sparse matrix-vector product over the compacted segment: gather the posting
+            # list of every query term, weight it by that term's idf and sum per row.
+            starts, ends = self.col_ptr[query_cols], self.col_ptr[query_cols + 1]
+            nonempty = ends > starts
+            if nonempty.any():
+                spans = list(zip(starts[nonempty].tolist(), ends[nonempty].tolist()))
+                rows = np.concatenate([self.row_ind[start:end] for start, end in spans])
+                weights = np.concatenate([self.data[start:end] for start, end in spans])
+                weights *= np.repeat(idf[query_cols[nonempty]], ends[nonempty] - starts[nonempty])
+                numer = np.bincount(rows, weights=weights, minlength=n_rows)
+            else:
+                numer = np.zeros(n_rows)
+
+            # Rows added since the last compaction
+            if self.delta:
+                delta_rows, delta_cols, delta_tf = self._delta_arrays()
+                in_query = np.zeros(self.n_features, dtype=bool)
+                in_query[query_cols] = True
+                hit = in_query[delta_cols]
+                numer += np.bincount(
+                    delta_rows[hit], weights=delta_tf[hit] * idf[delta_cols[hit]], minlength=n_rows
+                )
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result = np.where(self.norms > 0, numer / self.norms, 0.0)
+            result = np.clip(result, 0.0, 1.0).astype(np.float32)
+            result[~self.alive] = -1.0
+            return result
+
+    def rank(self, text: str, limit: int = 5) -> List[Tuple[int, float]]:
+        scores = self.scores(text)
+        with self._lock:
+            job_ids = self.job_ids
+        if not len(scores):
+            return []
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(job_ids[row]), float(scores[row])) for row in top if scores[row] >= 0]
+
+    def missing_terms(self, job_text: str, resume_text: str, limit: int = 5) -> List[str]:
+        resume_tokens = set(tokenize(resume_text))
+        counts = Counter(token for token in tokenize(job_text) if token not in resume_tokens)
+        if not counts:
+            return []
+        idf = self.idf()
+        weighted = sorted(
+            counts.items(),
+            key=lambda item: (1.0 + math.log(item[1])) * idf[feature_index(item[0])],
+            reverse=True,
+        )
+        return [token for token, _ in weighted[:limit]]
+
+
+def job_text(title: str, description: str) -> str:
+    return f"{title or ''}\n{description or ''}"
+
+
+def resume_text(value) -> str:
+    # Flatten Resume.parsed_data (nested dicts/lists from the LLM analysis) into plain text
+    parts = []
+
+    def walk(node):
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, dict):
+            for item in node.values():
+                walk(item)
+        elif isinstance(node, (list, tuple)):
+            for item in node:
+                walk(item)
+
+    walk(value)
+    return "\n".join(parts)
+
+
+_matching_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_matching_engine() -> MatchingEngine:
+    # Created on first use: allocating the empty index is what pulls in numpy
+    global _matching_engine
+    if _matching_engine is None:
+        with _engine_lock:
+            if _matching_engine is None:
+                _matching_engine = MatchingEngine(path=INDEX_DIR)
+    return _matching_engine
+
+
+def loaded_engine() -> Optional[MatchingEngine]:
+    # The process-wide engine once something has loaded it, else None
+    if _matching_engine is not None and _matching_engine.loaded:
+        return _matching_engine
+    return None
+
+
+def rebuild(db: Session, engine: MatchingEngine = None) -> MatchingEngine:
+    engine = engine if engine is not None else get_matching_engine()
+    rows = db.query(Job.id, Job.title, Job.description, Job.version).yield_per(5000)
+    engine.build((job_id, job_text(title, description), version) for job_id, title, description, version in rows)
+    return engine
+
+
+def catch_up(db: Session, engine: MatchingEngine, chunk_size: int = 5000) -> Tuple[int, int]:
+    # Jobs inserted, edited or deleted by a process that did not have the index loaded (a
+    # migration, a CLI run, a worker that never served a match) only show up in the jobs
+    # table, as ids the index lacks or holds at another version
+    rows = db.query(Job.id, Job.version).order_by(Job.id).yield_per(50000)
+    pairs = np.array(rows.all(), dtype=np.int64).reshape(-1, 2)
+    changed, removed = engine.stale(pairs[:, 0], pairs[:, 1])
+    if len(removed):
+        engine.remove_many(removed.tolist())
+    for start in range(0, len(changed), chunk_size):
+        chunk = changed[start:start + chunk_size].tolist()
+        rows = db.query(Job.id, Job.title, Job.description, Job.version).filter(Job.id.in_(chunk))
+        engine.add_many(((job_id, job_text(title, description), version) for job_id, title, description, version in rows), compact=False)
+    engine.maybe_compact()
+    return len(changed), len(removed)
+
+
+def ensure_loaded(db: Session, engine: MatchingEngine = None) -> MatchingEngine:
+    engine = engine if engine is not None else get_matching_engine()
+    if engine.loaded:
+        engine.refresh()
+        return engine
+    with engine._lock:
+        if engine.loaded:
+            return engine
+        if engine.exists():
+            try:
+                engine.load()
+                changed, removed = catch_up(db, engine)
+                logger.info(
+                    "Matching index loaded with %s jobs from %s (%s re-indexed, %s removed)",
+                    len(engine), engine.path, changed, removed,
+                )
+                return engine
+            except Exception as e:
+                logger.warning("Matching index load error, rebuilding: %s", e)
+        rebuild(db, engine)
+        logger.info("Matching index built with %s jobs", len(engine))
+    return engine
+
+
+# Keep the index in step with ORM writes; until it is first loaded there is nothing to update.
+# Changes are queued on the session during the flush and applied once it commits, so a
+# rolled-back insert never reaches the index and the flush itself does no index I/O.
+def _pending(target) -> Optional[Dict[int, Optional[Tuple[str, int]]]]:
+    session = object_session(target)
+    if session is None or loaded_engine() is None:
+        return None
+    return session.info.setdefault("matching_pending", {})
+
+
+@event.listens_for(Job, "after_insert")
+@event.listens_for(Job, "after_update")
+def _index_job(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending[target.id] = (job_text(target.title, target.description), target.version)
+
+
+@event.listens_for(Job, "after_delete")
+def _unindex_job(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending[target.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop("matching_pending", None)
+    engine = loaded_engine()
+    if not pending or engine is None:
+        return
+    removed = [job_id for job_id, job in pending.items() if job is None]
+    added = [(job_id, *job) for job_id, job in pending.items() if job is not None]
+    try:
+        if removed:
+            engine.remove_many(removed)
+        if added:
+            engine.add_many(added)
+    except Exception as e:
+        # The rows are committed; the index picks them up when it is next loaded
+        logger.warning("Could not update the matching index after commit: %s", e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop("matching_pending", None)
@@ -0,0 +1,105 @@
+import bisect
+import threading
+from typing import Dict, Tuple
+
+# Seconds; covers a cached lookup (sub-millisecond) up to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        # Prometheus text exposition format, version 0.0.4
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "stitch_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+)
+http_duration = registry.histogram(
+    "stitch_http_request_duration_seconds", "Time from request start to the end of the response body.", ("method", "route"),
+)
+span_duration = registry.histogram(
+    "stitch_span_duration_seconds", "Time spent per stage (auth, db, extraction, llm, ...).", ("span",),
+)
+jobs_ingested = registry.counter(
+    "stitch_jobs_ingested_total", "Bulk-ingested job records by outcome (inserted, duplicate, invalid).", ("outcome",),
+)
@@ -0,0 +1,155 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from database import Base
+# Every model has to be imported so the baseline create_all sees its table
+from models import analysis_cache, analysis_task, application, job, resume, user  # noqa: F401
+from utils.ingest import content_hash
+from utils.logs import get_logger
+from utils.search import ensure_search_index
+
+logger = get_logger(__name__)
+
+# Arbitrary constant; Postgres advisory lock that serialises concurrent workers at boot
+PG_LOCK_ID = 727_114_001
+
+
+def _baseline(conn: Connection):
+    # Tables that do not exist yet are created in their current shape; existing
+    # databases are brought forward by the migrations that follow
+    Base.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def _resume_candidate_columns(conn: Connection):
+    # Formerly migrate_db.py: columns added to resumes after the first deploys
+    existing = {column["name"] for column in inspect(conn).get_columns("resumes")}
+    for name, column_type in (("candidate_name", "VARCHAR"), ("recommended_fields", "JSON")):
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE resumes ADD COLUMN {name} {column_type}"))
+
+
+def _hot_path_indexes(conn: Connection):
+    # get_resumes: WHERE user_id = ? ORDER BY created_at DESC LIMIT n
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_resumes_user_id_created_at ON resumes (user_id, created_at DESC)"))
+    # get_applications and duplicate-application checks: WHERE user_id = ? [AND job_id = ?]
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_applications_user_id_job_id ON applications (user_id, job_id)"))
+
+
+def _analysis_task_upload_ref(conn: Connection):
+    existing = {column["name"] for column in inspect(conn).get_columns("analysis_tasks")}
+    if "upload_sha256" not in existing:
+        conn.execute(text("ALTER TABLE analysis_tasks ADD COLUMN upload_sha256 VARCHAR(64)"))
+
+
+def _row_versions(conn: Connection):
+    # version_id_col for the list endpoints' ETags; existing rows start at 1
+    for table in ("resumes", "applications", "jobs"):
+        existing = {column["name"] for column in inspect(conn).get_columns(table)}
+        if "version" not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_applications_user_id_created_at ON applications (user_id, created_at)"))
+
+
+def _job_content_hash(conn: Connection):
+    existing = {column["name"] for column in inspect(conn).get_columns("jobs")}
+    if "content_hash" not in existing:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN content_hash VARCHAR(64)"))
+    if conn.dialect.name == "sqlite":
+        # Recreated as AFTER UPDATE OF title, company, description: the backfill below
+        # (and every version bump) would otherwise rewrite each row's full-text entry
+        conn.execute(text("DROP TRIGGER IF EXISTS jobs_fts_au"))
+        ensure_search_index(conn)
+
+    # Jobs written before bulk ingestion existed take part in its dedupe too
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                "SELECT id, title, company, location, description FROM jobs "
+                "WHERE id > :last_id AND content_hash IS NULL ORDER BY id LIMIT 5000"
+            ),
+            {"last_id": last_id},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE jobs SET content_hash = :content_hash WHERE id = :id"),
+            [{"id": row.id, "content_hash": content_hash(row.title, row.company, row.location, row.description)} for row in rows],
+        )
+        last_id = rows[-1].id
+    # Jobs that were already duplicated keep the hash on their oldest copy only
+    conn.execute(text(
+        "UPDATE jobs SET content_hash = NULL WHERE content_hash IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM jobs WHERE content_hash IS NOT NULL GROUP BY content_hash)"
+    ))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_content_hash ON jobs (content_hash)"))
+
+
+def _analysis_task_leases(conn: Connection):
+    existing = {column["name"] for column in inspect(conn).get_columns("analysis_tasks")}
+    if "owner" not in existing:
+        conn.execute(text("ALTER TABLE analysis_tasks ADD COLUMN owner VARCHAR(64)"))
+    if "lease_until" not in existing:
+        conn.execute(text("ALTER TABLE analysis_tasks ADD COLUMN lease_until FLOAT"))
+
+
+def _resume_latest_tiebreak(conn: Connection):
+    # Resumes uploaded in the same second share created_at, so "latest" and the list pages
+    # order by id too; with id in the index neither needs a sort step
+    conn.execute(text("DROP INDEX IF EXISTS ix_resumes_user_id_created_at"))
+    conn.execute(text("CREATE INDEX ix_resumes_user_id_created_at ON resumes (user_id, created_at DESC, id DESC)"))
+
+
+# (version, name, upgrade). Append only: never renumber or edit an applied migration.
+MIGRATIONS = [
+    (1, "baseline_schema", _baseline),
+    (2, "resume_candidate_columns", _resume_candidate_columns),
+    (3, "job_search_index", ensure_search_index),
+    (4, "hot_path_indexes", _hot_path_indexes),
+    (5, "analysis_task_upload_ref", _analysis_task_upload_ref),
+    (6, "row_versions", _row_versions),
+    (7, "job_content_hash", _job_content_hash),
+    (8, "analysis_task_leases", _analysis_task_leases),
+    (9, "resume_latest_tiebreak", _resume_latest_tiebreak),
+]
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+    ))
+
+
+def applied_versions(conn: Connection):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine: Engine):
+    applied = []
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+
+    for version, name, upgrade in MIGRATIONS:
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PG_LOCK_ID})
+                # Checked inside the transaction so a worker that lost the race skips it
+                if version in applied_versions(conn):
+                    continue
+                upgrade(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                    {"version": version, "name": name, "applied_at": datetime.utcnow().isoformat()},
+                )
+            applied.append(version)
+            logger.info("Applied migration %s: %s", version, name)
+        except IntegrityError:
+            # Another process recorded the same version first (SQLite has no advisory locks)
+            continue
+    return applied
@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from utils.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Status codes that mean "this model is out of quota", as opposed to a transient failure
+QUOTA_STATUS = {429}
+# Seconds between reads of the other workers' cooldowns from the shared store
+SHARED_SYNC_INTERVAL = 1.0
+
+
+class ModelHealth:
+    def __init__(self, name: str, rank: int, window: int):
+        self.name = name
+        self.rank = rank
+        # Rolling window of (latency seconds or None on failure) for the most recent calls
+        self.recent = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.consecutive_quota_errors = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+    def latency(self) -> Optional[float]:
+        samples = sorted(latency for latency in self.recent if latency is not None)
+        if not samples:
+            return None
+        return samples[len(samples) // 2]
+
+    def error_rate(self) -> float:
+        if not self.recent:
+            return 0.0
+        return sum(1 for latency in self.recent if latency is None) / len(self.recent)
+
+    def cooling(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+
+class ModelRouter:
+    # Ranked list of models. Each call goes to the healthy model with the lowest median
+    # latency; models that hit their quota, or fail too often, sit out a cooldown.
+    def __init__(
+        self,
+        models: List[str],
+        window: int = 50,
+        cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+        error_threshold: float = 0.5,
+        min_samples: int = 5,
+        clock=time.monotonic,
+        shared=None,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples
+        self.clock = clock
+        # With a shared store, a quota cooldown one worker hits applies to every worker,
+        # instead of each one spending its own request to find out
+        self.shared = shared if shared is not None and shared.shared else None
+        self._lock = threading.Lock()
+        self._models = {name: ModelHealth(name, rank, window) for rank, name in enumerate(dict.fromkeys(models))}
+        # Cooldowns this worker started that the other workers have not been told about yet
+        self._unpublished = {}
+        self._synced_at = None
+        self.fallbacks = 0
+
+    @property
+    def models(self) -> List[str]:
+        return list(self._models)
+
+    @property
+    def primary(self) -> str:
+        return self.models[0]
+
+    def _order_key(self, health: ModelHealth):
+        latency = health.latency()
+        # Unmeasured models go first (in rank order) so each one gets a latency sample
+        return (latency is not None, latency or 0.0, health.rank)
+
+    async def sync(self):
+        # Swaps cooldowns with the other workers through the shared store, on a thread so a
+        # slow store never stalls the event loop. Cooldowns started here go out on the next
+        # call; the others' are read at most every SHARED_SYNC_INTERVAL.
+        if self.shared is None:
+            return
+        now = self.clock()
+        with self._lock:
+            unpublished, self._unpublished = self._unpublished, {}
+            read = self._synced_at is None or now - self._synced_at >= SHARED_SYNC_INTERVAL
+            if read:
+                self._synced_at = now
+        if unpublished or read:
+            await asyncio.to_thread(self._exchange_cooldowns, unpublished, read)
+
+    def _exchange_cooldowns(self, unpublished: dict, read: bool):
+        # Stored as wall-clock deadlines since each process has its own monotonic clock
+        for name, until in unpublished.items():
+            try:
+                self.shared.set(f"model-cooldown:{name}", until, ttl=max(0.0, until - time.time()))
+            except Exception as e:
+                logger.warning("Could not share cooldown for %s: %s", name, e)
+        if not read:
+            return
+        try:
+            remote = {name: self.shared.get(f"model-cooldown:{name}") for name in self._models}
+        except Exception as e:
+            logger.warning("Could not read shared cooldowns: %s", e)
+            return
+        now, wall = self.clock(), time.time()
+        with self._lock:
+            for name, until in remote.items():
+                if until is not None and until > wall:
+                    health = self._models[name]
+                    health.cooldown_until = max(health.cooldown_until, now + (until - wall))
+
+    def candidates(self) -> List[str]:
+        now = self.clock()
+        with self._lock:
+            healthy = [health for health in self._models.values() if not health.cooling(now)]
+            if healthy:
+                return [health.name for health in sorted(healthy, key=self._order_key)]
+            # Everything is cooling down: try whichever model comes back first
+            return [min(self._models.values(), key=lambda health: health.cooldown_until).name]
+
+    def pick(self, exclude=()) -> str:
+        candidates = self.candidates()
+        for name in candidates:
+            if name not in exclude:
+                return name
+        return candidates[0]
+
+    def _cool_down(self, health: ModelHealth, seconds: float, now: float):
+        health.cooldown_until = max(health.cooldown_until, now + seconds)
+        if self.shared is not None:
+            self._unpublished[health.name] = max(self._unpublished.get(health.name, 0.0), time.time() + seconds)
+        logger.warning("Model %s cooling down for %.0fs (%s)", health.name, seconds, health.last_error)
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            health = self._models.get(name)
+            if health is None:
+                return
+            health.calls += 1
+            health.recent.append(latency)
+            health.consecutive_quota_errors = 0
+
+    def record_failure(self, name: str, code: Optional[int], error: str = ""):
+        now = self.clock()
+        with self._lock:
+            health = self._models.get(name)
+            if health is None:
+                return
+            health.calls += 1
+            health.errors += 1
+            health.recent.append(None)
+            health.last_error = f"{code or 'error'}: {error}"[:200]
+            if code in QUOTA_STATUS:
+                health.rate_limited += 1
+                health.consecutive_quota_errors += 1
+                # Repeated 429s usually mean the daily quota is gone, so back off harder each time
+                seconds = min(self.max_cooldown, self.cooldown * 2 ** (health.consecutive_quota_errors - 1))
+                self._cool_down(health, seconds, now)
+            elif len(health.recent) >= self.min_samples and health.error_rate() >= self.error_threshold:
+                self._cool_down(health, self.cooldown, now)
+                # Start the next period with a clean slate instead of tripping again straight away
+                health.recent.clear()
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def reset(self, name: Optional[str] = None) -> bool:
+        with self._lock:
+            targets = self._models.values() if name is None else [self._models.get(name)]
+            if None in targets:
+                return False
+            for health in targets:
+                health.cooldown_until = 0.0
+                health.consecutive_quota_errors = 0
+                health.recent.clear()
+                self._unpublished.pop(health.name, None)
+                if self.shared is not None:
+                    try:
+                        self.shared.delete(f"model-cooldown:{health.name}")
+                    except Exception as e:
+                        logger.warning("Could not clear shared cooldown for %s: %s", health.name, e)
+            return True
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            models = []
+            for health in self._models.values():
+                latency = health.latency()
+                models.append({
+                    "model": health.name,
+                    "rank": health.rank,
+                    "healthy": not health.cooling(now),
+                    "cooldown_remaining": round(max(0.0, health.cooldown_until - now), 1),
+                    "p50_latency_ms": round(latency * 1000, 1) if latency is not None else None,
+                    "error_rate": round(health.error_rate(), 4),
+                    "calls": health.calls,
+                    "errors": health.errors,
+                    "rate_limited": health.rate_limited,
+                    "last_error": health.last_error,
+                })
+        return {"fallbacks": self.fallbacks, "order": self.candidates(), "models": models}
@@ -0,0 +1,55 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import String, cast, literal, tuple_
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_rows(query, created_col, id_col, cursor: str = None, limit: int = 20, offset: int = 0):
+    # Newest-first keyset pagination on (created_at, id): every page is a bounded index
+    # range scan, unlike OFFSET which reads and discards every skipped row.
+    #
+    # The cursor carries created_at exactly as the database stores it (cast to text), so
+    # the comparison below matches ORDER BY even on SQLite, where DATETIME is stored as
+    # text and differently formatted but equal timestamps would compare unequal.
+    #
+    # offset only serves clients still paging with ?skip=N; it cannot be combined with a cursor.
+    #
+    # Returns the page's rows, each with sort_key and sort_id appended, and the next cursor.
+    sort_key = cast(created_col, String).label("sort_key")
+    query = query.add_columns(sort_key, id_col.label("sort_id"))
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, 2)
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(created_col, id_col) < tuple_(literal(last_key, String), literal(last_id)))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).offset(offset or None).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.sort_key, last.sort_id)
+    return rows[:limit], next_cursor
+
+
+def keyset_page(query, created_col, id_col, cursor: str = None, limit: int = 20):
+    rows, next_cursor = keyset_rows(query, created_col, id_col, cursor, limit)
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from utils import security
+from utils.shared_state import shared_state
+from utils.tracing import span
+
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+# Hash/verify jobs allowed to wait for a worker before new ones are shed
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "32"))
+LOGIN_MAX_PER_IP = int(os.getenv("LOGIN_MAX_PER_IP", "4"))
+LOGIN_MAX_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_PER_ACCOUNT", "2"))
+# A sign-in slot held by a worker that died is given back after this long
+LOGIN_LEASE_TTL = float(os.getenv("LOGIN_LEASE_TTL", "30"))
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class TooManyAttempts(Exception):
+    pass
+
+
+class PasswordHasher:
+    # bcrypt holds a CPU for hundreds of ms. Running it on a small dedicated pool keeps
+    # it off the event loop and out of the shared threadpool the sync endpoints use.
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.hashes = 0
+        self.verifications = 0
+        self.rehashes = 0
+        self.shed = 0
+        # Verified against when the account does not exist, so both paths cost the same
+        self._dummy_hash = None
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.shed += 1
+            raise HasherBusy("Too many sign-in requests, please retry shortly")
+        self.pending += 1
+        try:
+            with span("auth.bcrypt"):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        self.hashes += 1
+        return await self._submit(security.get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str = None) -> bool:
+        self.verifications += 1
+        if hashed_password is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self._submit(security.get_password_hash, "not-a-real-password")
+            await self._submit(security.verify_password, password, self._dummy_hash)
+            return False
+        return await self._submit(security.verify_password, password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "rounds": security.BCRYPT_ROUNDS,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "hashes": self.hashes,
+            "verifications": self.verifications,
+            "rehashes": self.rehashes,
+            "shed": self.shed,
+        }
+
+
+class ConcurrencyLimiter:
+    # Caps in-flight attempts per key (client IP, account). Each attempt leases a slot
+    # in the shared-state store, so the cap holds across workers rather than per worker.
+    def __init__(self, limits: dict, store, lease_ttl: float = 30.0):
+        self.limits = limits
+        self.store = store
+        self.lease_ttl = lease_ttl
+        self.rejected = 0
+
+    async def _release(self, names, holder: str):
+        for name in names:
+            await self.store.arelease(name, holder)
+
+    @asynccontextmanager
+    async def limit(self, **keys):
+        holder = uuid.uuid4().hex
+        acquired = []
+        for kind, key in keys.items():
+            name = f"login:{kind}:{key}"
+            try:
+                ok = await self.store.atry_acquire(name, self.limits[kind], holder, self.lease_ttl)
+            except Exception:
+                # Store unavailable: let the attempt through rather than lock everyone out
+                self.store.errors += 1
+                continue
+            if not ok:
+                await self._release(acquired, holder)
+                self.rejected += 1
+                raise TooManyAttempts(f"Too many concurrent sign-in attempts for this {kind}")
+            acquired.append(name)
+        try:
+            yield
+        finally:
+            await asyncio.shield(self._release(acquired, holder))
+
+    def stats(self):
+        return {"limits": self.limits, "rejected": self.rejected, "shared": self.store.shared}
+
+
+password_hasher = PasswordHasher(workers=BCRYPT_WORKERS, max_pending=BCRYPT_MAX_PENDING)
+login_limiter = ConcurrencyLimiter(
+    {"ip": LOGIN_MAX_PER_IP, "account": LOGIN_MAX_PER_ACCOUNT}, shared_state, lease_ttl=LOGIN_LEASE_TTL,
+)
@@ -0,0 +1,123 @@
+import os
+import re
+import threading
+from typing import NamedTuple
+
+from utils import skills
+from utils.text_prep import SECTION_PRIORITY
+
+# Below this many characters per page a page has no usable text layer
+PREFLIGHT_MIN_CHARS_PER_PAGE = int(os.getenv("PREFLIGHT_MIN_CHARS_PER_PAGE", "40"))
+# Pages mostly covered by images with almost no text are treated as scans
+PREFLIGHT_SCAN_IMAGE_RATIO = float(os.getenv("PREFLIGHT_SCAN_IMAGE_RATIO", "0.5"))
+PREFLIGHT_MIN_WORDS = int(os.getenv("PREFLIGHT_MIN_WORDS", "30"))
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+PHONE_RE = re.compile(r"\+?\d[\d ()-]{7,}\d")
+WORD_RE = re.compile(r"[A-Za-z]{2,}")
+
+MESSAGES = {
+    "unreadable": "The file could not be read as a PDF. Please re-export it and upload again.",
+    "empty": "The PDF contains no text or images. Please upload the resume itself.",
+    "scanned": (
+        "This PDF looks like a scanned image without a text layer, so it cannot be analyzed. "
+        "Please upload a PDF exported from your editor (Word, Google Docs, etc.)."
+    ),
+    "too_short": "The document has too little text to be analyzed as a resume.",
+    "not_resume": (
+        "The uploaded document does not appear to be a professional resume: it has no resume "
+        "sections, contact details or recognizable skills."
+    ),
+}
+
+
+class Verdict(NamedTuple):
+    kind: str
+    reason: str
+    text_pages: int
+    scanned_pages: int
+
+
+def _has_resume_signals(text: str) -> bool:
+    if EMAIL_RE.search(text) or PHONE_RE.search(text):
+        return True
+    if any(SECTION_PRIORITY.get(line.strip(" :").lower()) for line in text.splitlines()):
+        return True
+    return bool(skills.extract_skills(text))
+
+
+def classify(document) -> Verdict:
+    # Works only off the per-page stats and text gathered during extraction: no OCR, no
+    # rendering, so it costs microseconds per page
+    stats = document.stats
+    if len(stats) != len(document.pages):
+        # Cached before page stats were recorded: fall back to text length alone
+        stats = [{"chars": len(page.strip()), "image_ratio": 0.0} for page in document.pages]
+    text_pages = sum(1 for page in stats if page["chars"] >= PREFLIGHT_MIN_CHARS_PER_PAGE)
+    scanned_pages = sum(
+        1 for page in stats
+        if page["chars"] < PREFLIGHT_MIN_CHARS_PER_PAGE and page["image_ratio"] >= PREFLIGHT_SCAN_IMAGE_RATIO
+    )
+    text = document.text
+
+    if not text_pages and scanned_pages:
+        return Verdict("scanned", MESSAGES["scanned"], text_pages, scanned_pages)
+    if not text.strip():
+        return Verdict("empty", MESSAGES["empty"], text_pages, scanned_pages)
+    if len(WORD_RE.findall(text)) < PREFLIGHT_MIN_WORDS:
+        return Verdict("too_short", MESSAGES["too_short"], text_pages, scanned_pages)
+    if not _has_resume_signals(text):
+        return Verdict("not_resume", MESSAGES["not_resume"], text_pages, scanned_pages)
+    return Verdict("ok", "", text_pages, scanned_pages)
+
+
+def unreadable() -> Verdict:
+    return Verdict("unreadable", MESSAGES["unreadable"], 0, 0)
+
+
+def rejection_analysis(verdict: Verdict) -> dict:
+    # AnalysisResponse-shaped result returned instead of calling the LLM
+    return {
+        "candidateName": "Applicant",
+        "matchRate": 0,
+        "score": 0,
+        "strengths": ["Document received"],
+        "gaps": [verdict.reason],
+        "detailedBreakdown": [
+            {"category": "Document Check", "score": 0, "comment": f"Classified as {verdict.kind.replace('_', ' ')}."},
+        ],
+        "recommendedFields": ["Pending Analysis"],
+        "feedback": verdict.reason,
+        "engine": "preflight",
+        "documentType": verdict.kind,
+    }
+
+
+class PreflightStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = {}
+        self.llm_calls_saved = 0
+        self.total_ms = 0.0
+
+    def record(self, verdict: Verdict, llm_skipped: bool, elapsed_ms: float = 0.0):
+        with self._lock:
+            self.checked += 1
+            self.total_ms += elapsed_ms
+            if verdict.kind != "ok":
+                self.rejected[verdict.kind] = self.rejected.get(verdict.kind, 0) + 1
+                self.llm_calls_saved += 1 if llm_skipped else 0
+
+    def stats(self):
+        rejected = sum(self.rejected.values())
+        return {
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+            "rejection_rate": round(rejected / self.checked, 4) if self.checked else 0.0,
+            "llm_calls_saved": self.llm_calls_saved,
+            "avg_ms": round(self.total_ms / self.checked, 3) if self.checked else 0.0,
+        }
+
+
+preflight_stats = PreflightStats()
@@ -0,0 +1,71 @@
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+TERM_RE = re.compile(r"\w[\w+#.]*", re.UNICODE)
+
+# Postgres: the search expression must match the GIN index definition exactly to use it
+PG_SEARCH_EXPRESSION = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(company, '') || ' ' || coalesce(description, ''))"
+)
+
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+        title, company, description, content='jobs', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts(rowid, title, company, description)
+        VALUES (new.id, new.title, new.company, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, company, description)
+        VALUES ('delete', old.id, old.title, old.company, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE OF title, company, description ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, company, description)
+        VALUES ('delete', old.id, old.title, old.company, old.description);
+        INSERT INTO jobs_fts(rowid, title, company, description)
+        VALUES (new.id, new.title, new.company, new.description);
+    END
+    """,
+]
+
+
+def ensure_search_index(bind):
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return ensure_search_index(conn)
+    conn = bind
+    if conn.dialect.name == "sqlite":
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'jobs_fts'")).first()
+        for statement in SQLITE_SETUP:
+            conn.execute(text(statement))
+        if not exists:
+            # Index rows that were inserted before the FTS table existed
+            conn.execute(text("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_jobs_search ON jobs USING GIN ({PG_SEARCH_EXPRESSION})"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_created_at_id ON jobs (created_at, id)"))
+
+
+def search_terms(q: str):
+    return TERM_RE.findall(q or "")[:16]
+
+
+def keyword_filter(dialect: str, q: str):
+    terms = search_terms(q)
+    if not terms:
+        return None
+    if dialect == "sqlite":
+        # Quote every term so user input cannot inject FTS5 query syntax; terms are ANDed
+        match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return text("jobs.id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH :fts_query)").bindparams(fts_query=match)
+    return text(f"{PG_SEARCH_EXPRESSION} @@ plainto_tsquery('english', :ts_query)").bindparams(ts_query=" ".join(terms))
@@ -1,12 +1,18 @@
+import os
 import bcrypt
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
+from utils.logs import get_logger
+
+logger = get_logger(__name__)
 
 # Secret key settings (should be in .env in production)
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# bcrypt work factor; each +1 doubles the cost. Existing hashes are upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 def verify_password(plain_password: str, hashed_password: str):
     try:
@@ -15,16 +21,23 @@ def verify_password(plain_password: str, hashed_password: str):
         hashed_bytes = hashed_password.encode('utf-8')
         return bcrypt.checkpw(password_bytes, hashed_bytes)
     except Exception as e:
-        print(f"Verification error: {e}")
+        logger.warning("Verification error: %s", e)
         return False
 
 def get_password_hash(password: str):
     # bcrypt requires bytes
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
+def needs_rehash(hashed_password: str):
+    # bcrypt hashes look like $2b$12$<salt+hash>; the middle field is the cost
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+from utils.logs import get_logger
+
+logger = get_logger(__name__)
+
+# memory:// keeps state in the process (one worker); sqlite:///path shares it between the
+# workers on one host; redis://host:port/db shares it between hosts (needs the redis package)
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "memory://")
+SHARED_STATE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_STATE_BUSY_TIMEOUT_MS", "2000"))
+# Polling interval bounds while waiting for a cross-process semaphore slot
+SEMAPHORE_POLL_MIN = 0.02
+SEMAPHORE_POLL_MAX = 0.5
+
+
+class LocalSemaphore:
+    # memory:// has a single process, so a plain asyncio.Semaphore is the whole story
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def hold(self):
+        async with self._semaphore:
+            yield
+
+
+class LeaseSemaphore:
+    # A semaphore shared by every worker using the store: each holder owns a lease row that
+    # expires after lease_ttl, so a worker killed mid-call cannot leak its slot for good.
+    # The local semaphore in front keeps one worker from spinning on slots it cannot get.
+    def __init__(self, store, name: str, limit: int, lease_ttl: float):
+        self.store = store
+        self.name = name
+        self.limit = limit
+        self.lease_ttl = lease_ttl
+        self._local = asyncio.Semaphore(limit)
+        self.waits = 0
+
+    async def _acquire(self, holder: str):
+        delay = SEMAPHORE_POLL_MIN
+        while True:
+            try:
+                if await self.store.atry_acquire(self.name, self.limit, holder, self.lease_ttl):
+                    return True
+            except Exception as e:
+                # The store being down must not take the API with it; the local limit still holds
+                logger.warning("Shared semaphore %s unavailable, using the local limit: %s", self.name, e)
+                self.store.errors += 1
+                return False
+            self.waits += 1
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(SEMAPHORE_POLL_MAX, delay * 2)
+
+    @asynccontextmanager
+    async def hold(self):
+        async with self._local:
+            holder = uuid.uuid4().hex
+            leased = await self._acquire(holder)
+            try:
+                yield
+            finally:
+                if leased:
+                    # Shielded so a cancelled request still gives its slot back straight away
+                    await asyncio.shield(self.store.arelease(self.name, holder))
+
+
+class MemoryStore:
+    # Process-local implementation of the store interface: a key/value map with optional
+    # expiry plus named sets of leases. The shared stores override the storage methods.
+    shared = False
+
+    def __init__(self):
+        self._data = {}
+        self._leases: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        # Values round-trip through JSON like the shared stores, so callers see the same types
+        value = json.loads(json.dumps(value))
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl is not None else None, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def try_acquire(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            leases = self._leases.setdefault(name, {})
+            for expired in [key for key, expires_at in leases.items() if expires_at < now]:
+                del leases[expired]
+            if len(leases) >= limit:
+                return False
+            leases[holder] = now + ttl
+            return True
+
+    def release(self, name: str, holder: str):
+        with self._lock:
+            leases = self._leases.get(name)
+            if leases is not None:
+                leases.pop(holder, None)
+                if not leases:
+                    del self._leases[name]
+
+    def holders(self, name: str) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(1 for expires_at in self._leases.get(name, {}).values() if expires_at >= now)
+
+    # Async forms for callers on the event loop. The shared stores can wait on SQLite's write
+    # lock (up to SHARED_STATE_BUSY_TIMEOUT_MS) or on the network, so they run on a thread;
+    # memory:// is a dict lookup and stays inline.
+    async def _offload(self, fn, *args):
+        if not self.shared:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def aget(self, key: str):
+        return await self._offload(self.get, key)
+
+    async def aset(self, key: str, value, ttl: Optional[float] = None):
+        await self._offload(self.set, key, value, ttl)
+
+    async def adelete(self, key: str):
+        await self._offload(self.delete, key)
+
+    async def atry_acquire(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        return await self._offload(self.try_acquire, name, limit, holder, ttl)
+
+    async def arelease(self, name: str, holder: str):
+        await self._offload(self.release, name, holder)
+
+    def semaphore(self, name: str, limit: int, lease_ttl: float = 120.0):
+        if self.shared:
+            return LeaseSemaphore(self, name, limit, lease_ttl)
+        return LocalSemaphore(limit)
+
+    def stats(self):
+        return {"backend": "memory", "shared": self.shared, "keys": len(self._data), "errors": self.errors}
+
+
+class SQLiteStore(MemoryStore):
+    # One SQLite file next to the app (WAL, so readers never wait on a writer). Each thread
+    # keeps its own connection, and a forked worker opens new ones instead of inheriting them.
+    shared = True
+    # Expired rows are swept on every Nth write rather than on a timer
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        # Opened on first use, not at import, so startup never touches the file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # isolation_level=None: autocommit, with explicit BEGIN IMMEDIATE where it matters
+        connection = sqlite3.connect(self.path, timeout=SHARED_STATE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "name TEXT NOT NULL, holder TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (name, holder))"
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str):
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl if ttl is not None else None),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute("DELETE FROM kv WHERE expires_at < ?", (now,))
+            connection.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def try_acquire(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        now = time.time()
+        connection = self._connect()
+        # IMMEDIATE takes the write lock up front, so count-then-insert cannot race another worker
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM leases WHERE name = ? AND expires_at < ?", (name, now))
+            (held,) = connection.execute("SELECT COUNT(*) FROM leases WHERE name = ?", (name,)).fetchone()
+            acquired = held < limit
+            if acquired:
+                connection.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)", (name, holder, now + ttl)
+                )
+            connection.execute("COMMIT")
+            return acquired
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def release(self, name: str, holder: str):
+        try:
+            self._connect().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+        except Exception as e:
+            # The lease expires on its own; not worth failing the request over
+            logger.warning("Could not release lease %s: %s", name, e)
+            self.errors += 1
+
+    def holders(self, name: str) -> int:
+        (held,) = self._connect().execute(
+            "SELECT COUNT(*) FROM leases WHERE name = ? AND expires_at >= ?", (name, time.time())
+        ).fetchone()
+        return held
+
+    def stats(self):
+        (keys,) = self._connect().execute("SELECT COUNT(*) FROM kv").fetchone()
+        return {"backend": "sqlite", "shared": self.shared, "path": self.path, "keys": keys, "errors": self.errors}
+
+
+# Drops expired holders, then takes a slot if one is free: KEYS[1]=name, ARGV=now, limit, holder, expires_at
+_REDIS_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[4], ARGV[3])
+    redis.call('PEXPIREAT', KEYS[1], math.floor(tonumber(ARGV[4]) * 1000))
+    return 1
+end
+return 0
+"""
+
+
+class RedisStore(MemoryStore):
+    # For several hosts. Leases are a sorted set per name, scored by expiry time.
+    shared = True
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_URL points at Redis but the redis package is not installed")
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self._acquire = self.client.register_script(_REDIS_ACQUIRE)
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        self.client.set(key, json.dumps(value), px=int(ttl * 1000) if ttl is not None else None)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def try_acquire(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        now = time.time()
+        return bool(self._acquire(keys=[f"lease:{name}"], args=[now, limit, holder, now + ttl]))
+
+    def release(self, name: str, holder: str):
+        try:
+            self.client.zrem(f"lease:{name}", holder)
+        except Exception as e:
+            logger.warning("Could not release lease %s: %s", name, e)
+            self.errors += 1
+
+    def holders(self, name: str) -> int:
+        return self.client.zcount(f"lease:{name}", time.time(), "+inf")
+
+    def stats(self):
+        return {"backend": "redis", "shared": self.shared, "errors": self.errors}
+
+
+# scheme -> factory(url); register_store adds another backend without touching the callers
+_BACKENDS: Dict[str, Callable[[str], MemoryStore]] = {
+    "memory": lambda url: MemoryStore(),
+    # Same form as DATABASE_URL: sqlite:///relative/path or sqlite:////absolute/path
+    "sqlite": lambda url: SQLiteStore(url.split("://", 1)[1][1:]),
+    "redis": RedisStore,
+    "rediss": RedisStore,
+}
+
+
+def register_store(scheme: str, factory: Callable[[str], MemoryStore]):
+    _BACKENDS[scheme] = factory
+
+
+def open_store(url: str) -> MemoryStore:
+    scheme = url.split("://", 1)[0].lower()
+    factory = _BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unknown SHARED_STATE_URL scheme: {scheme}")
+    return factory(url)
+
+
+shared_state = open_store(SHARED_STATE_URL)
@@ -0,0 +1,249 @@
+import re
+from typing import Dict, List, Set
+
+from utils.matching import tokenize
+
+# Canonical skill -> aliases (lowercase). Single letters and other ambiguous words
+# ("c", "r", "go") are deliberately left out; they produce more false hits than signal.
+SKILL_TAXONOMY: Dict[str, Dict[str, List[str]]] = {
+    "Languages": {
+        "Python": ["python"],
+        "Java": ["java"],
+        "JavaScript": ["javascript", "ecmascript", "es6"],
+        "TypeScript": ["typescript"],
+        "C++": ["c++", "cpp"],
+        "C#": ["c#", "csharp"],
+        "Go": ["golang"],
+        "Rust": ["rust"],
+        "Kotlin": ["kotlin"],
+        "Swift": ["swift"],
+        "PHP": ["php"],
+        "Ruby": ["ruby"],
+        "Scala": ["scala"],
+        "SQL": ["sql"],
+        "Bash": ["bash", "shell scripting"],
+        "Dart": ["dart"],
+        "MATLAB": ["matlab"],
+    },
+    "Frameworks": {
+        "React": ["react", "react.js", "reactjs"],
+        "React Native": ["react native"],
+        "Next.js": ["next.js", "nextjs"],
+        "Angular": ["angular", "angularjs"],
+        "Vue": ["vue", "vue.js", "vuejs"],
+        "Node.js": ["node.js", "nodejs"],
+        "Express": ["express.js", "expressjs"],
+        "Django": ["django"],
+        "Flask": ["flask"],
+        "FastAPI": ["fastapi"],
+        "Spring": ["spring", "spring boot"],
+        ".NET": [".net", "asp.net", "dotnet"],
+        "Laravel": ["laravel"],
+        "Rails": ["ruby on rails", "rails"],
+        "Flutter": ["flutter"],
+        "Tailwind CSS": ["tailwind", "tailwind css"],
+        "HTML": ["html", "html5"],
+        "CSS": ["css", "css3", "sass", "scss"],
+        "GraphQL": ["graphql"],
+        "REST APIs": ["rest api", "rest apis", "restful", "restful apis"],
+        "gRPC": ["grpc"],
+    },
+    "Data & AI": {
+        "Machine Learning": ["machine learning", "ml"],
+        "Deep Learning": ["deep learning"],
+        "NLP": ["nlp", "natural language processing"],
+        "Computer Vision": ["computer vision"],
+        "LLMs": ["llm", "llms", "large language models", "generative ai", "genai"],
+        "PyTorch": ["pytorch"],
+        "TensorFlow": ["tensorflow", "keras"],
+        "scikit-learn": ["scikit-learn", "sklearn"],
+        "Pandas": ["pandas"],
+        "NumPy": ["numpy"],
+        "Spark": ["spark", "pyspark", "apache spark"],
+        "Hadoop": ["hadoop"],
+        "Airflow": ["airflow", "apache airflow"],
+        "Kafka": ["kafka", "apache kafka"],
+        "ETL": ["etl", "elt", "data pipelines"],
+        "Data Analysis": ["data analysis", "data analytics"],
+        "Statistics": ["statistics", "statistical analysis"],
+        "Tableau": ["tableau"],
+        "Power BI": ["power bi", "powerbi"],
+        "Excel": ["excel", "microsoft excel"],
+        "dbt": ["dbt"],
+    },
+    "Databases": {
+        "PostgreSQL": ["postgresql", "postgres"],
+        "MySQL": ["mysql"],
+        "SQLite": ["sqlite"],
+        "MongoDB": ["mongodb", "mongo"],
+        "Redis": ["redis"],
+        "Elasticsearch": ["elasticsearch", "opensearch"],
+        "DynamoDB": ["dynamodb"],
+        "Cassandra": ["cassandra"],
+        "Snowflake": ["snowflake"],
+        "BigQuery": ["bigquery"],
+        "Oracle": ["oracle db", "oracle database", "pl/sql"],
+    },
+    "Cloud & DevOps": {
+        "AWS": ["aws", "amazon web services", "ec2", "s3", "lambda"],
+        "Azure": ["azure", "microsoft azure"],
+        "GCP": ["gcp", "google cloud", "google cloud platform"],
+        "Docker": ["docker", "containers", "containerization"],
+        "Kubernetes": ["kubernetes", "k8s", "eks", "gke", "aks"],
+        "Terraform": ["terraform", "infrastructure as code", "iac"],
+        "Ansible": ["ansible"],
+        "CI/CD": ["ci/cd", "continuous integration", "continuous delivery", "continuous deployment"],
+        "Jenkins": ["jenkins"],
+        "GitHub Actions": ["github actions"],
+        "Git": ["git", "github", "gitlab", "bitbucket"],
+        "Linux": ["linux", "unix"],
+        "Microservices": ["microservices", "microservice architecture"],
+        "Serverless": ["serverless"],
+        "Monitoring": ["prometheus", "grafana", "datadog", "observability"],
+        "Nginx": ["nginx"],
+    },
+    "Testing": {
+        "Unit Testing": ["unit testing", "unit tests", "tdd", "test driven development"],
+        "Pytest": ["pytest"],
+        "Jest": ["jest"],
+        "Selenium": ["selenium"],
+        "Cypress": ["cypress"],
+        "QA Automation": ["test automation", "qa automation"],
+    },
+    "Design & Product": {
+        "Figma": ["figma"],
+        "UI/UX": ["ui/ux", "ux design", "ui design", "user experience", "user interface design"],
+        "Product Management": ["product management", "product roadmap", "roadmapping"],
+        "Agile": ["agile", "scrum", "kanban", "sprint planning"],
+        "Jira": ["jira", "confluence"],
+    },
+    "Business": {
+        "Project Management": ["project management", "pmp", "prince2"],
+        "Digital Marketing": ["digital marketing", "seo", "sem", "google ads", "social media marketing"],
+        "Sales": ["sales", "business development", "lead generation"],
+        "CRM": ["crm", "salesforce", "hubspot"],
+        "Accounting": ["accounting", "bookkeeping", "quickbooks", "financial reporting"],
+        "Recruiting": ["recruiting", "recruitment", "talent acquisition"],
+        "Customer Service": ["customer service", "customer support"],
+        "ERP": ["erp", "sap"],
+    },
+    "Soft Skills": {
+        "Leadership": ["leadership", "team lead", "led a team", "mentoring", "mentored"],
+        "Communication": ["communication skills", "stakeholder management", "presentation skills"],
+        "Problem Solving": ["problem solving", "problem-solving", "analytical skills"],
+    },
+}
+
+# Career field suggested by each category when the LLM is not available
+CATEGORY_FIELDS = {
+    "Languages": "Software Engineering",
+    "Frameworks": "Software Engineering",
+    "Data & AI": "Data Science & Analytics",
+    "Databases": "Data Engineering",
+    "Cloud & DevOps": "DevOps & Cloud Engineering",
+    "Testing": "Quality Assurance",
+    "Design & Product": "Product & Design",
+    "Business": "Business & Operations",
+}
+
+SKILL_CATEGORY = {skill: category for category, skills in SKILL_TAXONOMY.items() for skill in skills}
+ALIASES = {alias: skill for skills in SKILL_TAXONOMY.values() for skill, aliases in skills.items() for alias in aliases}
+
+
+def _trie_pattern(words) -> str:
+    # Compile the alias list into one regex shaped like a trie, so shared prefixes are
+    # matched once ("react", "react native", "react.js") instead of one branch per alias.
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not is_end else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if is_end else body
+
+    return build(trie)
+
+
+# The lookarounds stand in for \b, which treats "+", "#" and "." as word boundaries
+SKILL_RE = re.compile(r"(?<![\w+#.])(" + _trie_pattern(ALIASES) + r")(?![\w+#]|\.\w)")
+WHITESPACE_RE = re.compile(r"\s+")
+NAME_RE = re.compile(r"^[A-Z][a-zA-Z'.-]+(?: [A-Z][a-zA-Z'.-]+){1,3}$")
+
+
+def extract_skills(text: str) -> Set[str]:
+    normalized = WHITESPACE_RE.sub(" ", (text or "").lower())
+    return {ALIASES[match] for match in SKILL_RE.findall(normalized)}
+
+
+def score_resume(resume_text: str, job_description: str) -> dict:
+    resume_skills = extract_skills(resume_text)
+    job_skills = extract_skills(job_description)
+    matched = sorted(job_skills & resume_skills)
+    missing = sorted(job_skills - resume_skills)
+
+    if job_skills:
+        match_rate = round(100 * len(matched) / len(job_skills))
+    else:
+        # No recognizable skills in the posting: fall back to plain keyword overlap
+        job_terms = set(tokenize(job_description))
+        match_rate = round(100 * len(job_terms & set(tokenize(resume_text))) / len(job_terms)) if job_terms else 0
+
+    return {
+        "matchRate": match_rate,
+        "matchedSkills": matched,
+        "missingSkills": missing,
+        "resumeSkills": sorted(resume_skills),
+        "jobSkills": sorted(job_skills),
+    }
+
+
+def guess_candidate_name(resume_text: str) -> str:
+    # Resumes nearly always open with the candidate's name on its own line
+    for line in (resume_text or "").splitlines()[:5]:
+        line = line.strip()
+        if NAME_RE.match(line) and line.lower() not in ALIASES:
+            return line
+    return "Applicant"
+
+
+def recommended_fields(resume_skills) -> List[str]:
+    counts = {}
+    for skill in resume_skills:
+        field = CATEGORY_FIELDS.get(SKILL_CATEGORY[skill])
+        if field:
+            counts[field] = counts.get(field, 0) + 1
+    return [field for field, _ in sorted(counts.items(), key=lambda item: -item[1])[:3]] or ["General Roles"]
+
+
+def local_analysis(facts: dict, resume_text: str, reason: str = None) -> dict:
+    # AnalysisResponse-shaped result built from the deterministic skill match alone
+    match_rate = facts["matchRate"]
+    skills_score = min(100, match_rate)
+    breadth_score = min(100, 10 * len(facts["resumeSkills"]))
+    feedback = (
+        f"Keyword-based analysis: the resume covers {len(facts['matchedSkills'])} of "
+        f"{len(facts['jobSkills'])} skills found in the job description."
+    )
+    if reason:
+        feedback += f" AI analysis was unavailable ({reason}), so this score is a baseline estimate."
+    return {
+        "candidateName": guess_candidate_name(resume_text),
+        "matchRate": match_rate,
+        "score": round((skills_score * 2 + breadth_score) / 3),
+        "strengths": [f"Has {skill} experience" for skill in facts["matchedSkills"][:3]] or ["Document received"],
+        "gaps": [f"No mention of {skill}" for skill in facts["missingSkills"][:3]] or ["No specific gaps identified"],
+        "detailedBreakdown": [
+            {"category": "Skills Match", "score": skills_score, "comment": f"Matched: {', '.join(facts['matchedSkills']) or 'none'}."},
+            {"category": "Skill Breadth", "score": breadth_score, "comment": f"{len(facts['resumeSkills'])} recognized skills on the resume."},
+        ],
+        "recommendedFields": recommended_fields(facts["resumeSkills"]),
+        "feedback": feedback,
+        "engine": "local",
+    }
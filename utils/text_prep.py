@@ -0,0 +1,189 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", "3000"))
+JOB_TOKEN_BUDGET = int(os.getenv("PROMPT_JOB_TOKEN_BUDGET", "1500"))
+
+SPACES_RE = re.compile(r"[ \t\u00a0\u200b]+")
+DIGITS_RE = re.compile(r"\d+")
+PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+
+# Lower number = kept first when the resume does not fit in the token budget
+SECTION_PRIORITY = {
+    "skills": 1, "technical skills": 1, "core competencies": 1,
+    "experience": 2, "work experience": 2, "professional experience": 2, "employment history": 2, "work history": 2,
+    "summary": 3, "profile": 3, "professional summary": 3, "objective": 3, "about me": 3,
+    "projects": 4, "personal projects": 4,
+    "education": 5,
+    "certifications": 6, "certificates": 6, "licenses": 6, "awards": 6, "achievements": 6,
+    "publications": 7, "volunteer": 7, "volunteering": 7, "languages": 7, "courses": 7, "training": 7,
+    "interests": 9, "hobbies": 9, "references": 9,
+}
+# The untitled block at the top holds the name and contact details
+HEADER_PRIORITY = 0
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini averages roughly four characters per token on English prose
+    return math.ceil(len(text) / 4)
+
+
+def _line_key(line: str) -> str:
+    return DIGITS_RE.sub("#", line.lower())
+
+
+def _strip_page_furniture(pages: List[List[str]]) -> Tuple[List[List[str]], int]:
+    # Headers/footers: lines (ignoring digits, e.g. page numbers) that sit in the first or
+    # last three lines of most pages. Bare page numbers are dropped everywhere.
+    removed = 0
+    if len(pages) > 1:
+        edges = Counter()
+        for lines in pages:
+            edges.update({_line_key(line) for line in lines[:3] + lines[-3:]})
+        repeated = {key for key, count in edges.items() if count >= max(2, math.ceil(len(pages) / 2))}
+        cleaned = []
+        seen_once = set()
+        for lines in pages:
+            keep = []
+            for index, line in enumerate(lines):
+                key = _line_key(line)
+                at_edge = index < 3 or index >= len(lines) - 3
+                # The first copy stays: a running header is usually the candidate's name
+                if at_edge and key in repeated and key in seen_once:
+                    removed += 1
+                    continue
+                seen_once.add(key)
+                keep.append(line)
+            cleaned.append(keep)
+        pages = cleaned
+
+    cleaned = []
+    for lines in pages:
+        keep = [line for line in lines if not PAGE_NUMBER_RE.match(line)]
+        removed += len(lines) - len(keep)
+        cleaned.append(keep)
+    return cleaned, removed
+
+
+def _section_priority(line: str):
+    heading = line.strip(" :").lower()
+    if len(heading) > 40:
+        return None
+    return SECTION_PRIORITY.get(heading)
+
+
+def _split_sections(lines: List[str]):
+    sections = [[HEADER_PRIORITY, []]]
+    for line in lines:
+        priority = _section_priority(line)
+        if priority is not None:
+            sections.append([priority, [line]])
+        else:
+            sections[-1][1].append(line)
+    return [(priority, body) for priority, body in sections if body]
+
+
+def _fit_sections(sections, budget: int):
+    # Keep whole sections in priority order; a section that does not fit is cut at a line
+    # boundary and later sections only get whatever room is left. Original order is kept.
+    kept = [None] * len(sections)
+    remaining = budget
+    truncated = 0
+    for index in sorted(range(len(sections)), key=lambda i: sections[i][0]):
+        body = sections[index][1]
+        cost = estimate_tokens("\n".join(body))
+        if cost <= remaining:
+            kept[index] = body
+            remaining -= cost + 1
+            continue
+        partial = []
+        for line in body:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                break
+            partial.append(line)
+            remaining -= cost
+        truncated += 1
+        if partial:
+            kept[index] = partial
+    return [line for body in kept if body for line in body], truncated
+
+
+def prepare_resume_text(pages: List[str], budget: int = None) -> Tuple[str, dict]:
+    budget = RESUME_TOKEN_BUDGET if budget is None else budget
+    raw = "".join(pages)
+    page_lines = [
+        [SPACES_RE.sub(" ", line).strip() for line in page.splitlines()]
+        for page in pages
+    ]
+    page_lines = [[line for line in lines if line] for lines in page_lines]
+    page_lines, furniture = _strip_page_furniture(page_lines)
+
+    # Drop repeated boilerplate lines (disclaimers, repeated contact strips, etc.)
+    seen = set()
+    lines = []
+    duplicates = 0
+    for line in (line for page in page_lines for line in page):
+        key = line.lower()
+        if len(key) > 25 and key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        lines.append(line)
+
+    text = "\n".join(lines)
+    truncated_sections = 0
+    if estimate_tokens(text) > budget:
+        lines, truncated_sections = _fit_sections(_split_sections(lines), budget)
+        text = "\n".join(lines)
+
+    stats = {
+        "input_tokens": estimate_tokens(raw),
+        "output_tokens": estimate_tokens(text),
+        "header_footer_lines_removed": furniture,
+        "duplicate_lines_removed": duplicates,
+        "sections_truncated": truncated_sections,
+    }
+    prompt_stats.record(stats)
+    return text, stats
+
+
+def prepare_job_description(job_description: str, budget: int = None) -> str:
+    budget = JOB_TOKEN_BUDGET if budget is None else budget
+    lines = [SPACES_RE.sub(" ", line).strip() for line in (job_description or "").splitlines()]
+    text = "\n".join(line for line in lines if line)
+    if estimate_tokens(text) > budget:
+        text = text[:budget * 4].rsplit(" ", 1)[0]
+    return text
+
+
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.truncated_requests = 0
+
+    def record(self, stats: dict):
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += stats["input_tokens"]
+            self.output_tokens += stats["output_tokens"]
+            self.truncated_requests += 1 if stats["sections_truncated"] else 0
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "resume_input_tokens": self.input_tokens,
+            "resume_output_tokens": self.output_tokens,
+            "truncated_requests": self.truncated_requests,
+            "reduction": round(1 - self.output_tokens / self.input_tokens, 4) if self.input_tokens else 0.0,
+        }
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,184 @@
+import contextvars
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logs import get_logger, request_id_var
+from utils.metrics import http_duration, http_requests, span_duration
+
+# Profiling is only available when PROFILE_TOKEN is set; a request opts in by sending it
+# in the X-Profile header. PROFILE_SAMPLE_RATE then decides how many of those are captured.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+# Requests slower than this are logged at warning level
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))
+# Paths that are not logged per request (still counted in the metrics)
+TRACE_QUIET_PATHS = {"/metrics", "/"}
+
+logger = get_logger("tracing")
+
+
+class Trace:
+    # Per-request timings, aggregated by stage name: a request runs dozens of DB queries,
+    # so each stage keeps a count and a total instead of one entry per call
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            entry = self.spans[name] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def summary(self):
+        return {name: {"count": count, "ms": round(total * 1000, 2)} for name, (count, total) in self.spans.items()}
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{name.replace('.', '-')};dur={total * 1000:.1f}" for name, (_, total) in self.spans.items()
+        )
+
+
+_trace_var = contextvars.ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace_var.get()
+
+
+def record(name: str, seconds: float):
+    span_duration.observe(seconds, name)
+    trace = _trace_var.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    # Works in sync and async code alike; outside a request only the metric is recorded
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_trace_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_trace_query_start")
+    if starts:
+        record("db.query", time.perf_counter() - starts.pop())
+
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        return "pyinstrument", profiler
+    except ImportError:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return "cprofile", profiler
+
+
+def _stop_profiler(kind: str, profiler, request_id: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if kind == "pyinstrument":
+        profiler.stop()
+        path = os.path.join(PROFILE_DIR, f"{request_id}.html")
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path = os.path.join(PROFILE_DIR, f"{request_id}.prof")
+        profiler.dump_stats(path)
+    return path
+
+
+class TracingMiddleware:
+    # Pure ASGI so streaming responses (SSE, NDJSON) are timed until the last chunk
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        if not PROFILE_TOKEN:
+            return False
+        for key, value in scope.get("headers", []):
+            if key == b"x-profile":
+                return value.decode("latin-1") == PROFILE_TOKEN and random.random() < PROFILE_SAMPLE_RATE
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        trace = Trace(request_id or uuid.uuid4().hex)
+        trace_token = _trace_var.set(trace)
+        request_token = request_id_var.set(trace.request_id)
+        profiler = _start_profiler() if self._wants_profile(scope) else None
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", trace.request_id.encode("latin-1")))
+                # Stages finished before the response started (all of them for non-streaming endpoints)
+                timing = trace.server_timing()
+                if timing:
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                if profiler is not None:
+                    headers.append((b"x-profile-id", trace.request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - trace.started
+            # Route template, not the raw path, so ids do not explode the label set
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests.inc(scope["method"], route, str(status))
+            http_duration.observe(elapsed, scope["method"], route)
+            profile_path = _stop_profiler(*profiler, trace.request_id) if profiler is not None else None
+            if scope["path"] not in TRACE_QUIET_PATHS or status >= 500:
+                level = "warning" if status >= 500 or elapsed * 1000 >= TRACE_SLOW_MS else "info"
+                getattr(logger, level)(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route,
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "spans": trace.summary(),
+                        **({"profile": profile_path} if profile_path else {}),
+                    },
+                )
+            request_id_var.reset(request_token)
+            _trace_var.reset(trace_token)
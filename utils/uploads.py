@@ -0,0 +1,195 @@
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from utils.disk import DiskBudget
+from utils.tracing import span
+
+# On Render this sits on the persistent disk mounted over the project directory
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", os.getenv("EXTRACTION_MAX_BYTES", str(10 * 1024 * 1024))))
+# Room for the multipart envelope and the other form fields (job description) around the file
+UPLOAD_FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", str(256 * 1024)))
+# Bytes of stored uploads kept on disk (0 = unlimited); least recently used files go first
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("UPLOAD_STORE_MAX_BYTES", str(300 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+URL_PREFIX = "/uploads/"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class StoredUpload(NamedTuple):
+    sha256: str
+    path: str
+    size: int
+    filename: str
+
+    @property
+    def url(self) -> str:
+        return f"{URL_PREFIX}{self.sha256}.pdf"
+
+
+upload_budget = DiskBudget(UPLOAD_DIR, UPLOAD_STORE_MAX_BYTES, ".pdf")
+
+
+def path_for(sha256: str) -> str:
+    # Fan out over 256 directories so no single directory grows huge
+    return os.path.join(UPLOAD_DIR, sha256[:2], f"{sha256}.pdf")
+
+
+def get(sha256: str, filename: str = None) -> Optional[StoredUpload]:
+    path = path_for(sha256)
+    if not os.path.exists(path):
+        return None
+    upload_budget.touch(path)
+    return StoredUpload(sha256, path, os.path.getsize(path), filename or f"{sha256}.pdf")
+
+
+def from_url(file_path: str) -> Optional[StoredUpload]:
+    # Resume.file_path holds "/uploads/<sha256>.pdf" for stored files
+    if not file_path or not file_path.startswith(URL_PREFIX):
+        return None
+    sha256 = file_path[len(URL_PREFIX):].split(".", 1)[0]
+    if len(sha256) != 64 or not all(c in "0123456789abcdef" for c in sha256):
+        return None
+    return get(sha256)
+
+
+def _commit(tmp_path: str, sha256: str) -> bool:
+    # Returns False when identical content is already stored (the new copy is dropped)
+    final_path = path_for(sha256)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        upload_budget.touch(final_path)
+        return False
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return True
+
+
+class UploadStore:
+    def __init__(self):
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.bytes_written = 0
+
+    async def save(self, upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+        with span("upload.read"):
+            return await self._save(upload, max_bytes)
+
+    async def _save(self, upload: UploadFile, max_bytes: int) -> StoredUpload:
+        # The multipart parser knows the part size up front; refuse before copying anything
+        if upload.size is not None and upload.size > max_bytes:
+            self.rejected += 1
+            raise UploadTooLarge(f"File exceeds {max_bytes} bytes.")
+
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        handle, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+        try:
+            with os.fdopen(handle, "wb") as tmp:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        self.rejected += 1
+                        raise UploadTooLarge(f"File exceeds {max_bytes} bytes.")
+                    digest.update(chunk)
+                    await run_in_threadpool(tmp.write, chunk)
+            sha256 = digest.hexdigest()
+            created = await run_in_threadpool(_commit, tmp_path, sha256)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if created:
+            self.stored += 1
+            self.bytes_written += size
+            await run_in_threadpool(upload_budget.added, size)
+        else:
+            self.deduplicated += 1
+        return StoredUpload(sha256, path_for(sha256), size, upload.filename)
+
+    def stats(self):
+        return {
+            "dir": UPLOAD_DIR,
+            "max_bytes": UPLOAD_MAX_BYTES,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "bytes_written": self.bytes_written,
+            "disk": upload_budget.stats(),
+        }
+
+
+upload_store = UploadStore()
+
+
+class UploadSizeLimit:
+    # ASGI middleware: rejects oversized single-file uploads from the Content-Length header
+    # (or while the body streams in) before the multipart parser spools any of it
+    def __init__(self, app, paths, max_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        too_large = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    too_large = True
+                    # Cut the body short; the app sees a truncated form and fails fast
+                    return {"type": "http.disconnect"}
+            return message
+
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if too_large:
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large and not response_started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        upload_store.rejected += 1
+        body = b'{"detail":"Upload is too large."}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,111 @@
+import os
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from models.user import User
+from utils.cache import TTLCache
+from utils.shared_state import shared_state
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+# Seconds a snapshot is trusted before the shared store is asked again whether another
+# worker invalidated it; bounds both the staleness and the store reads per cached user
+USER_INVALIDATION_CHECK_INTERVAL = float(os.getenv("USER_INVALIDATION_CHECK_INTERVAL", "1"))
+
+COLUMNS = [column.key for column in inspect(User).column_attrs]
+
+
+class Principal(NamedTuple):
+    # What the token alone proves: enough for endpoints that only filter by owner
+    id: int
+    email: str
+
+
+class UserCache:
+    # Column snapshots of recently seen users, keyed by id. Snapshots (not ORM objects)
+    # are cached so a request can never mutate another request's copy.
+    # With several workers each keeps its own snapshots, and an invalidation is also
+    # published to the shared store so the other workers drop older copies.
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, shared=None,
+                 check_interval: float = USER_INVALIDATION_CHECK_INTERVAL):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared if shared is not None and shared.shared else None
+        self.check_interval = check_interval
+        self.remote_invalidations = 0
+        self.shared_errors = 0
+
+    def put(self, user: User):
+        # [cached_at, checked_at, snapshot]; checked_at moves forward with each store check
+        now = time.time()
+        self.cache.set(user.id, [now, now, {key: getattr(user, key) for key in COLUMNS}])
+
+    async def _invalidated_since(self, user_id: int, cached_at: float) -> bool:
+        try:
+            invalidated_at = await self.shared.aget(f"user-invalidated:{user_id}")
+        except Exception:
+            # Cannot tell, so do not trust the snapshot
+            self.shared_errors += 1
+            return True
+        return invalidated_at is not None and invalidated_at >= cached_at
+
+    async def get(self, db: Session, user_id: int) -> Optional[User]:
+        entry = self.cache.get(user_id)
+        if entry is None:
+            return None
+        cached_at, checked_at, snapshot = entry
+        now = time.time()
+        if self.shared is not None and now - checked_at >= self.check_interval:
+            if await self._invalidated_since(user_id, cached_at):
+                self.remote_invalidations += 1
+                self.cache.delete(user_id)
+                return None
+            entry[1] = now
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        # load=False attaches the snapshot to this session without a SELECT
+        return db.merge(user, load=False)
+
+    # Sync: called from ORM commit events and sync endpoints, which already run off the event loop
+    def invalidate(self, user_id: int):
+        self.cache.delete(user_id)
+        if self.shared is not None:
+            try:
+                # Kept as long as any worker may still hold a snapshot
+                self.shared.set(f"user-invalidated:{user_id}", time.time(), ttl=self.cache.ttl)
+            except Exception:
+                self.shared_errors += 1
+
+    def stats(self):
+        stats = self.cache.stats()
+        if self.shared is not None:
+            stats["shared"] = {"remote_invalidations": self.remote_invalidations, "errors": self.shared_errors}
+        return stats
+
+
+user_cache = UserCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, shared=shared_state)
+
+
+# Invalidated once the change commits: a request that read the user before then would
+# otherwise cache the old row again, and a rolled-back change invalidates nothing
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        user_cache.invalidate(target.id)
+        return
+    session.info.setdefault("invalidated_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_invalidations(session):
+    for user_id in session.info.pop("invalidated_users", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_invalidations(session):
+    session.info.pop("invalidated_users", None)